@@ -0,0 +1,361 @@
+"""
+analytics.py
+------------
+Milk yield and quality analytics for Shree Ganesh Dairy Management System.
+
+A date range of milk records is read in one query straight from the
+integer columns of milk_entries (see records.py) into NumPy arrays.
+Everything after that is vectorised over the whole range, never a
+Python loop per farmer or per record:
+- litres per delivery day and its trend (least-squares slope) per farmer
+- FAT / SNF histograms and percentiles, overall and per farmer
+- shift-over-shift variation of each farmer's deliveries
+- outlier deliveries (robust z-score against the farmer's own median)
+- day-wise totals, averaged into chart-sized buckets
+
+Needs NumPy. main.py imports this module only when analytics are asked
+for, so the rest of the app runs without it.
+"""
+
+from itertools import chain
+
+import numpy as np
+
+from records import LITRE_SCALE, MONEY_SCALE, QUALITY_SCALE, from_day, to_day
+
+# Overall / per-farmer percentiles reported
+PERCENTILES = (5, 25, 50, 75, 95)
+FARMER_PERCENTILES = (10, 50, 90)
+
+# Histogram bins in stored hundredths (FAT 2.00-8.00 by 0.25, SNF 7.0-9.5 by 0.1)
+FAT_BINS = np.arange(200, 801, 25)
+SNF_BINS = np.arange(700, 951, 10)
+
+# Chart series length (days are averaged into buckets beyond this)
+SERIES_POINTS = 120
+MAX_SERIES_POINTS = 1000
+
+# Trend only for farmers with at least this many delivery days
+MIN_TREND_DAYS = 7
+
+# Outliers: robust z-score above this, for farmers with enough deliveries
+OUTLIER_Z = 3.5
+MIN_OUTLIER_DELIVERIES = 10
+MAX_OUTLIERS = 200
+
+# Column packing for load_range (fewer Python ints per row is most of the load time)
+# farmer < 2^20, shift < 2^8, fat / snf < 2^16
+DAY_SHIFT, FARMER_SHIFT = 28, 8
+LITRES_SHIFT, FAT_SHIFT = 32, 16
+
+
+def load_range(c, start_day, end_day, source="milk_entries", shift=None, category=None, codes=None):
+    """
+    {"id", "day", "farmer", "shift", "litres", "fat", "snf", "amount": int64 array}
+    for milk_entries rows with day in [start_day, end_day].
+    """
+    sql = f"""
+        SELECT id,
+               (day << {DAY_SHIFT}) | (IFNULL(farmer, 0) << {FARMER_SHIFT}) | IFNULL(shift, 0),
+               (litres << {LITRES_SHIFT}) | (fat << {FAT_SHIFT}) | snf,
+               amount
+        FROM {source}
+        WHERE day BETWEEN ? AND ?
+    """
+    params = [start_day, end_day]
+    if shift and shift.lower() != "all":
+        sql += " AND shift = (SELECT id FROM main.shifts WHERE name = ?)"
+        params.append(shift)
+    if category and category.lower() != "all":
+        sql += " AND category = (SELECT id FROM main.categories WHERE name = ?)"
+        params.append(category)
+    if codes:
+        sql += f" AND farmer IN (SELECT id FROM main.farmer_codes WHERE code IN ({','.join('?' * len(codes))}))"
+        params.extend(codes)
+
+    c.execute(sql, params)
+    # flat int64 buffer filled straight from the cursor (no list of tuples)
+    table = np.fromiter(chain.from_iterable(c), dtype=np.int64).reshape(-1, 4)
+    keys, measures = table[:, 1], table[:, 2]
+    return {
+        "id": table[:, 0],
+        "day": keys >> DAY_SHIFT,
+        "farmer": (keys >> FARMER_SHIFT) & ((1 << (DAY_SHIFT - FARMER_SHIFT)) - 1),
+        "shift": keys & ((1 << FARMER_SHIFT) - 1),
+        "litres": measures >> LITRES_SHIFT,
+        "fat": (measures >> FAT_SHIFT) & ((1 << (LITRES_SHIFT - FAT_SHIFT)) - 1),
+        "snf": measures & ((1 << FAT_SHIFT) - 1),
+        "amount": table[:, 3],
+    }
+
+
+# -------------------------------
+# VECTOR HELPERS
+# -------------------------------
+def _ratio(num, den):
+    """num / den with NaN where den is 0."""
+    num = np.asarray(num, dtype=np.float64)
+    den = np.asarray(den, dtype=np.float64)
+    out = np.full(num.shape, np.nan)
+    np.divide(num, den, out=out, where=den != 0)
+    return out
+
+
+def _group_percentiles(group, values, groups, qs):
+    """
+    Percentiles of values within each group (0..groups-1), linear
+    interpolation like np.percentile: {q: float array [groups]}.
+    """
+    counts = np.bincount(group, minlength=groups)
+    # one sort on group * span + value (exact in float64 for these magnitudes)
+    values = np.asarray(values, dtype=np.float64)
+    low = values.min() if len(values) else 0.0
+    span = (values.max() - low + 1) if len(values) else 1.0
+    offsets = np.repeat(np.arange(groups) * span, counts)
+    ordered = np.sort(group * span + (values - low)) - offsets + low
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    last = np.maximum(counts - 1, 0)
+    found = {}
+    for q in qs:
+        pos = last * (q / 100.0)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.minimum(lo + 1, last)
+        frac = pos - lo
+        if len(ordered):
+            a = ordered[np.minimum(starts + lo, len(ordered) - 1)]
+            b = ordered[np.minimum(starts + hi, len(ordered) - 1)]
+            value = a + (b - a) * frac
+        else:
+            value = np.zeros(groups)
+        found[q] = np.where(counts > 0, value, np.nan)
+    return found
+
+
+def _histogram(values, edges, scale):
+    clipped = np.clip(values, edges[0], edges[-1])
+    counts, _ = np.histogram(clipped, bins=edges)
+    return {"edges": _floats(edges / scale, 2), "counts": counts.tolist()}
+
+
+def _floats(values, digits):
+    """JSON-ready list: rounded, NaN -> None."""
+    rounded = np.round(np.asarray(values, dtype=np.float64), digits)
+    return [None if v != v else v for v in rounded.tolist()]
+
+
+# -------------------------------
+# ANALYTICS
+# -------------------------------
+def _names(c):
+    c.execute(
+        """
+        SELECT fc.id, fc.code, COALESCE(f.name, 'Unknown')
+        FROM main.farmer_codes fc
+        LEFT JOIN main.farmers f ON f.code = fc.code
+        """
+    )
+    return {row[0]: (row[1], row[2]) for row in c.fetchall()}
+
+
+def _series(day_index, litres, fat, snf, days, start_day, points):
+    """Day-wise totals over the range, averaged into at most `points` buckets."""
+    litres_day = np.bincount(day_index, weights=litres, minlength=days)
+    fat_day = np.bincount(day_index, weights=fat * litres, minlength=days)
+    snf_day = np.bincount(day_index, weights=snf * litres, minlength=days)
+
+    size = max(1, -(-days // points))  # ceil(days / points)
+    edges = np.arange(0, days, size)
+    span = np.diff(np.append(edges, days))
+    bucket_litres = np.add.reduceat(litres_day, edges)
+    return {
+        "bucket_days": int(size),
+        "dates": [from_day(start_day + int(e)) for e in edges],
+        "litres": _floats(bucket_litres / span / LITRE_SCALE, 2),  # average per day
+        "fat": _floats(_ratio(np.add.reduceat(fat_day, edges), bucket_litres) / QUALITY_SCALE, 2),
+        "snf": _floats(_ratio(np.add.reduceat(snf_day, edges), bucket_litres) / QUALITY_SCALE, 2),
+    }
+
+
+def _empty(start_date, end_date):
+    return {
+        "from_date": start_date,
+        "to_date": end_date,
+        "records": 0,
+        "farmers": [],
+        "quality": {},
+        "shifts": [],
+        "outliers": [],
+        "series": {"bucket_days": 1, "dates": [], "litres": [], "fat": [], "snf": []},
+    }
+
+
+def milk_analytics(c, start_date, end_date, source="milk_entries", shift=None,
+                   category=None, codes=None, points=None):
+    """
+    Yield and quality analytics for start_date..end_date (YYYY-MM-DD).
+
+    source is the milk_entries FROM source (archive.source(...) for
+    archived years). shift / category / codes narrow the records;
+    points caps the chart series length.
+    """
+    start_day, end_day = to_day(start_date), to_day(end_date)
+    if start_day is None or end_day is None or end_day < start_day:
+        raise ValueError("Select a valid date range")
+    points = max(1, min(int(points or SERIES_POINTS), MAX_SERIES_POINTS))
+
+    m = load_range(c, start_day, end_day, source, shift, category, codes)
+    if not len(m["id"]):
+        return _empty(start_date, end_date)
+
+    days = end_day - start_day + 1
+    day_index = m["day"] - start_day
+    farmer_ids, farmer = np.unique(m["farmer"], return_inverse=True)
+    groups = len(farmer_ids)
+    litres = m["litres"].astype(np.float64)
+    fat = m["fat"].astype(np.float64)
+    snf = m["snf"].astype(np.float64)
+
+    # --- per farmer: totals and litre-weighted quality
+    deliveries = np.bincount(farmer, minlength=groups)
+    total_litres = np.bincount(farmer, weights=litres, minlength=groups)
+    total_amount = np.bincount(farmer, weights=m["amount"], minlength=groups)
+    fat_mean = _ratio(np.bincount(farmer, weights=fat * litres, minlength=groups), total_litres)
+    snf_mean = _ratio(np.bincount(farmer, weights=snf * litres, minlength=groups), total_litres)
+
+    # --- per farmer: litres per delivery day and its least-squares trend
+    farmer_day, day_slot = np.unique(farmer * days + day_index, return_inverse=True)
+    y = np.bincount(day_slot, weights=litres)  # litres per (farmer, day)
+    x = (farmer_day % days).astype(np.float64)
+    owner = farmer_day // days
+    n = np.bincount(owner, minlength=groups).astype(np.float64)
+    sx = np.bincount(owner, weights=x, minlength=groups)
+    sy = np.bincount(owner, weights=y, minlength=groups)
+    sxy = np.bincount(owner, weights=x * y, minlength=groups)
+    sxx = np.bincount(owner, weights=x * x, minlength=groups)
+    slope = _ratio(n * sxy - sx * sy, n * sxx - sx * sx)  # ml per day, per day
+    daily_mean = _ratio(sy, n)
+    slope[n < MIN_TREND_DAYS] = np.nan
+    trend_pct = slope * 30 / daily_mean * 100  # change over 30 days, % of the average day
+
+    # --- per farmer: quality percentiles
+    fat_p = _group_percentiles(farmer, m["fat"], groups, FARMER_PERCENTILES)
+    snf_p = _group_percentiles(farmer, m["snf"], groups, FARMER_PERCENTILES)
+
+    # --- per farmer: shift-over-shift change and spread of delivery litres
+    order = np.lexsort((m["shift"], m["day"], farmer))
+    seq_farmer = farmer[order]
+    seq_litres = litres[order]
+    same = seq_farmer[1:] == seq_farmer[:-1]
+    change = np.abs(_ratio(seq_litres[1:] - seq_litres[:-1], seq_litres[:-1]))
+    valid = same & ~np.isnan(change)
+    shift_change = _ratio(
+        np.bincount(seq_farmer[1:][valid], weights=change[valid], minlength=groups),
+        np.bincount(seq_farmer[1:][valid], minlength=groups),
+    )
+    mean_litres = _ratio(total_litres, deliveries)
+    sq = np.bincount(farmer, weights=litres * litres, minlength=groups)
+    variance = np.maximum(_ratio(sq, deliveries) - mean_litres * mean_litres, 0)
+    cv = _ratio(np.sqrt(variance), mean_litres)
+
+    # --- outliers: robust z-score against the farmer's own median / MAD
+    flags = np.zeros(len(litres))
+    field = np.full(len(litres), -1)
+    eligible = (deliveries >= MIN_OUTLIER_DELIVERIES)[farmer]
+    for i, values in enumerate((m["litres"], m["fat"], m["snf"])):
+        median = _group_percentiles(farmer, values, groups, (50,))[50]
+        deviation = np.abs(values - median[farmer])
+        mad = _group_percentiles(farmer, deviation, groups, (50,))[50]
+        z = np.abs(0.6745 * _ratio(deviation, mad[farmer]))
+        z[~eligible | np.isnan(z)] = 0
+        worse = z > flags
+        flags[worse] = z[worse]
+        field[worse] = i
+    flagged = np.flatnonzero(flags > OUTLIER_Z)
+    outliers_per_farmer = np.bincount(farmer[flagged], minlength=groups)
+    flagged = flagged[np.argsort(-flags[flagged], kind="stable")][:MAX_OUTLIERS]
+
+    names = _names(c)
+    c.execute("SELECT id, name FROM main.shifts")
+    shift_names = dict(c.fetchall())
+    fields = ("litres", "fat", "snf")
+
+    outliers = [
+        {
+            "id": int(m["id"][i]),
+            "date": from_day(int(m["day"][i])),
+            "farmer_code": names.get(int(m["farmer"][i]), ("", ""))[0],
+            "shift": shift_names.get(int(m["shift"][i]), ""),
+            "litres": int(m["litres"][i]) / LITRE_SCALE,
+            "fat": int(m["fat"][i]) / QUALITY_SCALE,
+            "snf": int(m["snf"][i]) / QUALITY_SCALE,
+            "field": fields[field[i]],
+            "score": round(float(flags[i]), 1),
+        }
+        for i in flagged.tolist()
+    ]
+
+    columns = {
+        "deliveries": deliveries.tolist(),
+        "delivery_days": n.astype(np.int64).tolist(),
+        "litres": _floats(total_litres / LITRE_SCALE, 2),
+        "amount": _floats(total_amount / MONEY_SCALE, 2),
+        "avg_daily_litres": _floats(daily_mean / LITRE_SCALE, 2),
+        "trend_litres_per_day": _floats(slope / LITRE_SCALE, 3),
+        "trend_pct_30d": _floats(trend_pct, 1),
+        "fat": _floats(fat_mean / QUALITY_SCALE, 2),
+        "snf": _floats(snf_mean / QUALITY_SCALE, 2),
+        "shift_change_pct": _floats(shift_change * 100, 1),
+        "cv_pct": _floats(cv * 100, 1),
+        "outliers": outliers_per_farmer.tolist(),
+    }
+    for q in FARMER_PERCENTILES:
+        columns[f"fat_p{q}"] = _floats(fat_p[q] / QUALITY_SCALE, 2)
+        columns[f"snf_p{q}"] = _floats(snf_p[q] / QUALITY_SCALE, 2)
+
+    farmers = []
+    for g in np.argsort(-total_litres, kind="stable").tolist():
+        code, name = names.get(int(farmer_ids[g]), ("", "Unknown"))
+        row = {"code": code, "name": name}
+        row.update((key, values[g]) for key, values in columns.items())
+        farmers.append(row)
+
+    # --- per shift totals
+    shift_ids, by_shift = np.unique(m["shift"], return_inverse=True)
+    shift_litres = np.bincount(by_shift, weights=litres)
+    shift_count = np.bincount(by_shift)
+    shift_columns = zip(
+        shift_ids.tolist(),
+        shift_count.tolist(),
+        _floats(shift_litres / LITRE_SCALE, 2),
+        _floats(shift_litres / shift_count / LITRE_SCALE, 2),
+        _floats(_ratio(np.bincount(by_shift, weights=fat * litres), shift_litres) / QUALITY_SCALE, 2),
+        _floats(_ratio(np.bincount(by_shift, weights=snf * litres), shift_litres) / QUALITY_SCALE, 2),
+    )
+    shifts = [
+        {
+            "shift": shift_names.get(s, ""),
+            "deliveries": count,
+            "litres": total,
+            "avg_litres": average,
+            "fat": fat_avg,
+            "snf": snf_avg,
+        }
+        for s, count, total, average, fat_avg, snf_avg in shift_columns
+    ]
+
+    return {
+        "from_date": start_date,
+        "to_date": end_date,
+        "records": int(len(litres)),
+        "farmers": farmers,
+        "quality": {
+            "percentiles": list(PERCENTILES),
+            "fat": _floats(np.percentile(m["fat"], PERCENTILES) / QUALITY_SCALE, 2),
+            "snf": _floats(np.percentile(m["snf"], PERCENTILES) / QUALITY_SCALE, 2),
+            "fat_histogram": _histogram(m["fat"], FAT_BINS, QUALITY_SCALE),
+            "snf_histogram": _histogram(m["snf"], SNF_BINS, QUALITY_SCALE),
+        },
+        "shifts": shifts,
+        "outliers": outliers,
+        "series": _series(day_index, litres, fat, snf, days, start_day, points),
+    }
@@ -0,0 +1,409 @@
+"""
+archive.py
+----------
+Yearly archive databases for Shree Ganesh Dairy Management System.
+
+A closed financial year (April → March) of milk records (milk_entries),
+farmer_advances and sales_records, plus its daily_totals rows, is
+moved out of database.db into archive/dairy_fy<year>.db next to it.
+The live database keeps only open years, so backups, scans and the
+rollup stay small however long the dairy has been running. The farmer
+ledger keeps its per-day rows for archived years, so balances and
+ledger-based bills for any period are unchanged by archiving.
+
+Archived years are listed in the archive_years table. Reports that
+take a date range ATTACH only the archive files that range touches
+and read through source(), a UNION ALL of the live table and the
+attached copies:
+
+    with archive.attached(c, start, end) as schemas:
+        c.execute(f"SELECT ... FROM {source('farmer_advances', schemas)} WHERE ...")
+
+Milk records are read through records.milk_source(source("milk_entries", schemas)).
+Archive files written before the compact milk storage (migration v8)
+are converted the first time they are attached.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from jobs import report_progress
+from ledger import paused
+from migrations import copy_legacy_milk_records
+from records import milk_source, to_day
+from sync import paused as sync_paused
+
+ARCHIVE_DIR = "archive"
+
+# Financial year starts on 1 April
+FY_START_MONTH = 4
+
+# Archived table -> its date column
+ARCHIVED_TABLES = {
+    "milk_entries": "day",
+    "farmer_advances": "date",
+    "sales_records": "sale_date",
+}
+ROLLUP_TABLE = "daily_totals"
+
+# Tables dated by day number (records.to_day) instead of YYYY-MM-DD text
+DAY_NUMBER_TABLES = {"milk_entries"}
+
+# archive_years count column of an archived table
+REGISTRY_COLUMNS = {"milk_entries": "milk_records"}
+
+# SQLite allows 10 attached databases by default; main is not one of them
+MAX_ATTACHED = 10
+
+
+class ArchiveError(Exception):
+    """Archiving refused (open year, already archived, too many years attached)."""
+
+
+def fiscal_year(day):
+    """Financial year (by its starting calendar year) of a YYYY-MM-DD date."""
+    d = date.fromisoformat(str(day)[:10])
+    return d.year if d.month >= FY_START_MONTH else d.year - 1
+
+
+def year_bounds(year):
+    """First and last day of financial year <year> as YYYY-MM-DD."""
+    first = date(year, FY_START_MONTH, 1)
+    last = date(year + 1, FY_START_MONTH, 1) - timedelta(days=1)
+    return first.isoformat(), last.isoformat()
+
+
+def schema_name(year):
+    return f"fy{int(year)}"
+
+
+def _date_range(table, first, last):
+    if table in DAY_NUMBER_TABLES:
+        return to_day(first), to_day(last)
+    return first, last
+
+
+def source(table, schemas, columns="*"):
+    """FROM-clause source reading table from main plus every attached archive."""
+    if not schemas:
+        return table
+    parts = [f"SELECT {columns} FROM main.{table}"] + [
+        f"SELECT {columns} FROM {schema}.{table}" for schema in schemas
+    ]
+    return f"({' UNION ALL '.join(parts)}) AS {table}"
+
+
+class Archive:
+    def __init__(self, db, directory=None):
+        self.db = db
+        self.directory = directory or os.path.join(
+            os.path.dirname(os.path.abspath(db.path)), ARCHIVE_DIR
+        )
+        self._lock = threading.Lock()
+        self._years = None  # {year: registry row}
+        self._version = None  # db.external_version() when _years was read
+        self._current = set()  # years whose file has the current milk storage
+
+    def path(self, year):
+        return os.path.join(self.directory, f"dairy_fy{int(year)}.db")
+
+    # -------------------------------
+    # REGISTRY
+    # -------------------------------
+    def years(self):
+        """{year: {"year", "file", "milk_records", ...}} for every archived year."""
+        version = self.db.external_version()
+        if version != self._version:
+            # cli.py maintenance --archive in another process
+            self._version = version
+            self.invalidate()
+        years = self._years
+        if years is None:
+            with self.db.read() as c:
+                try:
+                    c.execute(
+                        "SELECT year, file, milk_records, farmer_advances, sales_records, archived_at "
+                        "FROM archive_years ORDER BY year"
+                    )
+                except sqlite3.OperationalError:
+                    return {}  # database not migrated yet
+                cols = [d[0] for d in c.description]
+                years = {row[0]: dict(zip(cols, row)) for row in c.fetchall()}
+            with self._lock:
+                self._years = years
+        return years
+
+    def invalidate(self):
+        with self._lock:
+            self._years = None
+
+    def touching(self, start_date=None, end_date=None):
+        """Archived years overlapping [start_date, end_date] (open ends = all)."""
+        found = []
+        for year in self.years():
+            first, last = year_bounds(year)
+            if (not end_date or first <= end_date) and (not start_date or last >= start_date):
+                found.append(year)
+        return found
+
+    def archived_count(self, table):
+        return sum(info[table] or 0 for info in self.years().values())
+
+    # -------------------------------
+    # READING
+    # -------------------------------
+    @contextmanager
+    def attached(self, c, start_date=None, end_date=None):
+        """ATTACH the archives a date range touches to c's connection; yields their schema names."""
+        years = self.touching(start_date, end_date)
+        if len(years) > MAX_ATTACHED:
+            raise ArchiveError(
+                f"Range covers {len(years)} archived years; query at most {MAX_ATTACHED} at a time"
+            )
+        schemas = []
+        try:
+            for year in years:
+                self._upgrade(year)
+                # schema names cannot be bound parameters; year is an int
+                c.execute(f"ATTACH DATABASE ? AS {schema_name(year)}", (self.path(year),))
+                schemas.append(schema_name(year))
+            yield schemas
+        finally:
+            for schema in schemas:
+                c.execute(f"DETACH DATABASE {schema}")
+
+    def _upgrade(self, year):
+        """Convert a pre-v8 archive file's milk_records table into milk_entries (once)."""
+        if year in self._current:
+            return
+        path = self.path(year)
+        conn = sqlite3.connect(path)
+        try:
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        finally:
+            conn.close()
+
+        if "milk_entries" not in tables:
+            with self.db.read() as c:
+                c.execute(
+                    "SELECT sql FROM sqlite_master WHERE tbl_name = 'milk_entries' "
+                    "AND type IN ('table', 'index') AND sql IS NOT NULL ORDER BY type DESC"
+                )
+                statements = [row[0] for row in c.fetchall()]
+
+            schema = schema_name(year)
+            with self.db.exclusive() as conn:
+                conn.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        for sql in statements:
+                            kind = "CREATE TABLE " if sql.startswith("CREATE TABLE ") else "CREATE INDEX "
+                            conn.execute(sql.replace(kind, f"{kind}{schema}.", 1))
+                        copy_legacy_milk_records(conn, schema)
+                        conn.execute(f"DROP TABLE {schema}.milk_records")
+                        conn.execute("COMMIT")
+                    except BaseException:
+                        conn.execute("ROLLBACK")
+                        raise
+                    conn.execute(f"VACUUM {schema}")
+                finally:
+                    conn.execute(f"DETACH DATABASE {schema}")
+            print(f"⚙️ Converted archive {os.path.basename(path)} to compact milk records")
+        self._current.add(year)
+
+    # -------------------------------
+    # ARCHIVING
+    # -------------------------------
+    def _create_file(self, path):
+        """Archive file with the live schema of the archived tables and their indexes."""
+        with self.db.read() as c:
+            names = list(ARCHIVED_TABLES) + [ROLLUP_TABLE]
+            c.execute(
+                f"""
+                SELECT sql FROM sqlite_master
+                WHERE tbl_name IN ({",".join("?" * len(names))})
+                  AND type IN ('table', 'index') AND sql IS NOT NULL
+                ORDER BY type DESC
+                """,
+                names,
+            )
+            statements = [row[0] for row in c.fetchall()]
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path)
+        try:
+            for sql in statements:
+                # sqlite_master keeps "CREATE TABLE x" / "CREATE INDEX x" without IF NOT EXISTS
+                kind = "CREATE TABLE " if sql.startswith("CREATE TABLE ") else "CREATE INDEX "
+                conn.execute(sql.replace(kind, kind + "IF NOT EXISTS ", 1))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def archive_year(self, year, vacuum=False):
+        """
+        Move financial year <year> into its archive file. Returns rows moved per table.
+
+        Rows are copied (and committed) into the archive first, then
+        deleted from the live database in one transaction that also
+        registers the year, so a crash in between leaves the year
+        live-only and archiving can simply be run again.
+        """
+        year = int(year)
+        first, last = year_bounds(year)
+        if last >= date.today().isoformat():
+            raise ArchiveError(f"Financial year {year}-{(year + 1) % 100:02d} is not closed yet")
+        if year in self.years():
+            raise ArchiveError(f"Financial year {year} is already archived")
+
+        path = self.path(year)
+        self._create_file(path)
+        schema = schema_name(year)
+        counts = {}
+
+        with self.db.exclusive() as conn:
+            conn.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+            try:
+                tables = list(ARCHIVED_TABLES.items()) + [(ROLLUP_TABLE, "day")]
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    for i, (table, day) in enumerate(tables):
+                        conn.execute(
+                            f"INSERT OR REPLACE INTO {schema}.{table} "
+                            f"SELECT * FROM main.{table} WHERE {day} BETWEEN ? AND ?",
+                            _date_range(table, first, last),
+                        )
+                        report_progress(i + 1, len(tables) * 2, f"Copying {table}")
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    # archived rows are still owed / recovered: their farmer ledger
+                    # days stay as they are; the deletes are local housekeeping,
+                    # not changes to replicate
+                    with paused(conn), sync_paused(conn):
+                        for i, (table, day) in enumerate(ARCHIVED_TABLES.items()):
+                            # rollup triggers take these rows out of the live daily_totals
+                            cur = conn.execute(
+                                f"DELETE FROM main.{table} WHERE {day} BETWEEN ? AND ?",
+                                _date_range(table, first, last),
+                            )
+                            counts[REGISTRY_COLUMNS.get(table, table)] = cur.rowcount
+                            report_progress(len(tables) + i + 1, len(tables) * 2, f"Removing {table}")
+                    conn.execute(
+                        """
+                        INSERT INTO archive_years
+                            (year, file, milk_records, farmer_advances, sales_records, archived_at)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                        """,
+                        (
+                            year,
+                            os.path.basename(path),
+                            counts["milk_records"],
+                            counts["farmer_advances"],
+                            counts["sales_records"],
+                            time.strftime("%Y-%m-%d %H:%M:%S"),
+                        ),
+                    )
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+            finally:
+                conn.execute(f"DETACH DATABASE {schema}")
+                self.invalidate()
+            self._current.add(year)
+
+            if vacuum:
+                report_progress(len(tables) * 2, len(tables) * 2, "Compacting live database")
+                conn.execute("VACUUM")
+        return counts
+
+    def folded_years(self):
+        """Archived years whose ledger days were folded into one row (older archiving)."""
+        found = []
+        with self.db.read() as c:
+            for year in self.years():
+                first, last = year_bounds(year)
+                c.execute(
+                    "SELECT COUNT(DISTINCT day), MIN(day) FROM farmer_ledger WHERE day BETWEEN ? AND ?",
+                    (first, last),
+                )
+                days, only = c.fetchone()
+                if days == 1 and only == last:
+                    found.append(year)
+        return found
+
+    def restore_ledger(self, year):
+        """
+        Rebuild the per-day farmer ledger rows of an archived year from its
+        archive file (plus anything entered live since), continuing from
+        each farmer's balance before the year. Returns the rows written.
+        """
+        year = int(year)
+        first, last = year_bounds(year)
+        self._upgrade(year)
+        schema = schema_name(year)
+        milk = milk_source(source("milk_entries", [schema]))
+        advances = source("farmer_advances", [schema])
+
+        with self.db.exclusive() as conn:
+            conn.execute(f"ATTACH DATABASE ? AS {schema}", (self.path(year),))
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.execute("DELETE FROM farmer_ledger WHERE day BETWEEN ? AND ?", (first, last))
+                    cur = conn.execute(
+                        f"""
+                        INSERT INTO farmer_ledger (farmer_code, day, litres, milk, advance, payment, closing)
+                        SELECT farmer_code, day, litres, milk, advance, payment,
+                               IFNULL((SELECT l.closing FROM farmer_ledger l
+                                       WHERE l.farmer_code = d.farmer_code AND l.day < :first
+                                       ORDER BY l.day DESC LIMIT 1), 0)
+                               + SUM(milk - advance - payment) OVER (
+                                   PARTITION BY farmer_code ORDER BY day
+                                   ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+                               )
+                        FROM (
+                            SELECT farmer_code, day, SUM(litres) AS litres, SUM(milk) AS milk,
+                                   SUM(advance) AS advance, SUM(payment) AS payment
+                            FROM (
+                                SELECT IFNULL(farmer_code, '') AS farmer_code, rec_date AS day,
+                                       IFNULL(litres, 0) AS litres, IFNULL(amount, 0) AS milk,
+                                       0 AS advance, 0 AS payment
+                                FROM {milk}
+                                WHERE milk_records.day BETWEEN :first_day AND :last_day
+                                UNION ALL
+                                SELECT IFNULL(farmer_code, ''), date, 0, 0, IFNULL(amount, 0), 0
+                                FROM {advances}
+                                WHERE date BETWEEN :first AND :last
+                                UNION ALL
+                                SELECT IFNULL(farmer_code, ''), date, 0, 0, 0, IFNULL(amount, 0)
+                                FROM main.farmer_payments
+                                WHERE date BETWEEN :first AND :last
+                            )
+                            GROUP BY farmer_code, day
+                        ) d
+                        """,
+                        {
+                            "first": first,
+                            "last": last,
+                            "first_day": to_day(first),
+                            "last_day": to_day(last),
+                        },
+                    )
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+            finally:
+                conn.execute(f"DETACH DATABASE {schema}")
+        return cur.rowcount
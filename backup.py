@@ -0,0 +1,216 @@
+"""
+backup.py
+---------
+Online backups for Shree Ganesh Dairy Management System.
+
+Copies database.db while the app keeps saving records, through
+SQLite's online backup API on its own connection:
+- a bounded number of pages is copied per step, with a short pause
+  between steps, so the writer (save_record) is never held up
+- each copy is written as <name>.partial, checked with
+  PRAGMA integrity_check and only then renamed into place
+- the newest N generations are kept in backups/ next to the database
+
+A write from another connection makes SQLite restart a step-wise
+copy. After a few restarts (a busy collection shift) the rest is
+copied in one step, which in WAL mode still reads one consistent
+snapshot without blocking writers.
+
+BackupScheduler runs this in a background thread every few hours.
+"""
+
+import glob
+import os
+import sqlite3
+import threading
+import time
+
+from jobs import report_progress
+
+BACKUP_DIR = "backups"
+
+# Generations kept (oldest deleted first)
+KEEP = 7
+
+# Pages copied per step (4 KiB pages: 4 MiB) and pause between steps (seconds)
+PAGES_PER_STEP = 1024
+STEP_SLEEP = 0.005
+
+# Step-wise restarts tolerated before copying in one step
+MAX_RESTARTS = 3
+
+# Scheduler: hours between backups, and delay before the first one after start
+DEFAULT_INTERVAL_HOURS = 6
+FIRST_DELAY = 60
+
+
+class BackupError(Exception):
+    """Backup copy failed verification."""
+
+
+class _Restarted(Exception):
+    pass
+
+
+def copy_database(source_path, target_path, pages=PAGES_PER_STEP, sleep=STEP_SLEEP):
+    """Online copy of source_path into target_path. Returns {"steps", "restarts", "pages"}."""
+    stats = {"steps": 0, "restarts": 0, "pages": 0}
+    last = [None]
+
+    def progress(status, remaining, total):
+        stats["steps"] += 1
+        stats["pages"] = total
+        if last[0] is not None and remaining > last[0]:
+            stats["restarts"] += 1
+            if stats["restarts"] > MAX_RESTARTS:
+                raise _Restarted()
+        last[0] = remaining
+        report_progress(total - remaining, total, "Copying database pages")
+
+    source = sqlite3.connect(source_path, timeout=10)
+    target = sqlite3.connect(target_path)
+    try:
+        try:
+            source.backup(target, pages=pages, progress=progress, sleep=sleep)
+        except _Restarted:
+            source.backup(target, pages=-1)
+            stats["steps"] += 1
+    finally:
+        target.close()
+        source.close()
+    return stats
+
+
+def verify(path):
+    """Raise BackupError unless PRAGMA integrity_check passes on path."""
+    conn = sqlite3.connect(path)
+    try:
+        result = conn.execute("PRAGMA integrity_check").fetchall()
+    except sqlite3.DatabaseError as e:
+        # too damaged (or not a database at all) for the check to run
+        raise BackupError(f"Integrity check failed for {path}: {e}") from e
+    finally:
+        conn.close()
+    if result != [("ok",)]:
+        raise BackupError(f"Integrity check failed for {path}: {result[:5]}")
+
+
+class BackupManager:
+    def __init__(self, db_path, directory=None, keep=KEEP):
+        self.db_path = db_path
+        self.directory = directory or os.path.join(
+            os.path.dirname(os.path.abspath(db_path)), BACKUP_DIR
+        )
+        self.keep = keep
+        self.prefix = os.path.splitext(os.path.basename(db_path))[0]
+        self._lock = threading.Lock()  # one backup at a time
+        self.last = None  # result (or error) of the latest run
+
+    # -------------------------------
+    # GENERATIONS
+    # -------------------------------
+    def generations(self):
+        """Verified backups, newest first."""
+        paths = glob.glob(os.path.join(self.directory, f"{self.prefix}_*.db"))
+        found = [
+            {
+                "path": path,
+                "bytes": os.path.getsize(path),
+                "created": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(os.path.getmtime(path))),
+                "mtime": os.path.getmtime(path),
+            }
+            for path in paths
+        ]
+        return sorted(found, key=lambda g: g["mtime"], reverse=True)
+
+    def _rotate(self):
+        removed = []
+        for old in self.generations()[self.keep:]:
+            os.remove(old["path"])
+            removed.append(old["path"])
+        return removed
+
+    # -------------------------------
+    # BACKUP
+    # -------------------------------
+    def backup_now(self, path=None):
+        """
+        Copy, verify and rotate. path writes one extra copy there instead
+        of a new generation in the backup directory.
+        """
+        with self._lock:
+            started = time.perf_counter()
+            path = path or os.path.join(
+                self.directory, f"{self.prefix}_{time.strftime('%Y%m%d_%H%M%S')}.db"
+            )
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            partial = path + ".partial"
+            try:
+                if os.path.exists(partial):
+                    os.remove(partial)
+                stats = copy_database(self.db_path, partial)
+                verify(partial)
+                os.replace(partial, path)
+            except BaseException as e:
+                if os.path.exists(partial):
+                    os.remove(partial)
+                self.last = {
+                    "success": False,
+                    "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    "message": str(e),
+                }
+                raise
+
+            removed = self._rotate() if os.path.dirname(os.path.abspath(path)) == self.directory else []
+            self.last = dict(
+                stats,
+                success=True,
+                at=time.strftime("%Y-%m-%d %H:%M:%S"),
+                path=path,
+                bytes=os.path.getsize(path),
+                seconds=round(time.perf_counter() - started, 2),
+                removed=removed,
+            )
+            return self.last
+
+
+class BackupScheduler:
+    """Background thread taking a backup every interval_hours (0 = off)."""
+
+    def __init__(self, manager, interval_hours=DEFAULT_INTERVAL_HOURS, first_delay=FIRST_DELAY):
+        self.manager = manager
+        self.interval = interval_hours * 3600
+        self.first_delay = first_delay
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.interval > 0 and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="dairy-backup", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def next_due(self):
+        """Seconds until the next backup, counted from the newest generation."""
+        newest = self.manager.generations()[:1]
+        if not newest:
+            return 0
+        return max(0, newest[0]["mtime"] + self.interval - time.time())
+
+    def _loop(self):
+        # never compete with startup; catch up on an overdue backup after that
+        wait = max(self.first_delay, self.next_due())
+        while not self._stop.wait(wait):
+            try:
+                result = self.manager.backup_now()
+                print(f"💾 Backup saved to {result['path']} ({result['seconds']} s)")
+            except Exception as e:
+                print("backup error:", e)
+            wait = self.interval
@@ -0,0 +1,362 @@
+"""
+benchmark.py
+------------
+Latency benchmark for every Api method of Shree Ganesh Dairy
+Management System, run headless (no webview window).
+
+Point it at a database built by generate_data.py:
+
+    python generate_data.py --db bench.db --farmers 1500 --years 3
+    python benchmark.py --db bench.db --json run1.json
+    python benchmark.py --db bench.db --compare run1.json
+
+For each method it reports p50 / p95 / p99 latency over --repeat
+calls, the rows returned, the response size and the peak Python
+memory of one call (measured in a separate tracemalloc pass so it does
+not skew the timings). The response cache is cleared before every call
+unless --warm-cache is given. Write methods change the database, so
+use a throwaway copy or pass --no-writes.
+
+Once a year has been archived (python cli.py maintenance --archive
+<year>), report, bill, analytics and ledger ranges reaching back into
+it are benchmarked too, with the archive files attached per call.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from archive import year_bounds
+
+# Lists inside a response that count as "rows returned"
+ROW_KEYS = (
+    "records", "bills", "farmers", "advances", "sales", "rates", "history", "jobs",
+    "results", "payments", "entries",
+)
+
+
+class Scenario:
+    def __init__(self, name, method, payload=None, writes=False):
+        self.name = name
+        self.method = method
+        self.payload = payload  # JSON-able value, or callable(i) -> value (run untimed)
+        self.writes = writes
+
+    def build(self, i):
+        value = self.payload(i) if callable(self.payload) else self.payload
+        if value is None or isinstance(value, str):
+            return value
+        return json.dumps(value)
+
+
+def _context(db_path):
+    """Dates, codes and ids from the database to aim the scenarios at."""
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    c.execute("SELECT date(MAX(day) * 86400, 'unixepoch') FROM milk_entries")
+    last = c.fetchone()[0] or date.today().isoformat()
+    c.execute("SELECT code FROM farmers ORDER BY id LIMIT 1")
+    row = c.fetchone()
+    c.execute("SELECT category FROM rate_table ORDER BY id LIMIT 1")
+    rate = c.fetchone()
+    counts = {}
+    for table in ("farmers", "milk_entries", "farmer_advances", "sales_records"):
+        c.execute(f"SELECT COUNT(*) FROM {table}")
+        counts[table] = c.fetchone()[0]
+    c.execute("SELECT MIN(year) FROM archive_years")
+    archived = c.fetchone()[0]
+    c.execute("SELECT remarks FROM farmer_advances WHERE remarks != '' ORDER BY id DESC LIMIT 1")
+    remark = c.fetchone()
+    conn.close()
+
+    end = date.fromisoformat(last)
+    return {
+        "last_day": last,
+        "week_start": (end - timedelta(days=6)).isoformat(),
+        "month_start": (end - timedelta(days=29)).isoformat(),
+        "year_start": (end - timedelta(days=364)).isoformat(),
+        "code": row[0] if row else "F0001",
+        "category": rate[0] if rate else "Cow",
+        # oldest archived financial year (None: nothing archived)
+        "archive_start": year_bounds(archived)[0] if archived is not None else None,
+        "archive_end": year_bounds(archived)[1] if archived is not None else None,
+        "remark": (remark[0] if remark else "advance").split()[0],
+        "counts": counts,
+    }
+
+
+def scenarios(api, ctx, out_dir):
+    day, code, category = ctx["last_day"], ctx["code"], ctx["category"]
+    week = {"start_date": ctx["week_start"], "end_date": day}
+    month = {"start_date": ctx["month_start"], "end_date": day}
+    year = {"start_date": ctx["year_start"], "end_date": day}
+    run = str(int(time.time()))
+
+    def new_advance(i):
+        api.add_advance(json.dumps({"farmer_code": code, "amount": 1, "remarks": "bench"}))
+        with main.db.read() as c:
+            c.execute("SELECT MAX(id) FROM farmer_advances")
+            return {"id": c.fetchone()[0]}
+
+    def new_farmer(i, prefix="D"):
+        farmer_code = f"{prefix}{run}{i}"
+        api.add_farmer(json.dumps({"code": farmer_code, "name": "Bench", "category": category}))
+        with main.db.read() as c:
+            c.execute("SELECT id FROM farmers WHERE code=?", (farmer_code,))
+            return {"id": c.fetchone()[0]}
+
+    record = {
+        "rec_date": day, "farmer_code": code, "shift": "Morning",
+        "litres": 5, "fat": 4.0, "snf": 8.5, "rate": 46.0, "amount": 230.0,
+    }
+
+    # report ranges reaching back into archived years (attached per call)
+    archived = []
+    if ctx["archive_start"]:
+        span = {"start_date": ctx["archive_start"], "end_date": day}
+        # a month across the boundary: half archived, half live
+        edge = date.fromisoformat(ctx["archive_end"])
+        across = {
+            "from_date": (edge - timedelta(days=14)).isoformat(),
+            "to_date": (edge + timedelta(days=15)).isoformat(),
+        }
+        archived = [
+            Scenario("generate_report (archive edge)", "generate_report", dict(across, format="columns")),
+            Scenario("get_individual_bill (archived)", "get_individual_bill", dict(span, code=code)),
+            Scenario("get_reports_summary (archived)", "get_reports_summary", span),
+            Scenario("get_milk_analytics (archived)", "get_milk_analytics", span),
+            Scenario("get_farmer_ledger (archived)", "get_farmer_ledger", dict(span, code=code)),
+        ]
+
+    return [
+        Scenario("login", "login", {"username": "admin", "password": "12345"}),
+        Scenario("get_summary", "get_summary", {"date": day, "shift": "Morning"}),
+        Scenario("fetch_records (day)", "fetch_records", {"date": day}),
+        Scenario("fetch_records (page)", "fetch_records", {"limit": 500}),
+        Scenario("fetch_records (page, total)", "fetch_records", {"limit": 500, "with_total": True}),
+        Scenario("fetch_records (columns)", "fetch_records", {"limit": 500, "format": "columns"}),
+        Scenario("generate_report (day)", "generate_report", {"from_date": day, "to_date": day}),
+        Scenario("generate_report (month)", "generate_report",
+                 {"from_date": ctx["month_start"], "to_date": day}),
+        Scenario("generate_report (month, columns)", "generate_report",
+                 {"from_date": ctx["month_start"], "to_date": day, "format": "columns"}),
+        Scenario("export_report_csv (month)", "export_report_csv",
+                 {"from_date": ctx["month_start"], "to_date": day,
+                  "path": os.path.join(out_dir, "report.csv")}),
+        Scenario("get_individual_bill (month)", "get_individual_bill", dict(month, code=code)),
+        Scenario("get_individual_bill (year)", "get_individual_bill", dict(year, code=code)),
+        Scenario("generate_bill (week)", "generate_bill", dict(week, bill_type="weekly")),
+        Scenario("generate_bill (month)", "generate_bill", dict(month, bill_type="monthly")),
+        Scenario("render_all_bills (week)", "render_all_bills",
+                 dict(week, path=os.path.join(out_dir, "bills.html"))),
+        Scenario("get_reports_summary (month)", "get_reports_summary", month),
+        Scenario("get_reports_summary (year)", "get_reports_summary", year),
+        Scenario("get_milk_analytics (month)", "get_milk_analytics", month),
+        Scenario("get_milk_analytics (year)", "get_milk_analytics", year),
+        *archived,
+        Scenario("export_report_pdf", "export_report_pdf", {"content": "<p>x</p>" * 1000}),
+        Scenario("list_jobs", "list_jobs"),
+        Scenario("get_all_farmers", "get_all_farmers"),
+        Scenario("get_farmer_by_code", "get_farmer_by_code", {"code": code}),
+        Scenario("search_farmers", "search_farmers", {"query": code[:2]}),
+        Scenario("get_all_advances", "get_all_advances"),
+        Scenario("get_all_advances (columns)", "get_all_advances", {"format": "columns"}),
+        Scenario("get_all_sales", "get_all_sales"),
+        Scenario("get_all_sales (columns)", "get_all_sales", {"format": "columns"}),
+        Scenario("search (farmer)", "search", {"query": code, "kinds": ["farmers"]}),
+        Scenario("search (all kinds)", "search", {"query": ctx["remark"]}),
+        Scenario("search (advances, month)", "search",
+                 dict(month, query=ctx["remark"], kinds=["advances"])),
+        Scenario("get_farmer_balance", "get_farmer_balance", {"code": code}),
+        Scenario("get_farmer_balance (as of)", "get_farmer_balance",
+                 {"code": code, "date": ctx["month_start"]}),
+        Scenario("get_farmer_ledger (month)", "get_farmer_ledger", dict(month, code=code)),
+        Scenario("get_farmer_ledger (year)", "get_farmer_ledger", dict(year, code=code)),
+        Scenario("get_payments", "get_payments"),
+        Scenario("get_payments (farmer)", "get_payments", {"farmer_code": code}),
+        Scenario("get_current_shift", "get_current_shift"),
+        Scenario("get_cache_stats", "get_cache_stats"),
+        Scenario("get_metrics", "get_metrics"),
+        Scenario("get_rates", "get_rates"),
+        Scenario("get_rate_history", "get_rate_history"),
+        Scenario("calculate_rate", "calculate_rate",
+                 {"category": category, "fat": 4.2, "snf": 8.5, "litres": 5, "date": day}),
+        Scenario("get_rate_for_category", "get_rate_for_category",
+                 {"category": category, "fat": 4.2, "snf": 8.5}),
+        # ---- writes ----
+        Scenario("save_record", "save_record", record, writes=True),
+        Scenario("save_records (100)", "save_records", {"records": [record] * 100}, writes=True),
+        Scenario("add_advance", "add_advance",
+                 {"farmer_code": code, "amount": 1, "remarks": "bench"}, writes=True),
+        Scenario("delete_advance", "delete_advance", new_advance, writes=True),
+        Scenario("add_payment", "add_payment",
+                 {"farmer_code": code, "amount": 1, "remarks": "bench"}, writes=True),
+        Scenario("add_farmer", "add_farmer",
+                 lambda i: {"code": f"A{run}{i}", "name": "Bench", "category": category},
+                 writes=True),
+        Scenario("update_farmer", "update_farmer",
+                 lambda i: dict(new_farmer(i, "U"), name="Bench Renamed", category=category),
+                 writes=True),
+        Scenario("delete_farmer", "delete_farmer", new_farmer, writes=True),
+        Scenario("start_new_shift", "start_new_shift", writes=True),
+        Scenario("add_rate", "add_rate",
+                 {"category": "Bench", "base": 10, "fat_rate": 1, "snf_rate": 1}, writes=True),
+    ]
+
+
+def count_rows(response):
+    """Rows in a decoded Api response (list or columnar payloads)."""
+    total = 0
+    for key in ROW_KEYS:
+        value = response.get(key)
+        if isinstance(value, list):
+            total += len(value)
+        elif isinstance(value, dict) and isinstance(value.get("rows"), list):
+            total += len(value["rows"])
+    data = response.get("data")
+    if isinstance(data, dict) and isinstance(data.get("records"), list):
+        total += len(data["records"])
+    for key in ("rows", "count", "saved"):
+        if isinstance(response.get(key), int):
+            total += response[key]
+    return total
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_scenario(api, scenario, repeat, warm_cache):
+    method = getattr(api, scenario.method)
+    samples = []
+    response = None
+    for i in range(repeat):
+        payload = scenario.build(i)
+        if not warm_cache:
+            main.response_cache.clear()
+        started = time.perf_counter()
+        raw = method(payload) if payload is not None else method()
+        samples.append(time.perf_counter() - started)
+        response = raw
+
+    # separate pass: tracemalloc slows Python down too much to time with it
+    payload = scenario.build(repeat)
+    if not warm_cache:
+        main.response_cache.clear()
+    tracemalloc.start()
+    method(payload) if payload is not None else method()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    decoded = json.loads(response)
+    return {
+        "success": bool(decoded.get("success")),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "rows": count_rows(decoded),
+        "bytes": len(response),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def print_table(results, previous=None):
+    header = f"{'method':<36}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rows':>9}{'KB':>9}{'peak KB':>10}"
+    if previous:
+        header += f"{'Δp50':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        line = (
+            f"{name:<36}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+            f"{r['rows']:>9}{r['bytes'] / 1024:>9.1f}{r['peak_kb']:>10.1f}"
+        )
+        before = (previous or {}).get(name)
+        if before and before["p50_ms"]:
+            change = (r["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100
+            line += f"{change:>+8.0f}%"
+        if not r["success"]:
+            line += "  ❌"
+        print(line)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark every Api method headless")
+    parser.add_argument("--db", default="database.db")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--only", help="run scenarios whose name contains this text")
+    parser.add_argument("--no-writes", action="store_true", help="skip methods that write")
+    parser.add_argument("--warm-cache", action="store_true",
+                        help="keep the response cache between calls")
+    parser.add_argument("--json", dest="json_out", help="save results to this file")
+    parser.add_argument("--compare", help="show p50 change against a saved --json run")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        sys.exit(f"❌ {args.db} not found (build one with generate_data.py)")
+
+    # main reads DAIRY_DB at import time
+    os.environ["DAIRY_DB"] = args.db
+    global main
+    import main
+
+    with main.db.exclusive() as conn:
+        main.migrate(conn, verbose=False)
+
+    api = main.Api()
+    ctx = _context(args.db)
+    out_dir = tempfile.mkdtemp(prefix="dairy-bench-")
+
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()) as quiet:
+        for scenario in scenarios(api, ctx, out_dir):
+            if args.no_writes and scenario.writes:
+                continue
+            if args.only and args.only not in scenario.name:
+                continue
+            results[scenario.name] = run_scenario(api, scenario, args.repeat, args.warm_cache)
+            quiet.seek(0)
+            quiet.truncate()
+
+    main.jobs.shutdown()
+    main.db.close()
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)["results"]
+
+    counts = ", ".join(f"{t}={n:,}" for t, n in ctx["counts"].items())
+    print(f"📊 {args.db}: {counts}")
+    print(f"   repeat={args.repeat} cache={'warm' if args.warm_cache else 'cold'}\n")
+    print_table(results, previous)
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "db": args.db,
+                    "run_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    "repeat": args.repeat,
+                    "warm_cache": args.warm_cache,
+                    "counts": ctx["counts"],
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+        print(f"\n✅ Results saved to {args.json_out}")
+
+
+if __name__ == "__main__":
+    main_cli()
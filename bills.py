@@ -0,0 +1,198 @@
+"""
+bills.py
+--------
+Farmer bill building and bulk rendering for Shree Ganesh Dairy
+Management System.
+
+- bill_totals(): the totals / advance deduction / net used by
+  Api.get_individual_bill and by the bulk renderer, so both agree.
+- collect_bills(): every farmer's bill for a period in three queries,
+  archived years included when their schemas are attached.
+- render_bundle(): one printable HTML file with a page per farmer,
+  rendered in parallel by a process pool for large memberships.
+"""
+
+import html
+import os
+from datetime import datetime
+
+from archive import source
+from jobs import report_progress
+from records import milk_source, to_day
+
+RECORD_COLUMNS = ["rec_date", "shift", "litres", "fat", "snf", "rate", "amount"]
+
+# Below this many bills a process pool costs more than it saves
+PARALLEL_MIN_BILLS = 200
+# Bills handed to a worker per task
+CHUNK_BILLS = 50
+
+DAIRY_NAME = "Varad Dairy"
+
+
+# -------------------------------
+# BILL DATA
+# -------------------------------
+
+
+def bill_totals(records, total_advance):
+    """Bill payload for one farmer from their period records and advances."""
+    total_litres = sum(r["litres"] or 0 for r in records)
+    total_amount = sum(r["amount"] or 0 for r in records)
+    total_advance = total_advance or 0
+    return {
+        "records": records,
+        "total_litres": total_litres,
+        "total_amount": total_amount,
+        "total_advance": total_advance,
+        "net": total_amount - total_advance,
+    }
+
+
+def collect_bills(c, start_date, end_date, include_empty=False, schemas=()):
+    """
+    [(farmer, bill)] for every farmer, in farmer id order.
+
+    farmer is {"code", "name", "category"}; bill is the bill_totals()
+    payload. Farmers with no milk and no advance in the period are
+    skipped unless include_empty is set. schemas are the archives
+    attached for the period (archive.attached).
+    """
+    c.execute("SELECT code, name, category FROM farmers ORDER BY id ASC")
+    farmers = c.fetchall()
+
+    c.execute(
+        f"""
+        SELECT farmer_code, {", ".join(RECORD_COLUMNS)}
+        FROM {milk_source(source("milk_entries", schemas))}
+        WHERE day BETWEEN ? AND ?
+        ORDER BY farmer_code, day, id
+        """,
+        (to_day(start_date), to_day(end_date)),
+    )
+    records = {}
+    for row in c:
+        records.setdefault(row[0], []).append(dict(zip(RECORD_COLUMNS, row[1:])))
+
+    c.execute(
+        f"""
+        SELECT farmer_code, SUM(amount)
+        FROM {source("farmer_advances", schemas)}
+        WHERE date BETWEEN ? AND ?
+        GROUP BY farmer_code
+        """,
+        (start_date, end_date),
+    )
+    advances = dict(c.fetchall())
+
+    bills = []
+    for code, name, category in farmers:
+        if not include_empty and code not in records and not advances.get(code):
+            continue
+        farmer = {"code": code, "name": name, "category": category}
+        bills.append((farmer, bill_totals(records.get(code, []), advances.get(code))))
+    return bills
+
+
+# -------------------------------
+# HTML RENDERING
+# -------------------------------
+
+BUNDLE_STYLE = """
+    body { font-family: 'Segoe UI', Arial, sans-serif; margin: 0; }
+    .bill { padding: 20px; page-break-after: always; }
+    .bill:last-child { page-break-after: auto; }
+    table { width: 100%; border-collapse: collapse; margin-top: 15px; }
+    th, td { border: 1px solid #999; padding: 6px; text-align: center; }
+    th { background: #f3e9ff; color: #4B0082; }
+    h2, h3 { text-align: center; margin: 5px; color: #4B0082; }
+    .total td { font-weight: bold; background: #f3e9ff; }
+    .net td { font-weight: bold; background: #e8d7ff; }
+"""
+
+
+def _money(value):
+    return f"₹{(value or 0):.2f}"
+
+
+def render_bill(farmer, bill, start_date, end_date, generated_on):
+    """One farmer's bill as an HTML fragment (same layout as the dashboard slip)."""
+    esc = html.escape
+    rows = "".join(
+        f"<tr><td>{esc(str(r['rec_date']))}</td><td>{esc(str(r['shift'] or ''))}</td>"
+        f"<td>{(r['litres'] or 0):.2f}</td><td>{(r['fat'] or 0):.1f}</td>"
+        f"<td>{(r['snf'] or 0):.1f}</td><td>{_money(r['rate'])}</td>"
+        f"<td>{_money(r['amount'])}</td></tr>"
+        for r in bill["records"]
+    )
+    return f"""
+<div class="bill">
+    <h2>{esc(DAIRY_NAME)}</h2>
+    <h3>Farmer Milk Bill</h3>
+    <p style="text-align:center;">Period: {esc(start_date)} → {esc(end_date)}</p>
+    <p><b>Farmer Code:</b> {esc(str(farmer['code']))}</p>
+    <p><b>Name:</b> {esc(str(farmer['name'] or ''))}</p>
+    <p><b>Category:</b> {esc(str(farmer['category'] or ''))}</p>
+    <table>
+        <tr><th>Date</th><th>Shift</th><th>Litres</th><th>Fat</th><th>SNF</th><th>Rate</th><th>Amount</th></tr>
+        {rows}
+        <tr class="total"><td colspan="2">Total</td><td>{bill['total_litres']:.2f} L</td>
+            <td colspan="2"></td><td colspan="2">{_money(bill['total_amount'])}</td></tr>
+        <tr class="total"><td colspan="5">Advance Deducted</td>
+            <td colspan="2">{_money(bill['total_advance'])}</td></tr>
+        <tr class="net"><td colspan="5">Net Payable</td>
+            <td colspan="2">{_money(bill['net'])}</td></tr>
+    </table>
+    <p style="text-align:center;margin-top:20px;">Generated on: {esc(generated_on)}</p>
+</div>"""
+
+
+def _render_chunk(args):
+    """Process pool task: render a list of (farmer, bill) pairs."""
+    items, start_date, end_date, generated_on = args
+    return "".join(
+        render_bill(farmer, bill, start_date, end_date, generated_on)
+        for farmer, bill in items
+    )
+
+
+def render_bundle(bills, start_date, end_date, workers=None):
+    """All bills as one printable HTML document (one page per farmer)."""
+    generated_on = datetime.now().strftime("%d/%m/%Y, %H:%M:%S")
+    chunks = [
+        (bills[i:i + CHUNK_BILLS], start_date, end_date, generated_on)
+        for i in range(0, len(bills), CHUNK_BILLS)
+    ]
+
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 2) - 1)
+
+    def collect(pages):
+        parts = []
+        for i, page in enumerate(pages):
+            parts.append(page)
+            done = min(len(bills), (i + 1) * CHUNK_BILLS)
+            report_progress(done, len(bills), f"{done} of {len(bills)} bills rendered")
+        return "".join(parts)
+
+    if workers > 1 and len(bills) >= PARALLEL_MIN_BILLS:
+        # loads multiprocessing only when a large bill run needs it
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # map() keeps chunk order, so bills stay in farmer order
+            body = collect(pool.map(_render_chunk, chunks))
+    else:
+        body = collect(_render_chunk(chunk) for chunk in chunks)
+
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Bills {html.escape(start_date)} to {html.escape(end_date)}</title>
+<style>{BUNDLE_STYLE}</style>
+</head>
+<body>{body}
+</body>
+</html>
+"""
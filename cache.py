@@ -0,0 +1,149 @@
+"""
+cache.py
+--------
+Response cache for read-only Api endpoints in Shree Ganesh Dairy
+Management System.
+
+Each cached response remembers the write generation of every table it
+was built from. Api write methods call bump("<table>") after they
+commit; a cached response is served only while all of its tables are
+still on the same generation, so invalidation is exact per table and
+switching dashboard screens does not touch SQLite when nothing changed.
+Commits from other processes (LAN server, cli.py, sync imports) never
+call bump(), so when given a version callable (Database.external_version)
+the cache drops every response whenever that value moves.
+Least recently used entries are evicted beyond max_entries.
+"""
+
+import functools
+import json
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 256
+
+
+def normalise_payload(data):
+    """Equal payloads -> equal keys, whatever the key order or whitespace."""
+    if not data:
+        return "{}"
+    try:
+        return json.dumps(json.loads(data), sort_keys=True, separators=(",", ":"))
+    except (TypeError, ValueError):
+        return str(data)
+
+
+class ResponseCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, version=None):
+        self.max_entries = max_entries
+        self.version = version
+        self._seen_version = None
+        self._entries = OrderedDict()  # key -> (tables, generations, response)
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # -------------------------------
+    # GENERATIONS
+    # -------------------------------
+    def bump(self, *tables):
+        """Mark tables as written; every response built from them goes stale."""
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+
+    def bump_all(self):
+        """Stale every cached response, whatever tables it was built from (group commits, sync imports)."""
+        with self._lock:
+            for table in self._generations:
+                self._generations[table] += 1
+
+    def _check_version(self):
+        """bump_all() when another process has written since the last look."""
+        if self.version is None:
+            return
+        version = self.version()
+        if version != self._seen_version:
+            self._seen_version = version
+            self.bump_all()
+
+    def generations(self, tables):
+        with self._lock:
+            # registered here so bump_all() also reaches tables never bumped yet
+            return tuple(self._generations.setdefault(t, 0) for t in tables)
+
+    # -------------------------------
+    # ENTRIES
+    # -------------------------------
+    def get(self, key):
+        self._check_version()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                tables, generations, response = entry
+                current = tuple(self._generations.get(t, 0) for t in tables)
+                if current == generations:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return response
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, tables, generations, response):
+        """Store a response built when tables were on the given generations."""
+        with self._lock:
+            current = tuple(self._generations.get(t, 0) for t in tables)
+            if current != generations:
+                return  # a write landed while it was being built
+            self._entries[key] = (tables, generations, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "generations": dict(self._generations),
+            }
+
+
+def cached(cache, *tables):
+    """
+    Decorator for Api read methods: serve the JSON response from cache
+    until one of the tables it reads is bumped. Only successful
+    responses are stored.
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, data=None):
+            key = (method.__name__, normalise_payload(data))
+            response = cache.get(key)
+            if response is not None:
+                return response
+
+            # snapshot before querying so a concurrent write is never hidden
+            generations = cache.generations(tables)
+            response = method(self, data)
+            if response.startswith('{"success": true'):
+                cache.put(key, tables, generations, response)
+            return response
+
+        return wrapper
+
+    return decorator
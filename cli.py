@@ -0,0 +1,293 @@
+"""
+cli.py
+------
+Headless command line for Shree Ganesh Dairy Management System.
+
+Runs the same Api operations as the desktop app without a window
+(no webview / tkinter imports), for cron / Task Scheduler jobs on the
+office machine:
+
+    python cli.py bills --period last-week --render
+    python cli.py report --period last-month --out reports/milk.csv
+    python cli.py summary --date 2025-06-01
+    python cli.py backup --keep 14
+    python cli.py maintenance --optimize --checkpoint
+    python cli.py sync --export main --out E:/centre1_to_main.delta.gz
+    python cli.py sync --import E:/main_to_centre1.delta.gz
+
+Dates are YYYY-MM-DD; --period picks common ranges relative to today.
+Exits with status 1 when the operation fails.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import date, timedelta
+
+PERIODS = ("today", "yesterday", "this-week", "last-week", "this-month", "last-month")
+
+
+def period_dates(name, today=None):
+    """(start, end) for a named period; weeks run Monday → Sunday."""
+    today = today or date.today()
+    if name == "today":
+        return today, today
+    if name == "yesterday":
+        day = today - timedelta(days=1)
+        return day, day
+    if name == "this-week":
+        return today - timedelta(days=today.weekday()), today
+    if name == "last-week":
+        end = today - timedelta(days=today.weekday() + 1)
+        return end - timedelta(days=6), end
+    if name == "this-month":
+        return today.replace(day=1), today
+    if name == "last-month":
+        end = today.replace(day=1) - timedelta(days=1)
+        return end.replace(day=1), end
+    raise ValueError(f"Unknown period: {name}")
+
+
+def resolve_range(args):
+    """Date range from --period or --start/--end (both default to today)."""
+    if args.period:
+        start, end = period_dates(args.period)
+        return start.isoformat(), end.isoformat()
+    today = date.today().isoformat()
+    start = args.start or args.end or today
+    return start, args.end or start
+
+
+def call(api, method, payload=None):
+    """Call an Api method with a dict payload and decode the JSON response."""
+    raw = getattr(api, method)(json.dumps(payload or {}))
+    response = json.loads(raw)
+    if not response.get("success"):
+        raise SystemExit(f"❌ {method}: {response.get('message', 'failed')}")
+    return response
+
+
+# -------------------------------
+# COMMANDS
+# -------------------------------
+def cmd_bills(api, args):
+    start, end = resolve_range(args)
+    bill_type = args.type or ("weekly" if args.period and "week" in args.period else "monthly")
+
+    if args.render:
+        path = args.out or os.path.join("bills", f"bills_{start}_to_{end}.html")
+        res = call(api, "render_all_bills", {
+            "start_date": start, "end_date": end, "path": path,
+            "include_empty": args.include_empty,
+        })
+        return res, res["message"]
+
+    res = call(api, "generate_bill", {
+        "start_date": start, "end_date": end, "bill_type": bill_type, "format": "columns",
+    })
+    bills = res["bills"]
+    path = args.out or os.path.join("bills", f"bill_summary_{start}_to_{end}.csv")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(bills["columns"])
+        writer.writerows(bills["rows"])
+    return res, f"{len(bills['rows'])} {bill_type} bill(s) for {start} → {end} saved to {path}"
+
+
+def cmd_report(api, args):
+    start, end = resolve_range(args)
+    path = args.out or os.path.join("reports", f"milk_report_{start}_to_{end}.csv")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    res = call(api, "export_report_csv", {
+        "from_date": start, "to_date": end, "shift": args.shift, "path": path,
+    })
+    return res, f"{res['rows']} record(s) for {start} → {end} saved to {path}"
+
+
+def cmd_summary(api, args):
+    if args.period or args.start or args.end:
+        start, end = resolve_range(args)
+        res = call(api, "get_reports_summary", {"start_date": start, "end_date": end})
+        text = (
+            f"{start} → {end}: milk {res['milk_litres']:.1f} L / ₹{res['milk_amount']:.2f}, "
+            f"sales {res['sale_litres']:.1f} L / ₹{res['sale_amount']:.2f}, "
+            f"advances ₹{res['total_advances']:.2f}, net ₹{res['net_income']:.2f}"
+        )
+        return res, text
+
+    day = args.date or date.today().isoformat()
+    res = call(api, "get_summary", {"date": day, "shift": args.shift})
+    text = (
+        f"{day} {args.shift or 'all shifts'}: {res['total_litres']:.1f} L / "
+        f"₹{res['total_amount']:.2f}; {res['farmers_count']} farmers, "
+        f"{res['total_records']} records in total"
+    )
+    return res, text
+
+
+def cmd_backup(main, args):
+    # online, verified copy: safe while the app is saving records
+    if args.keep is not None:
+        main.backups.keep = args.keep
+    result = main.backups.backup_now(args.out)
+    text = f"Backup saved to {result['path']} ({result['bytes'] / 1024:.0f} KB, integrity ok)"
+    if result["removed"]:
+        text += f"; removed {len(result['removed'])} old backup(s)"
+    return result, text
+
+
+def cmd_maintenance(main, args):
+    done = []
+    with main.db.exclusive() as conn:
+        version = main.migrate(conn, verbose=False)
+        done.append(f"schema v{version}")
+
+        if args.integrity:
+            result = conn.execute("PRAGMA integrity_check").fetchall()
+            ok = result == [("ok",)]
+            done.append("integrity ok" if ok else f"integrity FAILED: {result[:5]}")
+            if not ok:
+                print("❌ " + "; ".join(done))
+                raise SystemExit(1)
+        if args.analyze:
+            conn.execute("ANALYZE")
+            done.append("analyze")
+        if args.optimize:
+            conn.execute("PRAGMA optimize")
+            done.append("optimize")
+
+    if args.archive:
+        res = call(main.Api(), "archive_year", {"year": args.archive})
+        done.append(res["message"])
+
+    # years archived before per-day ledger rows were kept
+    for year in main.archive.folded_years():
+        rows = main.archive.restore_ledger(year)
+        done.append(f"ledger FY{year} restored ({rows} day rows)")
+
+    with main.db.exclusive() as conn:
+        if args.vacuum:
+            conn.execute("VACUUM")
+            done.append("vacuum")
+        if args.checkpoint:
+            busy, _, _ = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+            done.append("checkpoint" if not busy else "checkpoint busy (readers open)")
+
+    return {"success": True, "done": done}, "Maintenance: " + ", ".join(done)
+
+
+def cmd_sync(api, args):
+    done = []
+    if args.site:
+        done.append(call(api, "set_site_name", {"site": args.site})["message"])
+    for path in args.import_files or []:
+        done.append(call(api, "import_changes", {"path": path})["message"])
+    if args.export:
+        done.append(call(api, "export_changes", {"peer": args.export, "path": args.out})["message"])
+
+    res = call(api, "get_sync_status")
+    status = res["sync"]
+    if not done:
+        pending = ", ".join(f"{peer}: {n}" for peer, n in status["pending"].items()) or "no peers yet"
+        done.append(f"site {status['site']}, {status['changes']} logged change(s); pending {pending}")
+    return res, "; ".join(done)
+
+
+# -------------------------------
+# ARGUMENTS
+# -------------------------------
+def add_range(parser):
+    parser.add_argument("--period", choices=PERIODS, help="named range relative to today")
+    parser.add_argument("--start", help="first day (YYYY-MM-DD)")
+    parser.add_argument("--end", help="last day (YYYY-MM-DD)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="cli.py", description="Shree Ganesh Dairy – headless batch commands"
+    )
+    parser.add_argument("--db", help="database file (default: DAIRY_DB or database.db)")
+    parser.add_argument("--json", action="store_true", help="print the raw Api response")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("bills", help="bill run: summary CSV, or --render all bills to HTML")
+    add_range(p)
+    p.add_argument("--type", choices=("weekly", "monthly"))
+    p.add_argument("--render", action="store_true", help="one printable page per farmer")
+    p.add_argument("--include-empty", action="store_true")
+    p.add_argument("--out", help="output file")
+    p.set_defaults(handler=cmd_bills, needs="api")
+
+    p = sub.add_parser("report", help="milk report CSV export")
+    add_range(p)
+    p.add_argument("--shift", default="all")
+    p.add_argument("--out", help="output CSV file")
+    p.set_defaults(handler=cmd_report, needs="api")
+
+    p = sub.add_parser("summary", help="day summary, or range totals with --period/--start/--end")
+    add_range(p)
+    p.add_argument("--date", help="day for the daily summary (default today)")
+    p.add_argument("--shift")
+    p.set_defaults(handler=cmd_summary, needs="api")
+
+    p = sub.add_parser("backup", help="online, verified copy of the database")
+    p.add_argument("--out", help="one-off copy to this file (default: a new generation in backups/)")
+    p.add_argument("--keep", type=int, help="generations kept in backups/ (default 7)")
+    p.set_defaults(handler=cmd_backup, needs="main")
+
+    p = sub.add_parser("maintenance", help="migrate, check and tidy the database")
+    p.add_argument("--integrity", action="store_true", help="PRAGMA integrity_check")
+    p.add_argument("--analyze", action="store_true", help="refresh planner statistics")
+    p.add_argument("--optimize", action="store_true", help="PRAGMA optimize")
+    p.add_argument("--archive", type=int, metavar="YEAR", help="archive a closed financial year")
+    p.add_argument("--vacuum", action="store_true", help="rebuild the file to reclaim space")
+    p.add_argument("--checkpoint", action="store_true", help="fold the WAL back into the database")
+    p.set_defaults(handler=cmd_maintenance, needs="main")
+
+    p = sub.add_parser("sync", help="delta files for the other collection centres")
+    p.add_argument("--site", help="name this database's site (once, before first export)")
+    p.add_argument("--import", dest="import_files", nargs="+", metavar="FILE",
+                   help="apply delta files received from other sites")
+    p.add_argument("--export", metavar="PEER", help="write changes PEER has not acknowledged")
+    p.add_argument("--out", help="delta file for --export (default sync/<site>_to_<peer>_<time>.delta.gz)")
+    p.set_defaults(handler=cmd_sync, needs="api")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.db:
+        os.environ["DAIRY_DB"] = args.db
+
+    # main reads DAIRY_DB at import; it imports no GUI modules
+    import main as app
+
+    if not os.path.exists(app.DB):
+        print(f"❌ Database not found: {app.DB} (run create_db.py first)")
+        return 1
+
+    try:
+        if args.needs == "api":
+            with app.db.exclusive() as conn:
+                app.migrate(conn, verbose=False)
+            response, text = args.handler(app.Api(), args)
+        else:
+            response, text = args.handler(app, args)
+    except SystemExit as e:
+        if isinstance(e.code, str):
+            print(e.code)
+            return 1
+        return e.code or 0
+    finally:
+        app.jobs.shutdown()
+        app.db.close()
+
+    print(json.dumps(response, indent=2) if args.json else f"✅ {text}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
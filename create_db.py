@@ -12,180 +12,195 @@ This script creates all required tables:
 - farmer_advances
 - sales_records
 
-Run once before launching the main application.
+Run once before launching the main application. Schema changes after
+the base tables are applied by migrations.py.
 """
 
 import sqlite3
 from datetime import date
 
+from migrations import migrate
+
 DB_PATH = "database.db"
 
 # -------------------------------
 # DATABASE CONNECTION
 # -------------------------------
 
-conn = sqlite3.connect(DB_PATH)
-c = conn.cursor()
 
-# -------------------------------
-# USERS TABLE
-# -------------------------------
+def create_database(db_path=DB_PATH, seed_demo=True, verbose=True):
+    """Create missing tables, seed defaults and apply migrations."""
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+
+    # -------------------------------
+    # USERS TABLE
+    # -------------------------------
 
-c.execute(
+    c.execute(
+        """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL
+    )
     """
-CREATE TABLE IF NOT EXISTS users (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    username TEXT UNIQUE NOT NULL,
-    password TEXT NOT NULL
-)
-"""
-)
+    )
 
-# Default admin user
-c.execute(
-    "INSERT OR IGNORE INTO users (username, password) VALUES (?, ?)",
-    ("admin", "12345"),
-)
+    # Default admin user
+    c.execute(
+        "INSERT OR IGNORE INTO users (username, password) VALUES (?, ?)",
+        ("admin", "12345"),
+    )
 
-# -------------------------------
-# FARMERS TABLE
-# -------------------------------
+    # -------------------------------
+    # FARMERS TABLE
+    # -------------------------------
 
-c.execute(
-    """
-CREATE TABLE IF NOT EXISTS farmers (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    code TEXT UNIQUE NOT NULL,
-    name TEXT NOT NULL,
-    category TEXT
-)
-"""
-)
-
-# Seed demo farmers (optional)
-sample_farmers = [
-    ("F001", "Suresh Patil", "A"),
-    ("F002", "Ramesh Gaikwad", "B"),
-    ("F003", "Maya Chavan", "C"),
-]
-for code, name, cat in sample_farmers:
     c.execute(
-        "INSERT OR IGNORE INTO farmers (code, name, category) VALUES (?, ?, ?)",
-        (code, name, cat),
+        """
+    CREATE TABLE IF NOT EXISTS farmers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        code TEXT UNIQUE NOT NULL,
+        name TEXT NOT NULL,
+        category TEXT
+    )
+    """
     )
 
-# -------------------------------
-# MILK RECORDS TABLE
-# -------------------------------
+    # Seed demo farmers (optional)
+    sample_farmers = [
+        ("F001", "Suresh Patil", "A"),
+        ("F002", "Ramesh Gaikwad", "B"),
+        ("F003", "Maya Chavan", "C"),
+    ]
+    if not seed_demo:
+        sample_farmers = []
+    for code, name, cat in sample_farmers:
+        c.execute(
+            "INSERT OR IGNORE INTO farmers (code, name, category) VALUES (?, ?, ?)",
+            (code, name, cat),
+        )
+
+    # -------------------------------
+    # MILK RECORDS TABLE
+    # -------------------------------
 
-c.execute(
+    c.execute(
+        """
+    CREATE TABLE IF NOT EXISTS milk_records (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        rec_date TEXT NOT NULL,
+        farmer_code TEXT,
+        farmer_name TEXT,
+        category TEXT,
+        shift TEXT,
+        litres REAL DEFAULT 0,
+        fat REAL DEFAULT 0,
+        snf REAL DEFAULT 0,
+        rate REAL DEFAULT 0,
+        amount REAL DEFAULT 0,
+        created_at TEXT DEFAULT (datetime('now','localtime'))
+    )
     """
-CREATE TABLE IF NOT EXISTS milk_records (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    rec_date TEXT NOT NULL,
-    farmer_code TEXT,
-    farmer_name TEXT,
-    category TEXT,
-    shift TEXT,
-    litres REAL DEFAULT 0,
-    fat REAL DEFAULT 0,
-    snf REAL DEFAULT 0,
-    rate REAL DEFAULT 0,
-    amount REAL DEFAULT 0,
-    created_at TEXT DEFAULT (datetime('now','localtime'))
-)
-"""
-)
+    )
 
-# -------------------------------
-# SHIFT TRACKER TABLE
-# -------------------------------
+    # -------------------------------
+    # SHIFT TRACKER TABLE
+    # -------------------------------
 
-c.execute(
+    c.execute(
+        """
+    CREATE TABLE IF NOT EXISTS shift_tracker (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        current_shift TEXT DEFAULT 'Morning',
+        current_date TEXT DEFAULT (date('now'))
+    )
     """
-CREATE TABLE IF NOT EXISTS shift_tracker (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    current_shift TEXT DEFAULT 'Morning',
-    current_date TEXT DEFAULT (date('now'))
-)
-"""
-)
+    )
 
-# Seed default shift record
-c.execute(
+    # Seed default shift record
+    c.execute(
+        """
+    INSERT OR IGNORE INTO shift_tracker (id, current_shift, current_date)
+    VALUES (1, 'Morning', date('now'))
     """
-INSERT OR IGNORE INTO shift_tracker (id, current_shift, current_date)
-VALUES (1, 'Morning', date('now'))
-"""
-)
+    )
 
-# -------------------------------
-# RATE TABLE (Base + Fat + SNF Formula)
-# -------------------------------
+    # -------------------------------
+    # RATE TABLE (Base + Fat + SNF Formula)
+    # -------------------------------
 
-c.execute(
-    """
-CREATE TABLE IF NOT EXISTS rate_table (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    category TEXT UNIQUE NOT NULL,
-    base REAL DEFAULT 0,
-    fat_rate REAL DEFAULT 0,
-    snf_rate REAL DEFAULT 0
-)
-"""
-)
-
-# Default rate formulas
-default_rates = [
-    ("Cow", 20.0, 5.0, 3.0),
-    ("Buffalo", 25.0, 6.5, 3.5),
-]
-for cat, base, fat_rate, snf_rate in default_rates:
     c.execute(
-        """INSERT OR IGNORE INTO rate_table (category, base, fat_rate, snf_rate)
-           VALUES (?, ?, ?, ?)""",
-        (cat, base, fat_rate, snf_rate),
+        """
+    CREATE TABLE IF NOT EXISTS rate_table (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        category TEXT UNIQUE NOT NULL,
+        base REAL DEFAULT 0,
+        fat_rate REAL DEFAULT 0,
+        snf_rate REAL DEFAULT 0
+    )
+    """
     )
 
-# -------------------------------
-# FARMER ADVANCES TABLE
-# -------------------------------
+    # Default rate formulas
+    default_rates = [
+        ("Cow", 20.0, 5.0, 3.0),
+        ("Buffalo", 25.0, 6.5, 3.5),
+    ]
+    for cat, base, fat_rate, snf_rate in default_rates:
+        c.execute(
+            """INSERT OR IGNORE INTO rate_table (category, base, fat_rate, snf_rate)
+               VALUES (?, ?, ?, ?)""",
+            (cat, base, fat_rate, snf_rate),
+        )
+
+    # -------------------------------
+    # FARMER ADVANCES TABLE
+    # -------------------------------
 
-c.execute(
+    c.execute(
+        """
+    CREATE TABLE IF NOT EXISTS farmer_advances (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        farmer_code TEXT,
+        date TEXT,
+        amount REAL DEFAULT 0,
+        remarks TEXT
+    )
     """
-CREATE TABLE IF NOT EXISTS farmer_advances (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    farmer_code TEXT,
-    date TEXT,
-    amount REAL DEFAULT 0,
-    remarks TEXT
-)
-"""
-)
+    )
 
-# -------------------------------
-# MILK SALES TABLE
-# -------------------------------
+    # -------------------------------
+    # MILK SALES TABLE
+    # -------------------------------
 
-c.execute(
+    c.execute(
+        """
+    CREATE TABLE IF NOT EXISTS sales_records (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        sale_date TEXT,
+        customer TEXT,
+        litres REAL DEFAULT 0,
+        rate REAL DEFAULT 0,
+        amount REAL DEFAULT 0
+    )
     """
-CREATE TABLE IF NOT EXISTS sales_records (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    sale_date TEXT,
-    customer TEXT,
-    litres REAL DEFAULT 0,
-    rate REAL DEFAULT 0,
-    amount REAL DEFAULT 0
-)
-"""
-)
+    )
 
-# -------------------------------
-# FINALIZE
-# -------------------------------
+    # -------------------------------
+    # FINALIZE
+    # -------------------------------
+
+    conn.commit()
+
+    # Indexes and later schema changes (tracked in PRAGMA user_version)
+    migrate(conn, verbose=verbose)
+
+    conn.close()
 
-conn.commit()
-conn.close()
 
-print("✅ Database created/updated successfully.")
-print("🔑 Default admin credentials: username='admin', password='12345'")
+if __name__ == "__main__":
+    create_database()
+    print("✅ Database created/updated successfully.")
+    print("🔑 Default admin credentials: username='admin', password='12345'")
@@ -0,0 +1,273 @@
+"""
+db.py
+-----
+Shared SQLite connection manager for Shree Ganesh Dairy Management System.
+
+Instead of opening database.db on every Api call, the app keeps:
+- a small pool of read connections, borrowed for one read() and handed back
+- one writer connection, guarded by a lock, used for every INSERT/UPDATE/DELETE
+
+The pool is bounded, so pywebview (which runs every js_api call on a
+fresh thread) never piles up connections and file handles; a read()
+nested in another on the same thread reuses the connection it holds.
+
+All connections run in WAL mode so readers never block the writer and
+the writer never blocks readers. Page cache, mmap and fsync behaviour
+come from a named PRAGMA profile which can be tweaked per machine.
+"""
+
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DB_PATH = "database.db"
+
+# -------------------------------
+# PRAGMA PROFILES
+# -------------------------------
+# cache_size is negative = KiB (SQLite convention), mmap_size is bytes.
+
+PROFILES = {
+    # Low-end counter PCs: small cache, no mmap, full durability.
+    "safe": {
+        "cache_size": -8000,
+        "mmap_size": 0,
+        "synchronous": "FULL",
+    },
+    # Default: WAL + NORMAL is durable across app crashes and fast.
+    "balanced": {
+        "cache_size": -32000,
+        "mmap_size": 128 * 1024 * 1024,
+        "synchronous": "NORMAL",
+    },
+    # Office machine doing month-end reports on a large database.
+    "fast": {
+        "cache_size": -128000,
+        "mmap_size": 512 * 1024 * 1024,
+        "synchronous": "NORMAL",
+    },
+}
+
+DEFAULT_PROFILE = "balanced"
+
+# Read connections kept open at most; further concurrent reads wait for one
+DEFAULT_READERS = 8
+
+
+class Database:
+    """A bounded pool of readers plus a single serialized writer over one SQLite file."""
+
+    def __init__(
+        self,
+        path=DB_PATH,
+        profile=DEFAULT_PROFILE,
+        cursor_factory=sqlite3.Cursor,
+        readers=DEFAULT_READERS,
+        **pragmas,
+    ):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown database profile: {profile}")
+        self.path = path
+        self.profile = profile
+        self.pragmas = dict(PROFILES[profile])
+        self.pragmas.update(pragmas)
+        # read()/write() cursors are created with this (metrics.MetricsCursor times them)
+        self.cursor_factory = cursor_factory
+
+        self._local = threading.local()
+        self.max_readers = max(1, int(readers))
+        self._readers = []  # every read connection opened, idle or borrowed
+        self._idle = queue.LifoQueue()
+        self._readers_lock = threading.Lock()
+        self._writer = None
+        self._write_lock = threading.RLock()
+        self._data_version = None
+        self._external = 0
+
+    # -------------------------------
+    # CONNECTIONS
+    # -------------------------------
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        conn.isolation_level = None  # explicit BEGIN/COMMIT only
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA busy_timeout=10000")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA synchronous={self.pragmas['synchronous']}")
+        conn.execute(f"PRAGMA cache_size={int(self.pragmas['cache_size'])}")
+        conn.execute(f"PRAGMA mmap_size={int(self.pragmas['mmap_size'])}")
+        return conn
+
+    def _borrow(self):
+        """Take an idle read connection, opening one while under max_readers."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._readers_lock:
+            if len(self._readers) < self.max_readers:
+                conn = self._connect()
+                conn.execute("PRAGMA query_only=ON")
+                self._readers.append(conn)
+                return conn
+        return self._idle.get(timeout=30)
+
+    def _give_back(self, conn):
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        with self._readers_lock:
+            if conn not in self._readers:  # closed while borrowed
+                conn.close()
+                return
+        self._idle.put(conn)
+
+    @contextmanager
+    def reader(self):
+        """Yield a read connection from the pool for the duration of the block."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+        conn = self._borrow()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._give_back(conn)
+
+    def writer(self):
+        """Return the shared writer connection (callers must hold the write lock)."""
+        if self._writer is None:
+            self._writer = self._connect()
+        return self._writer
+
+    def external_version(self):
+        """
+        Counter that moves when another connection or process commits.
+
+        Polls PRAGMA data_version on the writer, which this process's own
+        commits leave unchanged (readers never commit). While another
+        thread is writing the last value is returned; the next call
+        catches up.
+        """
+        if self._write_lock.acquire(blocking=False):
+            try:
+                version = self.writer().execute("PRAGMA data_version").fetchone()[0]
+                if self._data_version is not None and version != self._data_version:
+                    self._external += 1
+                self._data_version = version
+            finally:
+                self._write_lock.release()
+        return self._external
+
+    # -------------------------------
+    # CONTEXT MANAGERS
+    # -------------------------------
+    @contextmanager
+    def read(self):
+        """Yield a cursor on a pooled read connection."""
+        with self.reader() as conn:
+            c = conn.cursor(self.cursor_factory)
+            try:
+                yield c
+            finally:
+                c.close()
+
+    @contextmanager
+    def write(self):
+        """Yield a cursor inside one write transaction; commit or roll back on exit."""
+        with self._write_lock:
+            conn = self.writer()
+            if conn.in_transaction:
+                # Nested write() on the same thread joins the outer transaction
+                # inside a savepoint, so a failed inner write undoes only itself.
+                c = conn.cursor(self.cursor_factory)
+                c.execute("SAVEPOINT nested_write")
+                try:
+                    yield c
+                    c.execute("RELEASE nested_write")
+                except BaseException:
+                    c.execute("ROLLBACK TO nested_write")
+                    c.execute("RELEASE nested_write")
+                    raise
+                finally:
+                    c.close()
+                return
+
+        with self.transaction() as conn:
+            c = conn.cursor(self.cursor_factory)
+            try:
+                yield c
+            finally:
+                c.close()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Yield the writer connection inside BEGIN IMMEDIATE ... COMMIT
+        (rolled back on error), running after_commit() callbacks once the
+        COMMIT succeeds. write() and the LAN write queue's group commit
+        both go through here.
+        """
+        with self._write_lock:
+            conn = self.writer()
+            conn.execute("BEGIN IMMEDIATE")
+            self._local.pending = []
+            try:
+                try:
+                    yield conn
+                    conn.execute("COMMIT")
+                except BaseException:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    raise
+                callbacks = self._local.pending
+            finally:
+                self._local.pending = None
+            for fn, args in callbacks:
+                try:
+                    fn(*args)
+                except Exception as e:
+                    print("after_commit error:", e)
+
+    def after_commit(self, fn, *args):
+        """
+        Run fn(*args) once this thread's transaction commits, or now when
+        there is none. Dropped if the transaction rolls back, so in-memory
+        state (farmer directory, rate engine, response cache) only ever
+        follows committed data.
+        """
+        pending = getattr(self._local, "pending", None)
+        if pending is None:
+            fn(*args)
+        else:
+            pending.append((fn, args))
+
+    @contextmanager
+    def exclusive(self):
+        """Yield the raw writer connection under the write lock, with no open transaction.
+
+        For maintenance work that manages its own transactions (migrations,
+        ANALYZE, VACUUM, backups).
+        """
+        with self._write_lock:
+            yield self.writer()
+
+    def close(self):
+        """Close every connection this manager has opened."""
+        with self._readers_lock:
+            for conn in self._readers:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._readers.clear()
+        self._idle = queue.LifoQueue()
+        self._local = threading.local()
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            self._data_version = None
@@ -0,0 +1,136 @@
+"""
+farmers.py
+----------
+In-memory farmer directory for Shree Ganesh Dairy Management System.
+
+The farmers table is small and read on every save and every keystroke
+of the entry form, so it is loaded once and kept in sync by the Api's
+farmer writes (add / update / delete), and reloaded when another
+process has written to the database (Database.external_version). It offers:
+- get(code): code -> farmer, ignoring case and surrounding spaces
+- search(prefix): code and name prefix matches for autocomplete, using
+  sorted key lists and bisect (each word of a name is indexed too, so
+  "pat" finds "Suresh Patil")
+"""
+
+import threading
+from bisect import bisect_left, insort
+
+DEFAULT_LIMIT = 10
+
+
+def _key(text):
+    return (text or "").strip().casefold()
+
+
+class FarmerDirectory:
+    def __init__(self, db):
+        self.db = db
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._version = None  # db.external_version() when loaded
+        self._by_code = {}  # code key -> farmer dict
+        self._index = []  # sorted (search key, code key)
+
+    # -------------------------------
+    # LOADING / SYNC
+    # -------------------------------
+    def _ensure_loaded(self):
+        version = self.db.external_version()
+        if self._loaded and version == self._version:
+            return
+        with self._lock:
+            if self._loaded and version == self._version:
+                return
+            with self.db.read() as c:
+                c.execute("SELECT id, code, name, category FROM farmers")
+                rows = c.fetchall()
+            self._by_code = {}
+            self._index = []
+            for farmer_id, code, name, category in rows:
+                farmer = {"id": farmer_id, "code": code, "name": name, "category": category}
+                self._by_code[_key(code)] = farmer
+                self._index.extend(self._keys(farmer))
+            self._index.sort()
+            self._version = version
+            self._loaded = True
+
+    @staticmethod
+    def _keys(farmer):
+        code = _key(farmer["code"])
+        name = _key(farmer["name"])
+        keys = {code, name, *name.split()}
+        keys.discard("")
+        return [(k, code) for k in keys]
+
+    def put(self, farmer):
+        """Add or replace one farmer (call after the database write commits)."""
+        with self._lock:
+            if not self._loaded:
+                return  # picked up by the first load
+            self.remove(farmer["code"])
+            self._by_code[_key(farmer["code"])] = dict(farmer)
+            for entry in self._keys(farmer):
+                insort(self._index, entry)
+
+    def remove(self, code):
+        with self._lock:
+            if not self._loaded:
+                return
+            farmer = self._by_code.pop(_key(code), None)
+            if farmer is None:
+                return
+            for entry in self._keys(farmer):
+                i = bisect_left(self._index, entry)
+                if i < len(self._index) and self._index[i] == entry:
+                    del self._index[i]
+
+    def reload(self):
+        with self._lock:
+            self._loaded = False
+            self._ensure_loaded()
+
+    # -------------------------------
+    # LOOKUPS
+    # -------------------------------
+    def get(self, code):
+        """Farmer dict for a code, or None."""
+        self._ensure_loaded()
+        return self._by_code.get(_key(code))
+
+    def get_by_id(self, farmer_id):
+        self._ensure_loaded()
+        for farmer in self._by_code.values():
+            if farmer["id"] == farmer_id:
+                return farmer
+        return None
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self._by_code)
+
+    def search(self, prefix, limit=DEFAULT_LIMIT):
+        """Farmers whose code, name or a name word starts with prefix (exact code first)."""
+        self._ensure_loaded()
+        prefix = _key(prefix)
+        if not prefix:
+            return []
+
+        with self._lock:
+            found = []
+            seen = set()
+            exact = self._by_code.get(prefix)
+            if exact is not None:
+                found.append(exact)
+                seen.add(prefix)
+
+            i = bisect_left(self._index, (prefix,))
+            while i < len(self._index) and len(found) < limit:
+                key, code = self._index[i]
+                if not key.startswith(prefix):
+                    break
+                if code not in seen:
+                    seen.add(code)
+                    found.append(self._by_code[code])
+                i += 1
+        return found
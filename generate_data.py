@@ -0,0 +1,197 @@
+"""
+generate_data.py
+----------------
+Synthetic data generator for Shree Ganesh Dairy Management System.
+
+Builds a database at realistic scale so screens can be measured before
+the membership grows into them:
+- N farmers (Cow / Buffalo)
+- years of twice-daily milk_records (most farmers deliver most shifts)
+- monthly-ish farmer_advances and daily sales_records
+
+The same --seed always produces the same database, so benchmark runs
+are comparable.
+
+Usage:
+    python generate_data.py --db bench.db --farmers 1500 --years 3
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+
+from create_db import create_database
+
+FIRST_NAMES = [
+    "Suresh", "Ramesh", "Maya", "Sunita", "Ganesh", "Vijay", "Anita", "Prakash",
+    "Sanjay", "Lata", "Mahesh", "Kavita", "Dattatray", "Shivaji", "Rekha", "Balu",
+]
+LAST_NAMES = [
+    "Patil", "Gaikwad", "Chavan", "Jadhav", "Pawar", "Shinde", "More", "Kale",
+    "Deshmukh", "Nalawade", "Kadam", "Salunkhe", "Mane", "Bhosale", "Thorat",
+]
+REMARKS = [
+    "cattle feed", "tractor repair", "medical", "school fees", "seed purchase",
+    "festival", "fodder", "vet visit", "loan",
+]
+CUSTOMERS = ["Hotel Sai", "Local sale", "Sweet Mart", "Tea stall", "Retail counter"]
+
+# category -> (base, fat_rate, snf_rate, litres range, fat range, snf range)
+PROFILES = {
+    "Cow": (20.0, 5.0, 3.0, (2.0, 15.0), (3.2, 5.0), (8.0, 9.0)),
+    "Buffalo": (25.0, 6.5, 3.5, (2.0, 12.0), (5.5, 8.0), (8.5, 9.5)),
+}
+
+# Rows per executemany / commit
+BATCH = 20000
+
+
+def _farmers(rng, count):
+    for i in range(1, count + 1):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        category = "Buffalo" if rng.random() < 0.35 else "Cow"
+        yield (f"F{i:04d}", name, category)
+
+
+def _milk_rows(rng, farmers, start, days, attendance):
+    for d in range(days):
+        day = (start + timedelta(days=d)).isoformat()
+        for shift in ("Morning", "Evening"):
+            for code, name, category in farmers:
+                if rng.random() > attendance:
+                    continue
+                base, fat_rate, snf_rate, litres_r, fat_r, snf_r = PROFILES[category]
+                litres = round(rng.uniform(*litres_r), 1)
+                fat = round(rng.uniform(*fat_r), 1)
+                snf = round(rng.uniform(*snf_r), 1)
+                rate = round(base + fat * fat_rate + snf * snf_rate, 2)
+                yield (day, code, name, category, shift, litres, fat, snf, rate,
+                       round(litres * rate, 2))
+
+
+def _insert(conn, sql, rows):
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH:
+            conn.executemany(sql, batch)
+            conn.commit()
+            count += len(batch)
+            batch = []
+    if batch:
+        conn.executemany(sql, batch)
+        conn.commit()
+        count += len(batch)
+    return count
+
+
+def generate(db_path, farmers=300, years=3, end=None, attendance=0.9,
+             advances_per_month=0.5, sales_per_day=4, seed=42, verbose=True):
+    """Create db_path from scratch and fill it. Returns row counts per table."""
+    if os.path.exists(db_path):
+        raise FileExistsError(f"{db_path} already exists; pick a new path")
+
+    rng = random.Random(seed)
+    end = end or date.today()
+    days = int(365 * years)
+    start = end - timedelta(days=days - 1)
+
+    create_database(db_path, seed_demo=False, verbose=False)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+
+    started = time.perf_counter()
+    counts = {}
+
+    farmer_rows = list(_farmers(rng, farmers))
+    counts["farmers"] = _insert(
+        conn, "INSERT INTO farmers (code, name, category) VALUES (?, ?, ?)", farmer_rows
+    )
+
+    counts["milk_records"] = _insert(
+        conn,
+        """INSERT INTO milk_records
+           (rec_date, farmer_code, farmer_name, category, shift, litres, fat, snf, rate, amount)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        _milk_rows(rng, farmer_rows, start, days, attendance),
+    )
+
+    months = max(1, days // 30)
+    advances = (
+        (
+            code,
+            (start + timedelta(days=rng.randrange(days))).isoformat(),
+            float(rng.choice([500, 1000, 1500, 2000, 5000])),
+            rng.choice(REMARKS),
+        )
+        for code, _, _ in farmer_rows
+        for _ in range(int(months * advances_per_month))
+    )
+    counts["farmer_advances"] = _insert(
+        conn,
+        "INSERT INTO farmer_advances (farmer_code, date, amount, remarks) VALUES (?, ?, ?, ?)",
+        advances,
+    )
+
+    sales = (
+        (
+            (start + timedelta(days=d)).isoformat(),
+            rng.choice(CUSTOMERS),
+            litres,
+            60.0,
+            litres * 60.0,
+        )
+        for d in range(days)
+        for litres in [float(rng.randint(5, 80)) for _ in range(sales_per_day)]
+    )
+    counts["sales_records"] = _insert(
+        conn,
+        "INSERT INTO sales_records (sale_date, customer, litres, rate, amount) VALUES (?, ?, ?, ?, ?)",
+        sales,
+    )
+
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+
+    if verbose:
+        elapsed = time.perf_counter() - started
+        print(f"✅ Generated {db_path} ({start} → {end}) in {elapsed:.1f}s")
+        for table, count in counts.items():
+            print(f"   {table:<16} {count:>10,}")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic dairy database")
+    parser.add_argument("--db", default="bench.db", help="output database (must not exist)")
+    parser.add_argument("--farmers", type=int, default=300)
+    parser.add_argument("--years", type=float, default=3)
+    parser.add_argument("--end", type=date.fromisoformat, default=None,
+                        help="last collection date (YYYY-MM-DD, default today)")
+    parser.add_argument("--attendance", type=float, default=0.9,
+                        help="chance a farmer delivers in a given shift")
+    parser.add_argument("--advances-per-month", type=float, default=0.5)
+    parser.add_argument("--sales-per-day", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    generate(
+        args.db,
+        farmers=args.farmers,
+        years=args.years,
+        end=args.end,
+        attendance=args.attendance,
+        advances_per_month=args.advances_per_month,
+        sales_per_day=args.sales_per_day,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    main()
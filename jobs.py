@@ -0,0 +1,181 @@
+"""
+jobs.py
+-------
+Background job runner for long Api calls (bill runs, long reports,
+exports) in Shree Ganesh Dairy Management System.
+
+A job is submitted to a small worker thread pool and gets an id right
+away; the dashboard polls get_job for status/progress, then fetches
+the result. Long loops call report_progress(), which updates the
+running job and is where a cancel request takes effect. Outside a job
+report_progress() does nothing, so the same code runs synchronously too.
+
+Api methods report errors by returning {"success": false, ...} rather
+than raising, so a job whose result says so ends as failed too.
+"""
+
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED = (DONE, FAILED, CANCELLED)
+
+# Finished jobs kept for polling before the oldest are dropped
+KEEP_FINISHED = 50
+
+_current = threading.local()
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's work when cancel_job() was called for it."""
+
+
+class Job:
+    def __init__(self, name):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.status = QUEUED
+        self.done = 0
+        self.total = None
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.cancel_requested = False
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+
+    def info(self):
+        """JSON-safe snapshot for the dashboard."""
+        progress = None
+        if self.status == DONE:
+            progress = 1.0
+        elif self.total:
+            progress = min(1.0, self.done / self.total)
+        end = self.finished_at or time.time()
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "done": self.done,
+            "total": self.total,
+            "progress": progress,
+            "message": self.message,
+            "error": self.error,
+            "elapsed": round(end - (self.started_at or end), 3),
+        }
+
+
+def report_progress(done, total=None, message=None):
+    """Update the calling job's progress; raises JobCancelled if it was cancelled."""
+    job = getattr(_current, "job", None)
+    if job is None:
+        return
+    if job.cancel_requested:
+        raise JobCancelled(f"Job {job.name} cancelled")
+    job.done = done
+    if total is not None:
+        job.total = total
+    if message is not None:
+        job.message = message
+
+
+def _failure(result):
+    """Message of an Api response reporting failure, else None."""
+    if not (isinstance(result, str) and result.startswith('{"success": false')):
+        return None
+    try:
+        return json.loads(result).get("message") or "Failed"
+    except ValueError:
+        return "Failed"
+
+
+class JobRunner:
+    def __init__(self, max_workers=2):
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="dairy-job"
+        )
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    # -------------------------------
+    # SUBMIT / RUN
+    # -------------------------------
+    def submit(self, name, fn, *args, **kwargs):
+        job = Job(name)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        job.future = self._pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancel_requested:
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+        _current.job = job
+        try:
+            job.result = fn(*args, **kwargs)
+            error = _failure(job.result)
+            if job.cancel_requested:
+                job.status = CANCELLED
+            elif error is not None:
+                job.error = error
+                job.status = FAILED
+            else:
+                job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            _current.job = None
+            job.finished_at = time.time()
+
+    def _prune(self):
+        finished = [j for j in self._jobs.values() if j.status in FINISHED]
+        if len(finished) > KEEP_FINISHED:
+            finished.sort(key=lambda j: j.finished_at or 0)
+            for job in finished[: len(finished) - KEEP_FINISHED]:
+                del self._jobs[job.id]
+
+    # -------------------------------
+    # QUERY / CANCEL
+    # -------------------------------
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return sorted(jobs, key=lambda j: j.created_at, reverse=True)
+
+    def cancel(self, job_id):
+        """Request cancellation; queued jobs never start, running ones stop at their next progress report."""
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED:
+            return False
+        job.cancel_requested = True
+        if job.future is not None and job.future.cancel():
+            job.status = CANCELLED
+            job.finished_at = time.time()
+        return True
+
+    def shutdown(self):
+        for job in self.list():
+            self.cancel(job.id)
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,67 @@
+"""
+ledger.py
+---------
+Farmer balance ledger for Shree Ganesh Dairy Management System.
+
+farmer_ledger holds one row per (farmer, day) with that day's milk
+litres / amount, advances and payments plus the farmer's closing
+balance after the day. Triggers on milk records (milk_entries since
+v8), farmer_advances and farmer_payments (migration v6) keep it up to
+date on every write:
+the day's row is adjusted and, for back-dated entries only, the
+closing balance of the farmer's later days is shifted.
+
+balance = milk amount earned - advances given - payments made
+
+so the outstanding balance, or the balance on any date, is the
+closing of the farmer's latest row on or before that date: one index
+seek, never a re-sum of raw records.
+"""
+
+from contextlib import contextmanager
+
+LEDGER_COLUMNS = ["day", "litres", "milk", "advance", "payment", "closing"]
+
+
+def balance_as_of(c, farmer_code, day=None, before=False):
+    """
+    Farmer's balance at the end of day (latest when day is None).
+    before=True gives the balance just before day starts (a period's opening).
+    """
+    if day:
+        c.execute(
+            f"SELECT closing FROM farmer_ledger WHERE farmer_code=? AND day {'<' if before else '<='} ? "
+            "ORDER BY day DESC LIMIT 1",
+            (farmer_code, day),
+        )
+    else:
+        c.execute(
+            "SELECT closing FROM farmer_ledger WHERE farmer_code=? ORDER BY day DESC LIMIT 1",
+            (farmer_code,),
+        )
+    row = c.fetchone()
+    return row[0] if row else 0.0
+
+
+def closing_sql(code_expr, before=False):
+    """Correlated subquery: balance of code_expr at the end of (or before) a ? day."""
+    return (
+        f"IFNULL((SELECT l.closing FROM farmer_ledger l WHERE l.farmer_code = {code_expr} "
+        f"AND l.day {'<' if before else '<='} ? ORDER BY l.day DESC LIMIT 1), 0)"
+    )
+
+
+@contextmanager
+def paused(c):
+    """
+    Suspend the ledger triggers inside the caller's write transaction.
+
+    Used when rows leave the live tables without changing what a farmer
+    is owed (archiving a closed year).
+    """
+    c.execute("INSERT INTO ledger_pause (id) VALUES (1)")
+    try:
+        yield
+    finally:
+        c.execute("DELETE FROM ledger_pause")
+
@@ -1,15 +1,26 @@
 import os
+import re
 import sys
 import json
 import sqlite3
-import threading
 import time
-import base64
 from datetime import datetime
-from tkinter import filedialog
-import tkinter as tk
-import webview
-import shutil
+
+from archive import Archive, source as archive_source
+from backup import DEFAULT_INTERVAL_HOURS, KEEP as BACKUP_KEEP, BackupManager, BackupScheduler
+from bills import bill_totals, collect_bills, render_bundle
+from cache import ResponseCache, cached
+from db import Database, DEFAULT_PROFILE, DEFAULT_READERS
+from farmers import FarmerDirectory
+from jobs import FINISHED as JOB_FINISHED, JobRunner
+from ledger import LEDGER_COLUMNS, balance_as_of, closing_sql
+from metrics import DEFAULT_SLOW_MS, Metrics, cursor_class, instrument
+from migrations import migrate
+from rates import EPOCH as RATE_EPOCH, RateEngine, sync_current_rate
+from records import FARMER_ID_SQL, SHIFT_ID_SQL, milk_source, to_day
+from reports import export_csv, report_query
+from search import SearchError, search as run_search
+from sync import Sync
 
 # ================================================================
 #  DATABASE HANDLER — ensures correct DB copy for packaged .exe
@@ -47,10 +58,116 @@ import shutil
 #     except Exception as e:
 #         print(" Error copying database:", e)
 
-DB = "database.db"
-
-# Threading lock for SQLite
-lock = threading.Lock()
+# DAIRY_DB lets tools (benchmarks, nightly jobs) point the Api at another file
+DB = os.environ.get("DAIRY_DB", "database.db")
+
+# Per-method / per-statement timings (DAIRY_METRICS=0 turns them off)
+metrics = Metrics(
+    slow_ms=float(os.environ.get("DAIRY_SLOW_QUERY_MS", DEFAULT_SLOW_MS)),
+    enabled=os.environ.get("DAIRY_METRICS", "1") != "0",
+)
+
+# Shared connection manager (pooled readers + one writer, WAL mode)
+db = Database(
+    DB,
+    profile=os.environ.get("DAIRY_DB_PROFILE", DEFAULT_PROFILE),
+    readers=int(os.environ.get("DAIRY_READERS", DEFAULT_READERS)),
+    cursor_factory=cursor_class(metrics) if metrics.enabled else sqlite3.Cursor,
+)
+
+# Closed financial years moved out to archive/dairy_fy<year>.db
+archive = Archive(db)
+
+# Verified online copies in backups/, taken in the background while the app runs
+# (DAIRY_BACKUP_HOURS=0 turns the schedule off)
+backups = BackupManager(DB, keep=int(os.environ.get("DAIRY_BACKUP_KEEP", BACKUP_KEEP)))
+backup_scheduler = BackupScheduler(
+    backups, interval_hours=float(os.environ.get("DAIRY_BACKUP_HOURS", DEFAULT_INTERVAL_HOURS))
+)
+
+# Cached rate formulas (reloaded after add_rate / delete_rate)
+rate_engine = RateEngine(db)
+
+# Farmers kept in memory for save / lookup / autocomplete
+farmer_directory = FarmerDirectory(db)
+
+# Cached read responses, invalidated per table by response_cache.bump()
+response_cache = ResponseCache(version=db.external_version)
+
+# Change log + delta files for syncing with the other collection centres
+sync = Sync(db)
+
+# Long-running Api methods that the dashboard may run as background jobs
+JOB_METHODS = {
+    "generate_bill",
+    "generate_report",
+    "get_reports_summary",
+    "get_milk_analytics",
+    "export_report_csv",
+    "render_all_bills",
+    "archive_year",
+    "export_changes",
+    "import_changes",
+    "backup_now",
+}
+
+# Worker threads for background jobs (the bridge thread stays free)
+jobs = JobRunner(max_workers=2)
+
+# Where render_all_bills writes bundles by default
+BILLS_DIR = "bills"
+
+# generate_bill row layout (net = amount - advance; opening/closing are ledger balances)
+BILL_COLUMNS = [
+    "code", "name", "category", "litres", "amount", "advance", "net",
+    "opening", "payment", "closing",
+]
+
+# fetch_records page size (default / hard cap per call)
+PAGE_SIZE = 500
+MAX_PAGE_SIZE = 2000
+
+
+def validate_quality(fat, snf):
+    """Return an error message if FAT/SNF are out of range, else None."""
+    if not (2.0 <= fat <= 8.0):
+        return "Invalid FAT value! FAT must be between 2.0 and 8.0"
+    if not (7.0 <= snf <= 9.5):
+        return "Invalid SNF value! SNF must be between 7.0 and 9.5"
+    return None
+
+
+_ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def validate_date(rec_date):
+    """Return an error message unless rec_date is a real YYYY-MM-DD date, else None."""
+    try:
+        if _ISO_DATE.fullmatch(str(rec_date)) and datetime.strptime(rec_date, "%Y-%m-%d"):
+            return None
+    except ValueError:
+        pass
+    return f"Invalid date {rec_date!r}! Use YYYY-MM-DD"
+
+
+def ask_save_path(filename, filetype):
+    """Native "Save as" dialog; returns the chosen path or "" if cancelled."""
+    # GUI toolkit imported only when a dialog is needed (Api stays headless)
+    from tkinter import filedialog
+    import tkinter as tk
+
+    root = tk.Tk()
+    root.withdraw()
+    ftypes = [("CSV files", "*.csv"), ("PDF files", "*.pdf")]
+    default_ext = ".csv" if filetype == "csv" else ".pdf"
+    path = filedialog.asksaveasfilename(
+        title="Save Report",
+        initialfile=filename,
+        defaultextension=default_ext,
+        filetypes=ftypes,
+    )
+    root.destroy()
+    return path
 
 
 #  Helper for easy conversion (used everywhere)
@@ -60,6 +177,17 @@ def query_dicts(cursor):
     return [dict(zip(cols, row)) for row in cursor.fetchall()]
 
 
+def query_columns(cursor):
+    """Columnar form: {"columns": [...], "rows": [[...], ...]} straight from the tuples"""
+    return {"columns": [d[0] for d in cursor.description], "rows": cursor.fetchall()}
+
+
+def wants_columns(payload):
+    """Bulk endpoints return columnar payloads when asked with {"format": "columns"}"""
+    return payload.get("format") == "columns"
+
+
+@instrument(metrics)
 class Api:
 
     # -------------------------------
@@ -71,14 +199,12 @@ class Api:
             username = payload.get("username")
             password = payload.get("password")
 
-            conn = sqlite3.connect(DB)
-            c = conn.cursor()
-            c.execute(
-                "SELECT id FROM users WHERE username=? AND password=?",
-                (username, password),
-            )
-            user = c.fetchone()
-            conn.close()
+            with db.read() as c:
+                c.execute(
+                    "SELECT id FROM users WHERE username=? AND password=?",
+                    (username, password),
+                )
+                user = c.fetchone()
 
             if user:
                 return json.dumps({"success": True, "message": "Login successful!"})
@@ -92,31 +218,35 @@ class Api:
     # -------------------------------
     # SUMMARY
     # -------------------------------
+    @cached(response_cache, "farmers", "milk_records")
     def get_summary(self, data):
         try:
             payload = json.loads(data or "{}")
             rec_date = payload.get("date")
             shift = payload.get("shift")
 
-            conn = sqlite3.connect(DB)
-            c = conn.cursor()
+            with db.read() as c:
+                c.execute("SELECT COUNT(*) FROM farmers")
+                farmers_count = c.fetchone()[0]
 
-            c.execute("SELECT COUNT(*) FROM farmers")
-            farmers_count = c.fetchone()[0]
-
-            # total milk litres & amount for date/shift
-            query = "SELECT IFNULL(SUM(litres),0), IFNULL(SUM(amount),0) FROM milk_records WHERE rec_date=?"
-            params = [rec_date]
-            if shift:
-                query += " AND shift=?"
-                params.append(shift)
-            c.execute(query, params)
-            total_litres, total_amount = c.fetchone()
+                # total milk litres & amount for date/shift (from the rollup)
+                query = """
+                    SELECT IFNULL(SUM(litres),0), IFNULL(SUM(amount),0)
+                    FROM daily_totals
+                    WHERE source='milk' AND day=?
+                """
+                params = [rec_date]
+                if shift:
+                    query += " AND shift=?"
+                    params.append(shift)
+                c.execute(query, params)
+                total_litres, total_amount = c.fetchone()
 
-            c.execute("SELECT COUNT(*) FROM milk_records")
-            total_records = c.fetchone()[0]
+                c.execute(
+                    "SELECT IFNULL(SUM(records),0) FROM daily_totals WHERE source='milk'"
+                )
+                total_records = c.fetchone()[0] + archive.archived_count("milk_records")
 
-            conn.close()
             return json.dumps(
                 {
                     "success": True,
@@ -133,22 +263,63 @@ class Api:
     # 🥛 FETCH MILK RECORDS (FIXED)
     # -------------------------------
     def fetch_records(self, data):
+        """
+        Page through milk records newest first.
+
+        Keyset pagination on (day, id): pass back the "next_cursor"
+        of the previous page as "cursor" to continue. "limit" sets the
+        page size and "with_total" adds the filtered row count.
+        """
         try:
             payload = json.loads(data or "{}")
             rec_date = (payload.get("date") or "").strip()
             shift = (payload.get("shift") or "").strip()
-
-            with lock:
-                conn = sqlite3.connect(DB, timeout=10, check_same_thread=False)
-                c = conn.cursor()
+            cursor = payload.get("cursor") or None
+            limit = int(payload.get("limit") or PAGE_SIZE)
+            limit = max(1, min(limit, MAX_PAGE_SIZE))
+            with_total = bool(payload.get("with_total"))
+
+            where = ""
+            params = []
+            # the same filters over the daily_totals rollup, for with_total
+            count_where = ""
+            count_params = []
+
+            #  Integer day / shift id: index lookups, no per-row conversion
+            if rec_date:
+                where += " AND m.day = ?"
+                params.append(to_day(rec_date))
+                count_where += " AND day = ?"
+                count_params.append(rec_date)
+
+            #  Case-insensitive match for shift (shifts.name is NOCASE)
+            if shift:
+                where += " AND m.shift_id = " + SHIFT_ID_SQL
+                params.append(shift)
+                count_where += " AND shift = (SELECT name FROM main.shifts WHERE name = ?)"
+                count_params.append(shift)
+
+            with db.read() as c:
+                total = None
+                if with_total:
+                    # summed per-day counts: no scan of the records themselves
+                    c.execute(
+                        "SELECT IFNULL(SUM(records), 0) FROM daily_totals "
+                        "WHERE source = 'milk'" + count_where,
+                        count_params,
+                    )
+                    total = c.fetchone()[0]
 
                 sql = """
                     SELECT 
                         m.id,
                         m.rec_date,
                         m.farmer_code,
-                        COALESCE(m.farmer_name, f.name) AS farmer_name,
-                        COALESCE(m.category, f.category) AS category,
+                        m.farmer_name,
+                        COALESCE(
+                            m.category,
+                            (SELECT f.category FROM farmers f WHERE f.code = m.farmer_code)
+                        ) AS category,
                         m.shift,
                         m.litres,
                         m.fat,
@@ -156,32 +327,42 @@ class Api:
                         m.rate,
                         m.amount
                     FROM milk_records m
-                    LEFT JOIN farmers f ON TRIM(m.farmer_code) = TRIM(f.code)
                     WHERE 1=1
-                """
+                """ + where
+                page_params = list(params)
 
-                params = []
+                #  Continue strictly after the last row of the previous page
+                if cursor:
+                    sql += " AND (m.day, m.id) < (?, ?)"
+                    page_params += [to_day(cursor["rec_date"]), int(cursor["id"])]
 
-                #  Match exact stored date text (don’t wrap in DATE())
-                if rec_date:
-                    sql += " AND m.rec_date = ?"
-                    params.append(rec_date)
-
-                #  Case-insensitive match for shift
-                if shift:
-                    sql += " AND LOWER(m.shift) = LOWER(?)"
-                    params.append(shift)
+                # one extra row tells us whether another page exists
+                sql += " ORDER BY m.day DESC, m.id DESC LIMIT ?"
+                page_params.append(limit + 1)
 
-                sql += " ORDER BY m.rec_date DESC, m.id DESC LIMIT 500"
-
-                c.execute(sql, params)
+                c.execute(sql, page_params)
                 rows = c.fetchall()
                 cols = [d[0] for d in c.description]
+
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                last = rows[-1]
+                next_cursor = {"rec_date": last[1], "id": last[0]}
+
+            if wants_columns(payload):
+                records = {"columns": cols, "rows": rows}
+            else:
                 records = [dict(zip(cols, r)) for r in rows]
-                conn.close()
 
-            print(f" fetch_records returned {len(records)} record(s)")
-            return json.dumps({"success": True, "records": records})
+            return json.dumps(
+                {
+                    "success": True,
+                    "records": records,
+                    "next_cursor": next_cursor,
+                    "total": total,
+                }
+            )
 
         except Exception as e:
             print(" fetch_records error:", e)
@@ -197,41 +378,54 @@ class Api:
             to_date = payload.get("to_date")
             shift = payload.get("shift")
 
-            conn = sqlite3.connect(DB)
-            c = conn.cursor()
+            with db.read() as c, archive.attached(c, from_date, to_date) as schemas:
+                sql, params = report_query(
+                    from_date, to_date, shift, milk_source(archive_source("milk_entries", schemas))
+                )
+                c.execute(sql, params)
+                rows = query_columns(c) if wants_columns(payload) else query_dicts(c)
 
-            sql = """
-                SELECT 
-                    rec_date,
-                    farmer_code,
-                    farmer_name,
-                    category,
-                    shift,
-                    litres,
-                    fat,
-                    snf,
-                    rate,
-                    amount
-                FROM milk_records
-                WHERE rec_date BETWEEN ? AND ?
-            """
-            params = [from_date, to_date]
+            return json.dumps({"success": True, "records": rows})
 
-            if shift and shift.lower() != "all":
-                sql += " AND LOWER(shift) = LOWER(?)"
-                params.append(shift)
+        except Exception as e:
+            print("generate_report error:", e)
+            return json.dumps({"success": False, "message": "Backend error"})
 
-            sql += " ORDER BY rec_date ASC, id ASC"
+    # -------------------------------
+    # 📄 EXPORT REPORT AS CSV (streamed straight to disk)
+    # -------------------------------
+    def export_report_csv(self, data):
+        """
+        Same filters as generate_report, written directly to "path"
+        (asks with a save dialog when no path is given). Rows never
+        cross the webview bridge.
+        """
+        try:
+            payload = json.loads(data)
+            from_date = payload.get("from_date")
+            to_date = payload.get("to_date")
+            shift = payload.get("shift")
+            path = payload.get("path") or ask_save_path(
+                f"milk_report_{from_date}_to_{to_date}.csv", "csv"
+            )
 
-            c.execute(sql, params)
-            rows = query_dicts(c)
+            if not path:
+                return json.dumps({"success": False, "message": "Cancelled"})
 
-            conn.close()
-            return json.dumps({"success": True, "records": rows})
+            with db.read() as c, archive.attached(c, from_date, to_date) as schemas:
+                sql, params = report_query(
+                    from_date, to_date, shift, milk_source(archive_source("milk_entries", schemas))
+                )
+                c.execute(sql, params)
+                count = export_csv(c, path)
 
+            print(f"✅ Exported {count} record(s) to {path}")
+            return json.dumps(
+                {"success": True, "rows": count, "path": path, "message": f"Saved to {path}"}
+            )
         except Exception as e:
-            print("generate_report error:", e)
-            return json.dumps({"success": False, "message": "Backend error"})
+            print("export_report_csv error:", e)
+            return json.dumps({"success": False, "message": str(e)})
 
 
     def get_individual_bill(self, data):
@@ -241,38 +435,76 @@ class Api:
             start_date = payload.get("start_date")
             end_date = payload.get("end_date")
 
-            conn = sqlite3.connect(DB)
-            c = conn.cursor()
+            with db.read() as c, archive.attached(c, start_date, end_date) as schemas:
+                c.execute(f"""
+                    SELECT rec_date, shift, litres, fat, snf, rate, amount
+                    FROM {milk_source(archive_source("milk_entries", schemas))}
+                    WHERE farmer_id = {FARMER_ID_SQL} AND day BETWEEN ? AND ?
+                    ORDER BY day ASC, id ASC
+                """, (code, to_day(start_date), to_day(end_date)))
+                records = query_dicts(c)
 
-            c.execute("""
-                SELECT rec_date, shift, litres, fat, snf, rate, amount
-                FROM milk_records
-                WHERE farmer_code=? AND rec_date BETWEEN ? AND ?
-                ORDER BY rec_date ASC
-            """, (code, start_date, end_date))
-            records = query_dicts(c)
+                c.execute(f"SELECT IFNULL(SUM(amount),0) FROM {archive_source('farmer_advances', schemas)} WHERE farmer_code=? AND date BETWEEN ? AND ?", (code, start_date, end_date))
+                total_advance = c.fetchone()[0]
 
-            c.execute("SELECT IFNULL(SUM(litres),0), IFNULL(SUM(amount),0) FROM milk_records WHERE farmer_code=? AND rec_date BETWEEN ? AND ?", (code, start_date, end_date))
-            total_litres, total_amount = c.fetchone()
+                # carried-forward balance from the ledger (single-row lookups)
+                opening = balance_as_of(c, code, start_date, before=True)
+                closing = balance_as_of(c, code, end_date)
 
-            c.execute("SELECT IFNULL(SUM(amount),0) FROM farmer_advances WHERE farmer_code=? AND date BETWEEN ? AND ?", (code, start_date, end_date))
-            total_advance = c.fetchone()[0]
+            bill = bill_totals(records, total_advance)
+            bill["opening_balance"] = opening
+            bill["closing_balance"] = closing
+            return json.dumps({"success": True, "data": bill})
 
-            conn.close()
+        except Exception as e:
+            print("get_individual_bill error:", e)
+            return json.dumps({"success": False, "message": str(e)})
 
-            return json.dumps({
-                "success": True,
-                "data": {
-                    "records": records,
-                    "total_litres": total_litres,
-                    "total_amount": total_amount,
-                    "total_advance": total_advance,
-                    "net": total_amount - total_advance
-                }
-            })
+    # -------------------------------
+    # 🖨 ALL FARMER BILLS AS ONE PRINTABLE FILE
+    # -------------------------------
+    def render_all_bills(self, data):
+        """
+        Every farmer's bill for the period in one HTML file (a page per
+        farmer), rendered by a process pool. Saved to "path" or to
+        bills/bills_<start>_<end>.html; "open" shows it in the browser
+        for printing.
+        """
+        try:
+            payload = json.loads(data)
+            start_date = payload.get("start_date")
+            end_date = payload.get("end_date")
+            include_empty = bool(payload.get("include_empty"))
+            workers = payload.get("workers")
+            path = payload.get("path") or os.path.join(
+                BILLS_DIR, f"bills_{start_date}_to_{end_date}.html"
+            )
+
+            with db.read() as c, archive.attached(c, start_date, end_date) as schemas:
+                bills = collect_bills(c, start_date, end_date, include_empty, schemas)
+
+            document = render_bundle(bills, start_date, end_date, workers)
+
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(document)
+
+            if payload.get("open"):
+                import webbrowser
+
+                webbrowser.open("file://" + os.path.abspath(path))
 
+            print(f"✅ Rendered {len(bills)} bill(s) to {path}")
+            return json.dumps(
+                {
+                    "success": True,
+                    "count": len(bills),
+                    "path": path,
+                    "message": f"{len(bills)} bill(s) saved to {path}",
+                }
+            )
         except Exception as e:
-            print("get_individual_bill error:", e)
+            print("render_all_bills error:", e)
             return json.dumps({"success": False, "message": str(e)})
 
 
@@ -280,6 +512,7 @@ class Api:
     # -------------------------------
     # 📊 REPORT SUMMARY (Milk + Sales + Advances)
     # -------------------------------
+    @cached(response_cache, "milk_records", "sales_records", "farmer_advances")
     def get_reports_summary(self, data):
         """Get overall summary for given date range"""
         try:
@@ -287,35 +520,20 @@ class Api:
             start_date = payload.get("start_date")
             end_date = payload.get("end_date")
 
-            with lock:
-                conn = sqlite3.connect(DB, timeout=10, check_same_thread=False)
-                c = conn.cursor()
-
-                # 🥛 Milk Summary
-                c.execute("""
-                    SELECT IFNULL(SUM(litres),0), IFNULL(SUM(amount),0)
-                    FROM milk_records
-                    WHERE rec_date BETWEEN ? AND ?
+            with db.read() as c, archive.attached(c, start_date, end_date) as schemas:
+                # 🥛 Milk / 💵 Sales / 💰 Advances from the daily rollup (+ archived years)
+                c.execute(f"""
+                    SELECT source, IFNULL(SUM(litres),0), IFNULL(SUM(amount),0)
+                    FROM {archive_source("daily_totals", schemas)}
+                    WHERE source IN ('milk', 'sale', 'advance')
+                      AND day BETWEEN ? AND ?
+                    GROUP BY source
                 """, (start_date, end_date))
-                milk_litres, milk_amount = c.fetchone()
+                totals = {src: (litres, amount) for src, litres, amount in c.fetchall()}
 
-                # 💵 Sales Summary
-                c.execute("""
-                    SELECT IFNULL(SUM(litres),0), IFNULL(SUM(amount),0)
-                    FROM sales_records
-                    WHERE sale_date BETWEEN ? AND ?
-                """, (start_date, end_date))
-                sale_litres, sale_amount = c.fetchone()
-
-                # 💰 Advances
-                c.execute("""
-                    SELECT IFNULL(SUM(amount),0)
-                    FROM farmer_advances
-                    WHERE date BETWEEN ? AND ?
-                """, (start_date, end_date))
-                total_advances = c.fetchone()[0]
-
-                conn.close()
+            milk_litres, milk_amount = totals.get("milk", (0, 0))
+            sale_litres, sale_amount = totals.get("sale", (0, 0))
+            total_advances = totals.get("advance", (0, 0))[1]
 
             net_income = (milk_amount + sale_amount) - total_advances
 
@@ -333,6 +551,49 @@ class Api:
             print("❌ get_reports_summary error:", e)
             return json.dumps({"success": False, "message": str(e)})
 
+    # -------------------------------
+    # 📈 MILK ANALYTICS (yield / quality trends)
+    # -------------------------------
+    @cached(response_cache, "milk_records", "farmers")
+    def get_milk_analytics(self, data):
+        """
+        Per-farmer litres trend, FAT/SNF distributions, shift variation,
+        outliers and a chart series for start_date..end_date. Optional
+        "shift", "category", "codes" (list) filters and "points" (series length).
+        """
+        try:
+            payload = json.loads(data or "{}")
+            start_date = payload.get("start_date")
+            end_date = payload.get("end_date")
+            codes = payload.get("codes") or None
+            if isinstance(codes, str):
+                codes = [code.strip() for code in codes.split(",") if code.strip()]
+
+            try:
+                # imported here so the app still runs where NumPy is not installed
+                from analytics import milk_analytics
+            except ImportError:
+                return json.dumps(
+                    {"success": False, "message": "Analytics needs NumPy (pip install numpy)"}
+                )
+
+            with db.read() as c, archive.attached(c, start_date, end_date) as schemas:
+                result = milk_analytics(
+                    c,
+                    start_date,
+                    end_date,
+                    source=archive_source("milk_entries", schemas),
+                    shift=payload.get("shift"),
+                    category=payload.get("category"),
+                    codes=codes,
+                    points=payload.get("points"),
+                )
+
+            return json.dumps({"success": True, **result})
+        except Exception as e:
+            print("❌ get_milk_analytics error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
     # -------------------------------
     # 💰 GENERATE WEEKLY / MONTHLY BILL
     # -------------------------------
@@ -343,53 +604,41 @@ class Api:
             end_date = payload.get("end_date")
             bill_type = payload.get("bill_type")  # weekly or monthly
 
-            conn = sqlite3.connect(DB)
-            c = conn.cursor()
-
-            c.execute("SELECT code, name, category FROM farmers ORDER BY id ASC")
-            farmers = c.fetchall()
-
-            bills = []
-
-            for code, name, category in farmers:
-
-                # Milk summary
+            # Period totals and opening/closing balances straight from the
+            # farmer ledger (one row per farmer-day, not every milk record)
+            with db.read() as c:
                 c.execute(
-                    """
-                    SELECT IFNULL(SUM(litres),0), IFNULL(SUM(amount),0)
-                    FROM milk_records
-                    WHERE farmer_code=? AND rec_date BETWEEN ? AND ?
+                    f"""
+                    SELECT
+                        f.code,
+                        f.name,
+                        f.category,
+                        IFNULL(p.litres, 0),
+                        IFNULL(p.milk, 0),
+                        IFNULL(p.advance, 0),
+                        {closing_sql("f.code", before=True)},
+                        IFNULL(p.payment, 0),
+                        {closing_sql("f.code")}
+                    FROM farmers f
+                    LEFT JOIN (
+                        SELECT farmer_code, SUM(litres) AS litres, SUM(milk) AS milk,
+                               SUM(advance) AS advance, SUM(payment) AS payment
+                        FROM farmer_ledger
+                        WHERE day BETWEEN ? AND ?
+                        GROUP BY farmer_code
+                    ) p ON p.farmer_code = f.code
+                    ORDER BY f.id ASC
                 """,
-                    (code, start_date, end_date),
+                    (start_date, end_date, start_date, end_date),
                 )
-                litres, amount = c.fetchone()
+                rows = [
+                    row[:6] + (row[4] - row[5],) + row[6:] for row in c.fetchall()
+                ]
 
-                # Advances
-                c.execute(
-                    """
-                    SELECT IFNULL(SUM(amount),0)
-                    FROM farmer_advances
-                    WHERE farmer_code=? AND date BETWEEN ? AND ?
-                """,
-                    (code, start_date, end_date),
-                )
-                advance = c.fetchone()[0]
-
-                net = amount - advance
-
-                bills.append(
-                    {
-                        "code": code,
-                        "name": name,
-                        "category": category,
-                        "litres": litres,
-                        "amount": amount,
-                        "advance": advance,
-                        "net": net,
-                    }
-                )
-
-            conn.close()
+            if wants_columns(payload):
+                bills = {"columns": BILL_COLUMNS, "rows": rows}
+            else:
+                bills = [dict(zip(BILL_COLUMNS, row)) for row in rows]
 
             return json.dumps({"success": True, "bills": bills, "bill_type": bill_type})
 
@@ -418,6 +667,68 @@ class Api:
             print("export_report_pdf error:", e)
             return json.dumps({"success": False, "message": str(e)})
 
+    # -------------------------------
+    # ⏳ BACKGROUND JOBS
+    # -------------------------------
+    def submit_job(self, data):
+        """Run one of JOB_METHODS in the background: {"method", "payload"} -> job id."""
+        try:
+            payload = json.loads(data)
+            method = payload.get("method")
+            args = payload.get("payload") or {}
+
+            if method not in JOB_METHODS:
+                return json.dumps(
+                    {"success": False, "message": f"{method} cannot run as a job"}
+                )
+
+            job = jobs.submit(method, getattr(self, method), json.dumps(args))
+            return json.dumps({"success": True, "job_id": job.id, "job": job.info()})
+        except Exception as e:
+            print("submit_job error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
+    def get_job(self, data):
+        """Status and progress of a job."""
+        try:
+            job = jobs.get(json.loads(data).get("job_id"))
+            if job is None:
+                return json.dumps({"success": False, "message": "Job not found"})
+            return json.dumps({"success": True, "job": job.info()})
+        except Exception as e:
+            return json.dumps({"success": False, "message": str(e)})
+
+    def get_job_result(self, data):
+        """The finished job's Api response under "result"."""
+        try:
+            job = jobs.get(json.loads(data).get("job_id"))
+            if job is None:
+                return json.dumps({"success": False, "message": "Job not found"})
+            if job.status not in JOB_FINISHED:
+                return json.dumps(
+                    {"success": False, "message": "Job still running", "job": job.info()}
+                )
+            result = json.loads(job.result) if job.result else None
+            return json.dumps({"success": True, "job": job.info(), "result": result})
+        except Exception as e:
+            return json.dumps({"success": False, "message": str(e)})
+
+    def cancel_job(self, data):
+        try:
+            if not jobs.cancel(json.loads(data).get("job_id")):
+                return json.dumps({"success": False, "message": "Job not running"})
+            return json.dumps({"success": True, "message": "Cancel requested"})
+        except Exception as e:
+            return json.dumps({"success": False, "message": str(e)})
+
+    def list_jobs(self, data=None):
+        try:
+            return json.dumps(
+                {"success": True, "jobs": [job.info() for job in jobs.list()]}
+            )
+        except Exception as e:
+            return json.dumps({"success": False, "message": str(e)})
+
     # -------------------------------
     # 🧾 SAVE NEW MILK RECORD
     # -------------------------------
@@ -436,67 +747,132 @@ class Api:
             # --------------------------
             # 🧪 VALIDATION
             # --------------------------
-            if not (2.0 <= fat <= 8.0):
-                return json.dumps({
-                    "success": False,
-                    "message": "Invalid FAT value! FAT must be between 2.0 and 8.0"
-                })
-
-            if not (7.0 <= snf <= 9.5):
-                return json.dumps({
-                    "success": False,
-                    "message": "Invalid SNF value! SNF must be between 7.0 and 9.5"
-                })
-
-            conn = sqlite3.connect(DB)
-            c = conn.cursor()
-
-            # fetch farmer details
-            c.execute("SELECT name, category FROM farmers WHERE code=?", (farmer_code,))
-            f = c.fetchone()
+            error = validate_date(rec_date) or validate_quality(fat, snf)
+            if error:
+                return json.dumps({"success": False, "message": error})
+
+            # farmer details (and the code as registered) from the in-memory directory
+            f = farmer_directory.get(farmer_code)
             if f:
-                farmer_name, category = f
+                farmer_code, category = f["code"], f["category"]
             else:
-                farmer_name, category = ("Unknown", "Unknown")
-
-            c.execute(
-                """
-                INSERT INTO milk_records
-                (rec_date, farmer_code, farmer_name, category, shift, litres, fat, snf, rate, amount)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    rec_date,
-                    farmer_code,
-                    farmer_name,
-                    category,
-                    shift,
-                    litres,
-                    fat,
-                    snf,
-                    rate,
-                    amount,
-                ),
-            )
+                category = "Unknown"
 
-            conn.commit()
-            conn.close()
+            with db.write() as c:
+                c.execute(
+                    """
+                    INSERT INTO milk_records
+                    (rec_date, farmer_code, category, shift, litres, fat, snf, rate, amount)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        rec_date,
+                        farmer_code,
+                        category,
+                        shift,
+                        litres,
+                        fat,
+                        snf,
+                        rate,
+                        amount,
+                    ),
+                )
+            db.after_commit(response_cache.bump, "milk_records")
 
             return json.dumps({"success": True, "message": "Record saved successfully"})
         except Exception as e:
             print(" save_record error:", e)
             return json.dumps({"success": False, "message": str(e)})
 
+    # -------------------------------
+    # 🧾 SAVE MANY MILK RECORDS (one transaction)
+    # -------------------------------
+    def save_records(self, data):
+        """
+        Save a whole list of milk records (queued entry grid / re-keyed
+        offline shift) in a single transaction.
+
+        Rows failing date or FAT/SNF validation are skipped and reported
+        in "errors" by their index; every valid row is saved.
+        """
+        try:
+            payload = json.loads(data)
+            records = payload.get("records") or []
+
+            rows = []
+            errors = []
+            for index, rec in enumerate(records):
+                error = validate_date(rec.get("rec_date"))
+                if error:
+                    errors.append({"index": index, "message": error})
+                    continue
+
+                try:
+                    fat = float(rec.get("fat") or 0)
+                    snf = float(rec.get("snf") or 0)
+                except (TypeError, ValueError):
+                    errors.append({"index": index, "message": "FAT/SNF must be numbers"})
+                    continue
+
+                error = validate_quality(fat, snf)
+                if error:
+                    errors.append({"index": index, "message": error})
+                    continue
+
+                rows.append((rec, fat, snf))
+
+            # resolve registered codes and categories from the in-memory directory
+            farmers = {}
+            for rec, _, _ in rows:
+                code = rec.get("farmer_code")
+                if code not in farmers:
+                    f = farmer_directory.get(code)
+                    farmers[code] = (f["code"], f["category"]) if f else (code, "Unknown")
+
+            with db.write() as c:
+                c.executemany(
+                    """
+                    INSERT INTO milk_records
+                    (rec_date, farmer_code, category, shift, litres, fat, snf, rate, amount)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    [
+                        (
+                            rec.get("rec_date"),
+                            *farmers[rec.get("farmer_code")],
+                            rec.get("shift"),
+                            rec.get("litres"),
+                            fat,
+                            snf,
+                            rec.get("rate"),
+                            rec.get("amount"),
+                        )
+                        for rec, fat, snf in rows
+                    ],
+                )
+            db.after_commit(response_cache.bump, "milk_records")
+
+            return json.dumps(
+                {
+                    "success": not errors,
+                    "saved": len(rows),
+                    "errors": errors,
+                    "message": f"Saved {len(rows)} of {len(records)} record(s)",
+                }
+            )
+        except Exception as e:
+            print(" save_records error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
     # -------------------------------
     # 👩‍🌾 FARMERS
     # -------------------------------
+    @cached(response_cache, "farmers")
     def get_all_farmers(self, data=None):
         try:
-            conn = sqlite3.connect(DB)
-            c = conn.cursor()
-            c.execute("SELECT id, code, name, category FROM farmers ORDER BY id ASC")
-            farmers = query_dicts(c)
-            conn.close()
+            with db.read() as c:
+                c.execute("SELECT id, code, name, category FROM farmers ORDER BY id ASC")
+                farmers = query_dicts(c)
             return json.dumps({"success": True, "farmers": farmers})
         except Exception as e:
             print(" get_all_farmers error:", e)
@@ -512,61 +888,313 @@ class Api:
             if not (code and name and category):
                 return json.dumps({"success": False, "message": "All fields required"})
 
-            conn = sqlite3.connect(DB)
-            c = conn.cursor()
-            c.execute(
-                "INSERT INTO farmers (code, name, category) VALUES (?, ?, ?)",
-                (code, name, category),
+            with db.write() as c:
+                c.execute(
+                    "INSERT INTO farmers (code, name, category) VALUES (?, ?, ?)",
+                    (code, name, category),
+                )
+                farmer_id = c.lastrowid
+            db.after_commit(
+                farmer_directory.put,
+                {"id": farmer_id, "code": code, "name": name, "category": category},
             )
-            conn.commit()
-            conn.close()
+            db.after_commit(response_cache.bump, "farmers")
             return json.dumps({"success": True, "message": "Farmer added"})
         except Exception as e:
             print(" add_farmer error:", e)
             return json.dumps({"success": False, "message": str(e)})
 
+    def update_farmer(self, data):
+        try:
+            payload = json.loads(data)
+            farmer_id = int(payload.get("id"))
+            name = (payload.get("name") or "").strip()
+            category = (payload.get("category") or "").strip()
+
+            if not (name and category):
+                return json.dumps({"success": False, "message": "Name and category required"})
+
+            with db.write() as c:
+                c.execute(
+                    "UPDATE farmers SET name=?, category=? WHERE id=?",
+                    (name, category, farmer_id),
+                )
+                c.execute("SELECT id, code, name, category FROM farmers WHERE id=?", (farmer_id,))
+                row = c.fetchone()
+
+            if row is None:
+                return json.dumps({"success": False, "message": "Farmer not found"})
+            db.after_commit(farmer_directory.put, dict(zip(("id", "code", "name", "category"), row)))
+            db.after_commit(response_cache.bump, "farmers")
+            return json.dumps({"success": True, "message": "Farmer updated"})
+        except Exception as e:
+            print(" update_farmer error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
+    def delete_farmer(self, data):
+        """Dashboard passes the bare id (not a JSON object)."""
+        try:
+            payload = json.loads(data) if isinstance(data, str) else data
+            farmer_id = int(payload.get("id") if isinstance(payload, dict) else payload)
+
+            with db.write() as c:
+                c.execute("SELECT code FROM farmers WHERE id=?", (farmer_id,))
+                row = c.fetchone()
+                c.execute("DELETE FROM farmers WHERE id=?", (farmer_id,))
+
+            if row is None:
+                return json.dumps({"success": False, "message": "Farmer not found"})
+            db.after_commit(farmer_directory.remove, row[0])
+            db.after_commit(response_cache.bump, "farmers")
+            return json.dumps({"success": True, "message": "Farmer deleted"})
+        except Exception as e:
+            print(" delete_farmer error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
+    def get_farmer_by_code(self, data):
+        """Accepts {"code": ...} or the bare JSON string the entry form sends."""
+        try:
+            payload = json.loads(data)
+            code = payload.get("code") if isinstance(payload, dict) else payload
+            farmer = farmer_directory.get(code)
+            if farmer is None:
+                return json.dumps({"success": False, "message": "Farmer not found"})
+            return json.dumps({"success": True, "farmer": farmer})
+        except Exception as e:
+            print(" get_farmer_by_code error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
+    def search_farmers(self, data):
+        """Autocomplete: farmers whose code or name starts with "query"."""
+        try:
+            payload = json.loads(data or "{}")
+            limit = int(payload.get("limit") or 10)
+            farmers = farmer_directory.search(payload.get("query"), limit)
+            return json.dumps({"success": True, "farmers": farmers})
+        except Exception as e:
+            print(" search_farmers error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
     # -------------------------------
     # 💰 ADVANCES
     # -------------------------------
     def get_all_advances(self, data=None):
         try:
-            conn = sqlite3.connect(DB)
-            c = conn.cursor()
-            c.execute("SELECT * FROM farmer_advances ORDER BY id DESC")
-            advances = query_dicts(c)
-            conn.close()
+            payload = json.loads(data or "{}")
+            with db.read() as c:
+                c.execute("SELECT * FROM farmer_advances ORDER BY id DESC")
+                advances = query_columns(c) if wants_columns(payload) else query_dicts(c)
             return json.dumps({"success": True, "advances": advances})
         except Exception as e:
             print(" get_all_advances error:", e)
             return json.dumps({"success": False, "message": str(e)})
 
+    def add_advance(self, data):
+        try:
+            payload = json.loads(data)
+            farmer_code = (payload.get("farmer_code") or "").strip()
+            date = payload.get("date") or datetime.now().strftime("%Y-%m-%d")
+            amount = float(payload.get("amount") or 0)
+            remarks = (payload.get("remarks") or "").strip()
+
+            if not farmer_code or amount <= 0:
+                return json.dumps(
+                    {"success": False, "message": "Farmer code and amount are required"}
+                )
+
+            with db.write() as c:
+                c.execute(
+                    "INSERT INTO farmer_advances (farmer_code, date, amount, remarks) VALUES (?, ?, ?, ?)",
+                    (farmer_code, date, amount, remarks),
+                )
+            db.after_commit(response_cache.bump, "farmer_advances")
+            return json.dumps({"success": True, "message": "Advance recorded"})
+        except Exception as e:
+            print(" add_advance error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
+    def delete_advance(self, data):
+        try:
+            payload = json.loads(data)
+            with db.write() as c:
+                c.execute("DELETE FROM farmer_advances WHERE id=?", (payload.get("id"),))
+                deleted = c.rowcount
+            db.after_commit(response_cache.bump, "farmer_advances")
+
+            if not deleted:
+                return json.dumps({"success": False, "message": "Advance not found"})
+            return json.dumps({"success": True, "message": "Advance deleted"})
+        except Exception as e:
+            print(" delete_advance error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
+    # -------------------------------
+    # 💸 PAYMENTS & BALANCES (farmer ledger)
+    # -------------------------------
+    def add_payment(self, data):
+        """Record money paid out to a farmer; lowers their outstanding balance."""
+        try:
+            payload = json.loads(data)
+            farmer_code = (payload.get("farmer_code") or "").strip()
+            date = payload.get("date") or datetime.now().strftime("%Y-%m-%d")
+            amount = float(payload.get("amount") or 0)
+            mode = (payload.get("mode") or "Cash").strip()
+            remarks = (payload.get("remarks") or "").strip()
+
+            if not farmer_code or amount <= 0:
+                return json.dumps(
+                    {"success": False, "message": "Farmer code and amount are required"}
+                )
+
+            with db.write() as c:
+                c.execute(
+                    "INSERT INTO farmer_payments (farmer_code, date, amount, mode, remarks) VALUES (?, ?, ?, ?, ?)",
+                    (farmer_code, date, amount, mode, remarks),
+                )
+                balance = balance_as_of(c, farmer_code)
+            db.after_commit(response_cache.bump, "farmer_payments")
+            return json.dumps(
+                {"success": True, "balance": balance, "message": "Payment recorded"}
+            )
+        except Exception as e:
+            print(" add_payment error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
+    def delete_payment(self, data):
+        try:
+            payload = json.loads(data)
+            with db.write() as c:
+                c.execute("DELETE FROM farmer_payments WHERE id=?", (payload.get("id"),))
+                deleted = c.rowcount
+            db.after_commit(response_cache.bump, "farmer_payments")
+
+            if not deleted:
+                return json.dumps({"success": False, "message": "Payment not found"})
+            return json.dumps({"success": True, "message": "Payment deleted"})
+        except Exception as e:
+            print(" delete_payment error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
+    @cached(response_cache, "farmer_payments")
+    def get_payments(self, data=None):
+        """Payments, newest first; optionally for one "farmer_code"."""
+        try:
+            payload = json.loads(data or "{}")
+            farmer_code = (payload.get("farmer_code") or "").strip()
+            sql = "SELECT * FROM farmer_payments"
+            params = []
+            if farmer_code:
+                sql += " WHERE farmer_code=?"
+                params.append(farmer_code)
+            sql += " ORDER BY id DESC"
+            with db.read() as c:
+                c.execute(sql, params)
+                payments = query_columns(c) if wants_columns(payload) else query_dicts(c)
+            return json.dumps({"success": True, "payments": payments})
+        except Exception as e:
+            print(" get_payments error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
+    def get_farmer_balance(self, data):
+        """Outstanding balance of "code" (owed to the farmer), as of "date" if given."""
+        try:
+            payload = json.loads(data)
+            code = (payload.get("code") or "").strip()
+            on_date = payload.get("date") or None
+            with db.read() as c:
+                balance = balance_as_of(c, code, on_date)
+            return json.dumps({"success": True, "code": code, "balance": balance})
+        except Exception as e:
+            print(" get_farmer_balance error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
+    def get_farmer_ledger(self, data):
+        """A farmer's day-by-day ledger for a period with opening and closing balance."""
+        try:
+            payload = json.loads(data)
+            code = (payload.get("code") or "").strip()
+            start_date = payload.get("start_date")
+            end_date = payload.get("end_date")
+            with db.read() as c:
+                opening = balance_as_of(c, code, start_date, before=True)
+                c.execute(
+                    f"""
+                    SELECT {", ".join(LEDGER_COLUMNS)} FROM farmer_ledger
+                    WHERE farmer_code=? AND day BETWEEN ? AND ?
+                    ORDER BY day ASC
+                    """,
+                    (code, start_date, end_date),
+                )
+                entries = query_dicts(c)
+            closing = entries[-1]["closing"] if entries else opening
+            return json.dumps(
+                {
+                    "success": True,
+                    "code": code,
+                    "opening": opening,
+                    "entries": entries,
+                    "closing": closing,
+                }
+            )
+        except Exception as e:
+            print(" get_farmer_ledger error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
     # -------------------------------
     # 🧾 SALES
     # -------------------------------
     def get_all_sales(self, data=None):
         try:
-            conn = sqlite3.connect(DB)
-            c = conn.cursor()
-            c.execute("SELECT * FROM sales_records ORDER BY id DESC")
-            sales = query_dicts(c)
-            conn.close()
+            payload = json.loads(data or "{}")
+            with db.read() as c:
+                c.execute("SELECT * FROM sales_records ORDER BY id DESC")
+                sales = query_columns(c) if wants_columns(payload) else query_dicts(c)
             return json.dumps({"success": True, "sales": sales})
         except Exception as e:
             print(" get_all_sales error:", e)
             return json.dumps({"success": False, "message": str(e)})
 
+    # -------------------------------
+    # 🔎 SEARCH (farmers, advance remarks, sale customers)
+    # -------------------------------
+    @cached(response_cache, "farmers", "farmer_advances", "sales_records")
+    def search(self, data):
+        """
+        Ranked full-text search for "query", grouped by kind. Optional
+        "kinds" (farmers / advances / sales, in display order),
+        "start_date" / "end_date", "limit" and "offset"; pass
+        "next_offset" back as "offset" for the next page.
+        """
+        try:
+            payload = json.loads(data or "{}")
+            with db.read() as c:
+                found = run_search(
+                    c,
+                    payload.get("query"),
+                    kinds=payload.get("kinds") or None,
+                    start_date=payload.get("start_date") or None,
+                    end_date=payload.get("end_date") or None,
+                    limit=payload.get("limit"),
+                    offset=payload.get("offset"),
+                )
+            return json.dumps({"success": True, **found})
+        except SearchError as e:
+            return json.dumps({"success": False, "message": str(e)})
+        except Exception as e:
+            print(" search error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
     # -------------------------------
     # 🕒 SHIFT MANAGEMENT
     # -------------------------------
+    @cached(response_cache, "shift_tracker")
     def get_current_shift(self, data=None):
         try:
-            conn = sqlite3.connect(DB)
-            c = conn.cursor()
-            c.execute(
-                "SELECT current_shift, current_date FROM shift_tracker WHERE id=1"
-            )
-            row = c.fetchone()
-            conn.close()
+            with db.read() as c:
+                c.execute(
+                    "SELECT current_shift, current_date FROM shift_tracker WHERE id=1"
+                )
+                row = c.fetchone()
             if row:
                 return json.dumps({"success": True, "shift": row[0], "date": row[1]})
             return json.dumps({"success": False, "message": "Shift not found"})
@@ -575,17 +1203,15 @@ class Api:
 
     def start_new_shift(self, data=None):
         try:
-            conn = sqlite3.connect(DB)
-            c = conn.cursor()
-            c.execute("SELECT current_shift FROM shift_tracker WHERE id=1")
-            cur = c.fetchone()[0]
-            new_shift = "Evening" if cur == "Morning" else "Morning"
-            c.execute(
-                "UPDATE shift_tracker SET current_shift=?, current_date=date('now') WHERE id=1",
-                (new_shift,),
-            )
-            conn.commit()
-            conn.close()
+            with db.write() as c:
+                c.execute("SELECT current_shift FROM shift_tracker WHERE id=1")
+                cur = c.fetchone()[0]
+                new_shift = "Evening" if cur == "Morning" else "Morning"
+                c.execute(
+                    "UPDATE shift_tracker SET current_shift=?, current_date=date('now') WHERE id=1",
+                    (new_shift,),
+                )
+            db.after_commit(response_cache.bump, "shift_tracker")
             return json.dumps(
                 {"success": True, "shift": new_shift, "message": "Shift changed"}
             )
@@ -604,21 +1230,14 @@ class Api:
 
             # Decode base64
             if isinstance(content, str) and content.startswith("data:"):
+                import base64
+
                 content = content.split(",")[1]
                 content = base64.b64decode(content)
             else:
                 content = content.encode("utf-8")
 
-            root = tk.Tk()
-            root.withdraw()
-            ftypes = [("CSV files", "*.csv"), ("PDF files", "*.pdf")]
-            default_ext = ".csv" if filetype == "csv" else ".pdf"
-            path = filedialog.asksaveasfilename(
-                title="Save Report",
-                initialfile=filename,
-                defaultextension=default_ext,
-                filetypes=ftypes,
-            )
+            path = ask_save_path(filename, filetype)
 
             if not path:
                 return json.dumps({"success": False, "message": "Cancelled"})
@@ -632,49 +1251,396 @@ class Api:
             print(" save_file error:", e)
             return json.dumps({"success": False, "message": str(e)})
 
+    # -------------------------------
+    # 📈 RESPONSE CACHE STATS
+    # -------------------------------
+    def get_cache_stats(self, data=None):
+        return json.dumps({"success": True, "cache": response_cache.stats()})
+
+    # -------------------------------
+    # 🗄 YEARLY ARCHIVES
+    # -------------------------------
+    def get_archives(self, data=None):
+        """Archived financial years with their row counts."""
+        try:
+            years = [
+                dict(info, path=archive.path(year), exists=os.path.exists(archive.path(year)))
+                for year, info in archive.years().items()
+            ]
+            return json.dumps({"success": True, "archives": years})
+        except Exception as e:
+            print("get_archives error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
+    def archive_year(self, data):
+        """
+        Move a closed financial year ({"year": 2023} = Apr 2023 → Mar 2024)
+        into archive/dairy_fy<year>.db. "vacuum" also shrinks database.db.
+        """
+        try:
+            payload = json.loads(data)
+            year = int(payload.get("year"))
+            counts = archive.archive_year(year, vacuum=bool(payload.get("vacuum")))
+            response_cache.bump("milk_records", "farmer_advances", "sales_records")
+
+            moved = sum(counts.values())
+            print(f"✅ Archived financial year {year}: {counts}")
+            return json.dumps(
+                {
+                    "success": True,
+                    "year": year,
+                    "rows": counts,
+                    "message": f"Moved {moved} record(s) to {archive.path(year)}",
+                }
+            )
+        except Exception as e:
+            print("archive_year error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
+    # -------------------------------
+    # 💾 BACKUPS
+    # -------------------------------
+    def get_backups(self, data=None):
+        """Backup generations (newest first), the latest run and the schedule."""
+        try:
+            return json.dumps(
+                {
+                    "success": True,
+                    "backups": backups.generations(),
+                    "last": backups.last,
+                    "interval_hours": backup_scheduler.interval / 3600,
+                    "keep": backups.keep,
+                }
+            )
+        except Exception as e:
+            print("get_backups error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
+    def backup_now(self, data=None):
+        """Take a verified backup now, safe mid-shift ("path" for a one-off copy elsewhere)."""
+        try:
+            payload = json.loads(data or "{}")
+            result = backups.backup_now(payload.get("path"))
+            return json.dumps(
+                dict(
+                    result,
+                    message=f"Backup saved to {result['path']} ({result['bytes'] / 1024:.0f} KB, verified)",
+                )
+            )
+        except Exception as e:
+            print("backup_now error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
+    # -------------------------------
+    # 🔁 SYNC BETWEEN COLLECTION CENTRES
+    # -------------------------------
+    def get_sync_status(self, data=None):
+        """This site's name, logged changes and what each peer still needs."""
+        try:
+            return json.dumps({"success": True, "sync": sync.status()})
+        except Exception as e:
+            print("get_sync_status error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
+    def set_site_name(self, data):
+        try:
+            payload = json.loads(data)
+            name = sync.set_site(payload.get("site"))
+            return json.dumps({"success": True, "site": name, "message": f"Site name set to {name}"})
+        except Exception as e:
+            print("set_site_name error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
+    def export_changes(self, data):
+        """Delta file for {"peer": <site>} with every change it has not acknowledged ("path" optional)."""
+        try:
+            payload = json.loads(data)
+            path, count = sync.export_changes(payload.get("peer"), payload.get("path"))
+            return json.dumps(
+                {
+                    "success": True,
+                    "path": path,
+                    "changes": count,
+                    "message": f"Exported {count} change(s) to {path}",
+                }
+            )
+        except Exception as e:
+            print("export_changes error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
+    def import_changes(self, data):
+        """Apply a peer's delta file {"path": ...}; changes already applied are skipped."""
+        try:
+            payload = json.loads(data)
+            result = sync.import_changes(payload.get("path"))
+            if result["applied"]:
+                response_cache.bump_all()
+                if "farmers" in result["tables"]:
+                    farmer_directory.reload()
+                if {"rate_table", "rate_history"} & set(result["tables"]):
+                    rate_engine.invalidate()
+            return json.dumps(
+                dict(
+                    result,
+                    success=True,
+                    message=f"Applied {result['applied']} change(s) from {result['from']} "
+                    f"({result['skipped']} already present)",
+                )
+            )
+        except Exception as e:
+            print("import_changes error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
+    # -------------------------------
+    # ⏱ METRICS (timings, query counts, slow queries)
+    # -------------------------------
+    def get_metrics(self, data=None):
+        """Rolling per-method latency histograms, statement timings and the slow-query log."""
+        try:
+            payload = json.loads(data or "{}")
+            snapshot = metrics.snapshot()
+            if payload.get("reset"):
+                metrics.reset()
+            return json.dumps({"success": True, "metrics": snapshot})
+        except Exception as e:
+            print("get_metrics error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
     def get_rates(self, data=None):
         """
-        Fetch all rate entries (category, base, fat ₹/u, snf ₹/u)
-        from the rate_table for use in calculations or display.
+        Rate formulas in force today (category, base, fat ₹/u, snf ₹/u),
+        from rate_history, so a future-dated rate shows once its day comes.
         """
+        return self._rates_on(json.dumps({"date": datetime.now().strftime("%Y-%m-%d")}))
+
+    @cached(response_cache, "rate_table")
+    def _rates_on(self, data):
+        """get_rates for one day (the date is part of the cache key)."""
         try:
-            conn = sqlite3.connect(DB)
-            c = conn.cursor()
-            c.execute("""
-                SELECT 
-                    id,
-                    category,
-                    base,
-                    fat_rate,
-                    snf_rate
-                FROM rate_table
-                ORDER BY category
-            """)
-            rows = c.fetchall()
-            cols = [d[0] for d in c.description]
-            rates = [dict(zip(cols, r)) for r in rows]
-
-            conn.close()
+            on_date = json.loads(data)["date"]
+            with db.read() as c:
+                c.execute(
+                    """
+                    SELECT r.id, h.category, h.base, h.fat_rate, h.snf_rate
+                    FROM rate_history h
+                    LEFT JOIN rate_table r ON r.category = h.category
+                    WHERE h.id = (
+                        SELECT id FROM rate_history
+                        WHERE category = h.category AND effective_from <= :day
+                        ORDER BY effective_from DESC LIMIT 1
+                    )
+                    UNION ALL
+                    -- categories never given a dated formula
+                    SELECT id, category, base, fat_rate, snf_rate
+                    FROM rate_table r
+                    WHERE NOT EXISTS (SELECT 1 FROM rate_history WHERE category = r.category)
+                    ORDER BY 2
+                    """,
+                    {"day": on_date},
+                )
+                rates = query_dicts(c)
+
             return json.dumps({"success": True, "rates": rates})
 
         except Exception as e:
             print("get_rates error:", e)
             return json.dumps({"success": False, "message": str(e)})
 
+    def add_rate(self, data):
+        """
+        Add or update a category's rate formula.
+
+        "effective_from" (YYYY-MM-DD) dates the change; without it the
+        rate applies from today, or from the beginning for a brand new
+        category so old records can still be priced.
+        """
+        try:
+            payload = json.loads(data)
+            category = (payload.get("category") or "").strip()
+            base = float(payload.get("base") or 0)
+            fat_rate = float(payload.get("fat_rate") or 0)
+            snf_rate = float(payload.get("snf_rate") or 0)
+            effective_from = (payload.get("effective_from") or "").strip()
+
+            if not category:
+                return json.dumps({"success": False, "message": "Category required"})
+            # the rate engine bisects these as text: only YYYY-MM-DD sorts right
+            error = validate_date(effective_from) if effective_from else None
+            if error:
+                return json.dumps({"success": False, "message": error})
+
+            with db.write() as c:
+                if not effective_from:
+                    c.execute(
+                        "SELECT 1 FROM rate_history WHERE category=? LIMIT 1",
+                        (category,),
+                    )
+                    effective_from = (
+                        datetime.now().strftime("%Y-%m-%d")
+                        if c.fetchone()
+                        else RATE_EPOCH
+                    )
+
+                c.execute(
+                    """
+                    INSERT INTO rate_history (category, effective_from, base, fat_rate, snf_rate)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (category, effective_from) DO UPDATE SET
+                        base = excluded.base,
+                        fat_rate = excluded.fat_rate,
+                        snf_rate = excluded.snf_rate
+                    """,
+                    (category, effective_from, base, fat_rate, snf_rate),
+                )
+                sync_current_rate(c, category)
+            db.after_commit(response_cache.bump, "rate_table")
+            db.after_commit(rate_engine.invalidate)
+
+            return json.dumps(
+                {"success": True, "message": f"Rate saved for {category} from {effective_from}"}
+            )
+        except Exception as e:
+            print("add_rate error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
+    def delete_rate(self, data):
+        """Remove a category's current rate and its whole history."""
+        try:
+            payload = json.loads(data)
+            category = (payload.get("category") or "").strip()
+
+            with db.write() as c:
+                c.execute("DELETE FROM rate_table WHERE category=?", (category,))
+                c.execute("DELETE FROM rate_history WHERE category=?", (category,))
+                deleted = c.rowcount
+            db.after_commit(response_cache.bump, "rate_table")
+            db.after_commit(rate_engine.invalidate)
+
+            if not deleted:
+                return json.dumps({"success": False, "message": "Rate not found"})
+            return json.dumps({"success": True, "message": f"Rate deleted for {category}"})
+        except Exception as e:
+            print("delete_rate error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
+    def get_rate_history(self, data=None):
+        """All effective-dated formulas, optionally for one category."""
+        try:
+            payload = json.loads(data or "{}")
+            category = (payload.get("category") or "").strip()
+
+            sql = """
+                SELECT id, category, effective_from, base, fat_rate, snf_rate
+                FROM rate_history
+            """
+            params = []
+            if category:
+                sql += " WHERE category=?"
+                params.append(category)
+            sql += " ORDER BY category, effective_from DESC"
+
+            with db.read() as c:
+                c.execute(sql, params)
+                history = query_dicts(c)
+            return json.dumps({"success": True, "history": history})
+        except Exception as e:
+            print("get_rate_history error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
+    # -------------------------------
+    # 🧮 RATE CALCULATION (in-memory, no DB round trip)
+    # -------------------------------
+    def calculate_rate(self, data):
+        """Rate (and amount when litres given) for category/fat/snf on a date."""
+        try:
+            payload = json.loads(data)
+            category = payload.get("category")
+            fat = float(payload.get("fat") or 0)
+            snf = float(payload.get("snf") or 0)
+            litres = payload.get("litres")
+            litres = float(litres) if litres not in (None, "") else None
+            on_date = payload.get("date") or None
+
+            result = rate_engine.calculate(category, fat, snf, on_date, litres)
+            if result is None:
+                return json.dumps(
+                    {"success": False, "message": f"No rate found for category '{category}'"}
+                )
+            rate, amount = result
+            return json.dumps({"success": True, "rate": rate, "amount": amount})
+        except Exception as e:
+            print("calculate_rate error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
+    def get_rate_for_category(self, data):
+        """
+        Formula in force for a category on a date; "rate" is priced for
+        the given fat/snf (the bare base rate when they are omitted).
+        """
+        try:
+            payload = json.loads(data)
+            category = payload.get("category")
+            fat = float(payload.get("fat") or 0)
+            snf = float(payload.get("snf") or 0)
+            on_date = payload.get("date") or None
+
+            terms = rate_engine.lookup(category, on_date)
+            if terms is None:
+                return json.dumps(
+                    {"success": False, "message": f"No rate found for category '{category}'"}
+                )
+            base, fat_rate, snf_rate = terms
+            rate, _ = rate_engine.calculate(category, fat, snf, on_date)
+            return json.dumps(
+                {
+                    "success": True,
+                    "rate": rate,
+                    "base": base,
+                    "fat_rate": fat_rate,
+                    "snf_rate": snf_rate,
+                }
+            )
+        except Exception as e:
+            print("get_rate_for_category error:", e)
+            return json.dumps({"success": False, "message": str(e)})
+
 
 # -------------------------------
 # RUN APP
 # -------------------------------
-if __name__ == "__main__":
-    if not os.path.exists(DB):
-        print("Database not found. Please create it first.")
-    api = Api()
+def start_gui(debug=False, on_loaded=None):
+    """Open the dashboard window and block until it is closed."""
+    # imported here so the CLI, benchmarks and tests never load a GUI toolkit
+    import webview
+
     window = webview.create_window(
         "Varad Dairy",
         url="ui/index.html",
-        js_api=api,
+        js_api=Api(),
         width=1200,
         height=750,
         resizable=True,
     )
-    webview.start(debug=False)
+    if on_loaded is not None:
+        window.events.loaded += on_loaded
+    backup_scheduler.start()
+    try:
+        webview.start(debug=debug)
+    finally:
+        backup_scheduler.stop()
+        jobs.shutdown()
+        db.close()
+
+
+if __name__ == "__main__":
+    import multiprocessing
+
+    # bill rendering uses a process pool; required for the frozen .exe
+    multiprocessing.freeze_support()
+    if not os.path.exists(DB):
+        print("Database not found. Please create it first.")
+    else:
+        # Upgrade an existing database.db in place (indexes, new tables)
+        with db.exclusive() as conn:
+            migrate(conn)
+    start_gui()
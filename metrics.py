@@ -0,0 +1,328 @@
+"""
+metrics.py
+----------
+Backend instrumentation for Shree Ganesh Dairy Management System.
+
+- Every Api method call records wall time, SQL statements run, rows
+  fetched and response size (see instrument()).
+- Every SQL statement goes through MetricsCursor, which counts it
+  against the current call and times it. Statements slower than the
+  slow-query threshold are logged once with their EXPLAIN QUERY PLAN.
+- Latencies land in rolling per-minute histograms (fixed buckets, so
+  recording is a few integer adds) that get_metrics() merges on demand.
+
+Cheap enough to leave on; set DAIRY_METRICS=0 to switch it off.
+"""
+
+import functools
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict, deque
+
+# Latency bucket upper bounds in ms (last bucket is everything slower)
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+# Rolling window: WINDOW_SLOTS slots of SLOT_SECONDS each
+SLOT_SECONDS = 60
+WINDOW_SLOTS = 15
+
+DEFAULT_SLOW_MS = 250
+# Slow statements kept for get_metrics / plans remembered per statement
+SLOW_LOG_SIZE = 50
+PLAN_CACHE_SIZE = 200
+
+_call = threading.local()
+
+
+# -------------------------------
+# ROLLING HISTOGRAM
+# -------------------------------
+class RollingHistogram:
+    """Latency histogram plus call/query/row/byte totals over the last few minutes."""
+
+    def __init__(self, slot_seconds=SLOT_SECONDS, slots=WINDOW_SLOTS):
+        self.slot_seconds = slot_seconds
+        self._slots = deque(maxlen=slots)  # [slot, counts, calls, errors, ms, max, queries, rows, bytes]
+
+    def _slot(self, now):
+        slot = int(now // self.slot_seconds)
+        if not self._slots or self._slots[-1][0] != slot:
+            self._slots.append([slot, [0] * (len(BUCKETS_MS) + 1), 0, 0, 0.0, 0.0, 0, 0, 0])
+        return self._slots[-1]
+
+    def add(self, ms, now, error=False, queries=0, rows=0, size=0):
+        s = self._slot(now)
+        s[1][bisect_left(BUCKETS_MS, ms)] += 1
+        s[2] += 1
+        s[3] += error
+        s[4] += ms
+        if ms > s[5]:
+            s[5] = ms
+        s[6] += queries
+        s[7] += rows
+        s[8] += size
+
+    def snapshot(self, now):
+        oldest = int(now // self.slot_seconds) - self._slots.maxlen + 1
+        counts = [0] * (len(BUCKETS_MS) + 1)
+        calls = errors = queries = rows = size = 0
+        total_ms = max_ms = 0.0
+        for s in list(self._slots):
+            if s[0] < oldest:
+                continue
+            for i, n in enumerate(s[1]):
+                counts[i] += n
+            calls += s[2]
+            errors += s[3]
+            total_ms += s[4]
+            max_ms = max(max_ms, s[5])
+            queries += s[6]
+            rows += s[7]
+            size += s[8]
+        if not calls:
+            return None
+        return {
+            "calls": calls,
+            "errors": errors,
+            "mean_ms": round(total_ms / calls, 3),
+            "p50_ms": _percentile(counts, calls, 0.50, max_ms),
+            "p95_ms": _percentile(counts, calls, 0.95, max_ms),
+            "p99_ms": _percentile(counts, calls, 0.99, max_ms),
+            "max_ms": round(max_ms, 3),
+            "queries_per_call": round(queries / calls, 2),
+            "rows_per_call": round(rows / calls, 1),
+            "bytes_per_call": round(size / calls),
+            "buckets": {
+                (f"<={b}" if i < len(BUCKETS_MS) else f">{BUCKETS_MS[-1]}"): n
+                for i, (b, n) in enumerate(zip(BUCKETS_MS + (None,), counts))
+                if n
+            },
+        }
+
+
+def _percentile(counts, total, q, max_ms):
+    """Upper bound of the bucket holding the q-th sample (capped at the max seen)."""
+    target = q * total
+    seen = 0
+    for i, n in enumerate(counts):
+        seen += n
+        if seen >= target and n:
+            return min(BUCKETS_MS[i], round(max_ms, 3)) if i < len(BUCKETS_MS) else round(max_ms, 3)
+    return round(max_ms, 3)
+
+
+# -------------------------------
+# METRICS REGISTRY
+# -------------------------------
+class Metrics:
+    def __init__(self, slow_ms=DEFAULT_SLOW_MS, enabled=True):
+        self.slow_ms = slow_ms
+        self.enabled = enabled
+        self.started_at = time.time()
+        self._methods = {}
+        self._statements = RollingHistogram()
+        self._slow = deque(maxlen=SLOW_LOG_SIZE)
+        self._plans = OrderedDict()  # sql -> plan text
+        self._lock = threading.Lock()
+
+    def record_call(self, name, ms, error, queries, rows, size):
+        now = time.time()
+        with self._lock:
+            hist = self._methods.get(name)
+            if hist is None:
+                hist = self._methods[name] = RollingHistogram()
+            hist.add(ms, now, error, queries, rows, size)
+
+    def record_statement(self, cursor, sql, params, ms):
+        call = getattr(_call, "stats", None)
+        if call is not None:
+            call[0] += 1
+        with self._lock:
+            self._statements.add(ms, time.time())
+        if ms >= self.slow_ms:
+            self._log_slow(cursor, sql, params, ms)
+
+    def _log_slow(self, cursor, sql, params, ms):
+        with self._lock:
+            plan = self._plans.get(sql)
+        if plan is None:
+            try:
+                rows = cursor.connection.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+                plan = "\n".join(row[-1] for row in rows)
+            except sqlite3.Error as e:
+                plan = f"(no plan: {e})"
+            with self._lock:
+                self._plans[sql] = plan
+                while len(self._plans) > PLAN_CACHE_SIZE:
+                    self._plans.popitem(last=False)
+            # the plan is printed the first time a statement is slow
+            print(f"🐢 Slow query ({ms:.0f} ms): {' '.join(sql.split())}\n{plan}")
+
+        with self._lock:
+            self._slow.append(
+                {
+                    "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    "ms": round(ms, 3),
+                    "method": getattr(_call, "name", None),
+                    "sql": " ".join(sql.split()),
+                    "plan": plan,
+                }
+            )
+
+    def snapshot(self):
+        now = time.time()
+        with self._lock:
+            methods = {name: h.snapshot(now) for name, h in self._methods.items()}
+            statements = self._statements.snapshot(now)
+            slow = list(self._slow)
+        if statements:
+            for key in ("queries_per_call", "rows_per_call", "bytes_per_call"):
+                del statements[key]
+        return {
+            "enabled": self.enabled,
+            "uptime_s": round(now - self.started_at),
+            "window_s": SLOT_SECONDS * WINDOW_SLOTS,
+            "slow_ms": self.slow_ms,
+            "methods": {name: s for name, s in sorted(methods.items()) if s},
+            "statements": statements,
+            "slow_queries": slow,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._methods.clear()
+            self._statements = RollingHistogram()
+            self._slow.clear()
+            self._plans.clear()
+
+
+# -------------------------------
+# SQL CURSOR
+# -------------------------------
+class MetricsCursor(sqlite3.Cursor):
+    """
+    sqlite3 cursor that times statements and counts fetched rows.
+
+    A statement's time runs from execute() until its rows have been
+    fetched (or the cursor moves on / closes), so slow reads are caught
+    even when SQLite returns the first row quickly.
+    """
+
+    metrics = None
+    _pending = None  # [sql, params, ms] of the statement being read
+
+    def _finish(self):
+        pending = self._pending
+        if pending is not None:
+            self._pending = None
+            self.metrics.record_statement(self, *pending)
+
+    def _fetched(self, started, n):
+        if self._pending is not None:
+            self._pending[2] += (time.perf_counter() - started) * 1000
+        call = getattr(_call, "stats", None)
+        if call is not None:
+            call[1] += n
+
+    def execute(self, sql, params=()):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            self._pending = [sql, params, (time.perf_counter() - started) * 1000]
+
+    def executemany(self, sql, seq):
+        self._finish()
+        seq = list(seq)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq)
+        finally:
+            self._pending = [sql, seq[0] if seq else (), (time.perf_counter() - started) * 1000]
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        row = super().__next__()
+        self._fetched(started, 1)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+
+def cursor_class(metrics):
+    """MetricsCursor bound to a Metrics registry (pass to Database)."""
+    return type("MetricsCursor", (MetricsCursor,), {"metrics": metrics})
+
+
+# -------------------------------
+# API INSTRUMENTATION
+# -------------------------------
+def instrument(metrics):
+    """
+    Class decorator: time every public method of the Api class and
+    record its statements, rows and response size. An Api method called
+    from inside another one counts towards the outer call.
+    """
+
+    def wrap(name, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            if getattr(_call, "stats", None) is not None:
+                return method(*args, **kwargs)
+
+            _call.stats = [0, 0]  # statements, rows
+            _call.name = name
+            started = time.perf_counter()
+            try:
+                response = method(*args, **kwargs)
+            except BaseException:
+                metrics.record_call(name, (time.perf_counter() - started) * 1000,
+                                    True, *_call.stats, 0)
+                raise
+            finally:
+                stats = _call.stats
+                _call.stats = None
+                _call.name = None
+            ms = (time.perf_counter() - started) * 1000
+            if isinstance(response, str):
+                error = response.startswith('{"success": false')
+                size = len(response)
+            else:
+                error, size = False, 0
+            metrics.record_call(name, ms, error, stats[0], stats[1], size)
+            return response
+
+        return wrapper
+
+    def decorator(cls):
+        if not metrics.enabled:
+            return cls
+        for name, value in list(vars(cls).items()):
+            if callable(value) and not name.startswith("_"):
+                setattr(cls, name, wrap(name, value))
+        return cls
+
+    return decorator
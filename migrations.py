@@ -0,0 +1,888 @@
+"""
+migrations.py
+-------------
+Versioned schema migrations for Shree Ganesh Dairy Management System.
+
+create_db.py lays down the base tables; everything after that lives here
+as an ordered list of steps. The applied version is stored in
+PRAGMA user_version, so an existing database.db (even one with years of
+milk_records) is upgraded in place the next time the app starts.
+
+Each step runs in its own transaction together with the version bump,
+so a crash half-way through leaves the database on the previous version.
+"""
+
+from datetime import datetime
+
+
+class MigrationError(Exception):
+    """A step refused to run (data it cannot convert without losing it)."""
+
+
+# -------------------------------
+# MIGRATION STEPS
+# -------------------------------
+
+
+def _v1_hot_query_indexes(c):
+    """Composite indexes for the date/shift and per-farmer access paths."""
+    # get_summary / fetch_records: WHERE rec_date=? AND shift=?
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_milk_date_shift "
+        "ON milk_records (rec_date, shift)"
+    )
+    # get_individual_bill / generate_bill: WHERE farmer_code=? AND rec_date BETWEEN
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_milk_farmer_date "
+        "ON milk_records (farmer_code, rec_date)"
+    )
+    # bills: WHERE farmer_code=? AND date BETWEEN
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_adv_farmer_date "
+        "ON farmer_advances (farmer_code, date)"
+    )
+    # get_reports_summary: WHERE date BETWEEN
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_adv_date ON farmer_advances (date)"
+    )
+    # get_reports_summary: WHERE sale_date BETWEEN
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_sales_date ON sales_records (sale_date)"
+    )
+
+
+def _v2_records_keyset_index(c):
+    """Index for fetch_records paging: ORDER BY rec_date DESC, id DESC."""
+    # id is the rowid, which every index carries implicitly after rec_date
+    c.execute("CREATE INDEX IF NOT EXISTS idx_milk_date ON milk_records (rec_date)")
+
+
+def _rollup_triggers(table, source, day, shift, category, litres, amount="IFNULL({row}.amount, 0)"):
+    """
+    INSERT/UPDATE/DELETE triggers that keep daily_totals in step with one
+    source table. Column arguments are SQL expressions over {row} (NEW./OLD.).
+    """
+
+    def add(row):
+        return f"""
+            INSERT INTO daily_totals (source, day, shift, category, litres, amount, records)
+            VALUES ('{source}', {day.format(row=row)}, {shift.format(row=row)},
+                    {category.format(row=row)}, {litres.format(row=row)},
+                    {amount.format(row=row)}, 1)
+            ON CONFLICT (source, day, shift, category) DO UPDATE SET
+                litres = litres + excluded.litres,
+                amount = amount + excluded.amount,
+                records = records + 1;
+        """
+
+    def remove(row):
+        key = (
+            f"source = '{source}' AND day = {day.format(row=row)} "
+            f"AND shift = {shift.format(row=row)} "
+            f"AND category = {category.format(row=row)}"
+        )
+        return f"""
+            UPDATE daily_totals SET
+                litres = litres - {litres.format(row=row)},
+                amount = amount - {amount.format(row=row)},
+                records = records - 1
+            WHERE {key};
+            DELETE FROM daily_totals WHERE {key} AND records <= 0;
+        """
+
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_rollup_ins
+            AFTER INSERT ON {table} BEGIN {add("NEW")} END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_rollup_del
+            AFTER DELETE ON {table} BEGIN {remove("OLD")} END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_rollup_upd
+            AFTER UPDATE ON {table} BEGIN {remove("OLD")} {add("NEW")} END""",
+    ]
+
+
+def _v3_daily_totals(c):
+    """Rollup of litres/amount/count per (source, day, shift, category)."""
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS daily_totals (
+            source TEXT NOT NULL,          -- 'milk', 'sale' or 'advance'
+            day TEXT NOT NULL,
+            shift TEXT NOT NULL DEFAULT '',
+            category TEXT NOT NULL DEFAULT '',
+            litres REAL NOT NULL DEFAULT 0,
+            amount REAL NOT NULL DEFAULT 0,
+            records INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (source, day, shift, category)
+        ) WITHOUT ROWID
+        """
+    )
+
+    # Backfill from existing history
+    c.execute("DELETE FROM daily_totals")
+    c.execute(
+        """
+        INSERT INTO daily_totals (source, day, shift, category, litres, amount, records)
+        SELECT 'milk', rec_date, IFNULL(shift, ''), IFNULL(category, ''),
+               IFNULL(SUM(litres), 0), IFNULL(SUM(amount), 0), COUNT(*)
+        FROM milk_records
+        GROUP BY rec_date, IFNULL(shift, ''), IFNULL(category, '')
+        """
+    )
+    c.execute(
+        """
+        INSERT INTO daily_totals (source, day, litres, amount, records)
+        SELECT 'sale', IFNULL(sale_date, ''), IFNULL(SUM(litres), 0),
+               IFNULL(SUM(amount), 0), COUNT(*)
+        FROM sales_records
+        GROUP BY IFNULL(sale_date, '')
+        """
+    )
+    c.execute(
+        """
+        INSERT INTO daily_totals (source, day, amount, records)
+        SELECT 'advance', IFNULL(date, ''), IFNULL(SUM(amount), 0), COUNT(*)
+        FROM farmer_advances
+        GROUP BY IFNULL(date, '')
+        """
+    )
+
+    triggers = (
+        _rollup_triggers(
+            "milk_records", "milk", "IFNULL({row}.rec_date, '')",
+            "IFNULL({row}.shift, '')", "IFNULL({row}.category, '')",
+            "IFNULL({row}.litres, 0)",
+        )
+        + _rollup_triggers(
+            "sales_records", "sale", "IFNULL({row}.sale_date, '')",
+            "''", "''", "IFNULL({row}.litres, 0)",
+        )
+        + _rollup_triggers(
+            "farmer_advances", "advance", "IFNULL({row}.date, '')",
+            "''", "''", "0",
+        )
+    )
+    for sql in triggers:
+        c.execute(sql)
+
+
+def _v4_rate_history(c):
+    """Effective-dated rate formulas; rate_table keeps the rates in force today."""
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS rate_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category TEXT NOT NULL,
+            effective_from TEXT NOT NULL,
+            base REAL DEFAULT 0,
+            fat_rate REAL DEFAULT 0,
+            snf_rate REAL DEFAULT 0,
+            created_at TEXT DEFAULT (datetime('now','localtime')),
+            UNIQUE (category, effective_from)
+        )
+        """
+    )
+    # Existing rates apply to all past records
+    c.execute(
+        """
+        INSERT OR IGNORE INTO rate_history (category, effective_from, base, fat_rate, snf_rate)
+        SELECT category, '0000-01-01', base, fat_rate, snf_rate FROM rate_table
+        """
+    )
+
+
+def _v5_archive_years(c):
+    """Registry of financial years moved out to archive/dairy_fy<year>.db."""
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS archive_years (
+            year INTEGER PRIMARY KEY,      -- financial year starting 1 April <year>
+            file TEXT NOT NULL,
+            milk_records INTEGER DEFAULT 0,
+            farmer_advances INTEGER DEFAULT 0,
+            sales_records INTEGER DEFAULT 0,
+            archived_at TEXT
+        )
+        """
+    )
+
+
+def _ledger_triggers(
+    table, column, day, sign,
+    code="IFNULL({row}.farmer_code, '')",
+    when=None,
+    value="IFNULL({row}.amount, 0)",
+    quantity="IFNULL({row}.litres, 0)",
+    watched=None,
+):
+    """
+    INSERT/UPDATE/DELETE triggers posting one source table into
+    farmer_ledger. sign is +1 when the rows raise what the farmer is
+    owed (milk) and -1 when they lower it (advances, payments).
+    code / when / value / quantity are SQL over {row} for tables not
+    storing farmer_code, the day text and rupees directly.
+    """
+    litres = "litres" if column == "milk" else None
+    when = when or f"IFNULL({{row}}.{day}, '')"
+    watched = watched or f"farmer_code, {day}, amount" + (", litres" if litres else "")
+
+    def post(row, factor):
+        code_sql = code.format(row=row)
+        when_sql = when.format(row=row)
+        amount = f"({factor} * {value.format(row=row)})"
+        delta = f"({sign * factor} * {value.format(row=row)})"
+        cols = f"{column}" + (", litres" if litres else "")
+        vals = amount + (f", ({factor} * {quantity.format(row=row)})" if litres else "")
+        sets = f"{column} = {column} + excluded.{column}" + (
+            ", litres = litres + excluded.litres" if litres else ""
+        )
+        return f"""
+            INSERT INTO farmer_ledger (farmer_code, day, {cols}, closing)
+            VALUES ({code_sql}, {when_sql}, {vals},
+                    IFNULL((SELECT closing FROM farmer_ledger
+                            WHERE farmer_code = {code_sql} AND day < {when_sql}
+                            ORDER BY day DESC LIMIT 1), 0) + {delta})
+            ON CONFLICT (farmer_code, day) DO UPDATE SET
+                {sets},
+                closing = closing + {delta};
+            UPDATE farmer_ledger SET closing = closing + {delta}
+            WHERE farmer_code = {code_sql} AND day > {when_sql};
+        """
+
+    active = "WHEN NOT EXISTS (SELECT 1 FROM ledger_pause)"
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_ledger_ins
+            AFTER INSERT ON {table} {active} BEGIN {post("NEW", 1)} END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_ledger_del
+            AFTER DELETE ON {table} {active} BEGIN {post("OLD", -1)} END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_ledger_upd
+            AFTER UPDATE OF {watched} ON {table}
+            {active} BEGIN {post("OLD", -1)} {post("NEW", 1)} END""",
+    ]
+
+
+def _v6_farmer_ledger(c):
+    """Farmer payments and the per-day running balance ledger."""
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS farmer_payments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            farmer_code TEXT NOT NULL,
+            date TEXT NOT NULL,
+            amount REAL NOT NULL DEFAULT 0,
+            mode TEXT DEFAULT 'Cash',
+            remarks TEXT,
+            created_at TEXT DEFAULT (datetime('now','localtime'))
+        )
+        """
+    )
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_pay_farmer_date ON farmer_payments (farmer_code, date)"
+    )
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS farmer_ledger (
+            farmer_code TEXT NOT NULL,
+            day TEXT NOT NULL,
+            litres REAL NOT NULL DEFAULT 0,
+            milk REAL NOT NULL DEFAULT 0,       -- amount earned for milk
+            advance REAL NOT NULL DEFAULT 0,
+            payment REAL NOT NULL DEFAULT 0,
+            closing REAL NOT NULL DEFAULT 0,    -- balance owed to the farmer after the day
+            PRIMARY KEY (farmer_code, day)
+        ) WITHOUT ROWID
+        """
+    )
+    # Any row here switches the ledger triggers off (see ledger.paused)
+    c.execute("CREATE TABLE IF NOT EXISTS ledger_pause (id INTEGER PRIMARY KEY)")
+
+    # Backfill from existing history, running balance by window sum
+    c.execute("DELETE FROM farmer_ledger")
+    c.execute(
+        """
+        INSERT INTO farmer_ledger (farmer_code, day, litres, milk, advance, payment, closing)
+        SELECT farmer_code, day, litres, milk, advance, payment,
+               SUM(milk - advance - payment) OVER (
+                   PARTITION BY farmer_code ORDER BY day
+                   ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+               )
+        FROM (
+            SELECT farmer_code, day, SUM(litres) AS litres, SUM(milk) AS milk,
+                   SUM(advance) AS advance, SUM(payment) AS payment
+            FROM (
+                SELECT IFNULL(farmer_code, '') AS farmer_code, IFNULL(rec_date, '') AS day,
+                       IFNULL(litres, 0) AS litres, IFNULL(amount, 0) AS milk,
+                       0 AS advance, 0 AS payment
+                FROM milk_records
+                UNION ALL
+                SELECT IFNULL(farmer_code, ''), IFNULL(date, ''), 0, 0, IFNULL(amount, 0), 0
+                FROM farmer_advances
+                UNION ALL
+                SELECT IFNULL(farmer_code, ''), IFNULL(date, ''), 0, 0, 0, IFNULL(amount, 0)
+                FROM farmer_payments
+            )
+            GROUP BY farmer_code, day
+        )
+        """
+    )
+
+    triggers = (
+        _ledger_triggers("milk_records", "milk", "rec_date", 1)
+        + _ledger_triggers("farmer_advances", "advance", "date", -1)
+        + _ledger_triggers("farmer_payments", "payment", "date", -1)
+    )
+    for sql in triggers:
+        c.execute(sql)
+
+
+# Replicated tables: (table, natural key columns or None for id-keyed rows, columns)
+_SYNC_TABLES = [
+    ("farmers", ("code",), ("code", "name", "category")),
+    ("rate_table", ("category",), ("category", "base", "fat_rate", "snf_rate")),
+    (
+        "rate_history",
+        ("category", "effective_from"),
+        ("category", "effective_from", "base", "fat_rate", "snf_rate", "created_at"),
+    ),
+    (
+        "milk_records",
+        None,
+        (
+            "rec_date", "farmer_code", "farmer_name", "category", "shift",
+            "litres", "fat", "snf", "rate", "amount", "created_at",
+        ),
+    ),
+    ("farmer_advances", None, ("farmer_code", "date", "amount", "remarks")),
+    (
+        "farmer_payments",
+        None,
+        ("farmer_code", "date", "amount", "mode", "remarks", "created_at"),
+    ),
+    ("sales_records", None, ("sale_date", "customer", "litres", "rate", "amount")),
+]
+
+
+def _sync_triggers(table, key, columns, name=None, values=None):
+    """
+    INSERT/UPDATE/DELETE triggers appending one table's writes to
+    change_log. Rows with a natural key are identified by it; other
+    rows by "<site>:<id>" of the site that created them (sync_rows maps
+    rows received from other sites to their local id).
+
+    name is the table name logged (when table only stores its rows) and
+    values the json_object() over NEW to log instead of plain columns.
+    """
+    name = name or table
+
+    def key_of(row):
+        if key:
+            return "json_array(" + ", ".join(f"{row}.{k}" for k in key) + ")"
+        return (
+            f"COALESCE((SELECT uid FROM sync_rows WHERE tbl = '{name}' AND local_id = {row}.id), "
+            f"(SELECT site FROM sync_site) || ':' || {row}.id)"
+        )
+
+    def log(op, row, data):
+        return f"""
+            INSERT INTO change_log (origin, tbl, op, key, row)
+            VALUES ((SELECT site FROM sync_site), '{name}', '{op}', {key_of(row)}, {data});
+        """
+
+    values = values or "json_object(" + ", ".join(f"'{col}', NEW.{col}" for col in columns) + ")"
+    forget = "" if key else (
+        f"DELETE FROM sync_rows WHERE tbl = '{name}' AND local_id = OLD.id;"
+    )
+    active = "WHEN NOT EXISTS (SELECT 1 FROM sync_pause)"
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_sync_ins
+            AFTER INSERT ON {table} {active} BEGIN {log("I", "NEW", values)} END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_sync_upd
+            AFTER UPDATE ON {table} {active} BEGIN {log("U", "OLD", values)} END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_sync_del
+            AFTER DELETE ON {table} {active} BEGIN {log("D", "OLD", "NULL")} {forget} END""",
+    ]
+
+
+def _v7_change_log(c):
+    """Append-only change log and bookkeeping for delta-file replication."""
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sync_site (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            site TEXT NOT NULL
+        )
+        """
+    )
+    c.execute(
+        "INSERT OR IGNORE INTO sync_site (id, site) VALUES (1, lower(hex(randomblob(4))))"
+    )
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            origin TEXT NOT NULL,           -- site the change was made at
+            origin_seq INTEGER,             -- its seq there (NULL: made here, = seq)
+            tbl TEXT NOT NULL,
+            op TEXT NOT NULL,               -- I / U / D
+            key TEXT NOT NULL,
+            row TEXT,                       -- JSON column values (NULL for D)
+            -- UTC with milliseconds: orders edits of one row made at different sites
+            at TEXT DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+        )
+        """
+    )
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_change_origin ON change_log (origin, origin_seq)"
+    )
+    # latest change of one row, for last-writer-wins on import
+    c.execute("CREATE INDEX IF NOT EXISTS idx_change_row ON change_log (tbl, key)")
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sync_rows (
+            tbl TEXT NOT NULL,
+            local_id INTEGER NOT NULL,
+            uid TEXT NOT NULL,              -- <origin site>:<id there>
+            PRIMARY KEY (tbl, local_id)
+        ) WITHOUT ROWID
+        """
+    )
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_sync_rows_uid ON sync_rows (tbl, uid)")
+    # Highest origin_seq applied here, per remote site
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sync_applied (
+            origin TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL
+        )
+        """
+    )
+    # What each peer reported having applied (sent back in its delta files)
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sync_peers (
+            peer TEXT NOT NULL,
+            origin TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            PRIMARY KEY (peer, origin)
+        ) WITHOUT ROWID
+        """
+    )
+    # Any row here switches the change-log triggers off (see sync.paused)
+    c.execute("CREATE TABLE IF NOT EXISTS sync_pause (id INTEGER PRIMARY KEY)")
+
+    for table, key, columns in _SYNC_TABLES:
+        for sql in _sync_triggers(table, key, columns):
+            c.execute(sql)
+
+
+def _milk_entry_values(row):
+    """milk_entries column values from a milk_records-shaped row (legacy table, view NEW)."""
+    return f"""
+        CAST(julianday({row}.rec_date) - 2440587.5 AS INTEGER),
+        (SELECT id FROM farmer_codes WHERE code = {row}.farmer_code),
+        (SELECT id FROM categories WHERE name = {row}.category),
+        (SELECT id FROM shifts WHERE name = {row}.shift),
+        CAST(ROUND(IFNULL({row}.litres, 0) * 1000) AS INTEGER),
+        CAST(ROUND(IFNULL({row}.fat, 0) * 100) AS INTEGER),
+        CAST(ROUND(IFNULL({row}.snf, 0) * 100) AS INTEGER),
+        CAST(ROUND(IFNULL({row}.rate, 0) * 100) AS INTEGER),
+        CAST(ROUND(IFNULL({row}.amount, 0) * 100) AS INTEGER),
+        COALESCE(CAST(strftime('%s', {row}.created_at) AS INTEGER),
+                 CAST(strftime('%s', 'now', 'localtime') AS INTEGER))
+    """
+
+
+_MILK_ENTRY_COLUMNS = "day, farmer, category, shift, litres, fat, snf, rate, amount, created_at"
+
+# Spellings of a date found in old milk_records (day before month, as
+# written in India); 2-digit years are tried before 4-digit ones
+LEGACY_DATE_FORMATS = (
+    "%Y-%m-%d",
+    "%Y/%m/%d",
+    "%Y%m%d",
+    "%d/%m/%y",
+    "%d-%m-%y",
+    "%d.%m.%y",
+    "%d/%m/%Y",
+    "%d-%m-%Y",
+    "%d.%m.%Y",
+)
+
+
+def normalise_date(text):
+    """YYYY-MM-DD for a legacy date spelling ("2024-5-3", "03/05/2024"), or None."""
+    words = str(text).strip().replace("T", " ").split()
+    if not words:
+        return None
+    for fmt in LEGACY_DATE_FORMATS:
+        try:
+            day = datetime.strptime(words[0], fmt).date()
+        except ValueError:
+            continue
+        if 1900 <= day.year <= 2100:
+            return day.isoformat()
+    return None
+
+
+def _normalise_legacy_dates(c, schema):
+    """
+    Rewrite <schema>.milk_records dates not already YYYY-MM-DD, so none
+    is lost converting to day numbers. Aborts with the ids of any it
+    cannot read.
+    """
+    c.execute(
+        f"""
+        SELECT id, rec_date FROM {schema}.milk_records
+        WHERE rec_date IS NOT NULL AND TRIM(rec_date) != ''
+          AND rec_date IS NOT IFNULL(date(rec_date), '')
+        """
+    )
+    rows = c.fetchall()
+    fixed = [(normalise_date(text), row_id) for row_id, text in rows]
+    bad = [row_id for day, row_id in fixed if day is None]
+    if bad:
+        shown = ", ".join(str(row_id) for row_id in bad[:50]) + (" ..." if len(bad) > 50 else "")
+        raise MigrationError(
+            f"{len(bad)} milk record(s) in {schema}.milk_records have dates that cannot be read "
+            f"(ids {shown}); correct them to YYYY-MM-DD and start again"
+        )
+    if not fixed:
+        return
+
+    # main's legacy table still has its ledger triggers, which move each
+    # amount to the corrected day; the change log must not replicate it
+    logged = c.execute(
+        f"SELECT 1 FROM {schema}.sqlite_master WHERE name = 'sync_pause'"
+    ).fetchone()
+    if logged:
+        c.execute(f"INSERT INTO {schema}.sync_pause (id) VALUES (1)")
+    c.executemany(f"UPDATE {schema}.milk_records SET rec_date = ? WHERE id = ?", fixed)
+    if logged:
+        c.execute(f"DELETE FROM {schema}.sync_pause")
+        c.execute(
+            f"""
+            DELETE FROM {schema}.farmer_ledger
+            WHERE day IS NOT IFNULL(date(day), '')
+              AND litres = 0 AND milk = 0 AND advance = 0 AND payment = 0
+            """
+        )
+
+
+def copy_legacy_milk_records(c, schema="main"):
+    """
+    Convert <schema>.milk_records (the pre-v8 table) into <schema>.milk_entries,
+    keeping ids. Codes, categories and shifts are added to main's lookups.
+    Also used for archive files made before v8.
+    """
+    _normalise_legacy_dates(c, schema)
+    for table, column, value in (
+        ("farmer_codes", "code", "farmer_code"),
+        ("categories", "name", "category"),
+        ("shifts", "name", "shift"),
+    ):
+        c.execute(
+            f"""
+            INSERT OR IGNORE INTO main.{table} ({column})
+            SELECT DISTINCT {value} FROM {schema}.milk_records
+            WHERE {value} IS NOT NULL AND {value} != ''
+            """
+        )
+    c.execute(
+        f"""
+        INSERT INTO {schema}.milk_entries (id, {_MILK_ENTRY_COLUMNS})
+        SELECT m.id, {_milk_entry_values("m")}
+        FROM {schema}.milk_records m
+        """
+    )
+
+
+def _v8_compact_milk_records(c):
+    """milk_records stored as integers (milk_entries) behind a milk_records view."""
+    # Lookups: small integer keys; rows are only ever added
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS farmer_codes (
+            id INTEGER PRIMARY KEY,
+            code TEXT NOT NULL UNIQUE
+        )
+        """
+    )
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS shifts (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE COLLATE NOCASE
+        )
+        """
+    )
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE COLLATE NOCASE
+        )
+        """
+    )
+    c.execute("INSERT OR IGNORE INTO shifts (id, name) VALUES (1, 'Morning'), (2, 'Evening')")
+    c.execute("INSERT OR IGNORE INTO farmer_codes (code) SELECT code FROM farmers ORDER BY id")
+    c.execute(
+        """
+        INSERT OR IGNORE INTO categories (name)
+        SELECT category FROM farmers WHERE category IS NOT NULL AND category != ''
+        UNION ALL
+        SELECT category FROM rate_table
+        """
+    )
+
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS milk_entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            day INTEGER,                        -- days since 1970-01-01
+            farmer INTEGER,                     -- farmer_codes.id
+            category INTEGER,                   -- categories.id
+            shift INTEGER,                      -- shifts.id
+            litres INTEGER NOT NULL DEFAULT 0,  -- millilitres
+            fat INTEGER NOT NULL DEFAULT 0,     -- hundredths
+            snf INTEGER NOT NULL DEFAULT 0,     -- hundredths
+            rate INTEGER NOT NULL DEFAULT 0,    -- paise per litre
+            amount INTEGER NOT NULL DEFAULT 0,  -- paise
+            created_at INTEGER                  -- local time, seconds since 1970
+        )
+        """
+    )
+    c.execute("SELECT seq FROM sqlite_sequence WHERE name = 'milk_records'")
+    row = c.fetchone()
+    copy_legacy_milk_records(c)
+    # ids are never reused (sync keys): continue after the old table's sequence
+    c.execute("DELETE FROM sqlite_sequence WHERE name = 'milk_entries'")
+    c.execute(
+        """
+        INSERT INTO sqlite_sequence (name, seq)
+        VALUES ('milk_entries', MAX(?, (SELECT IFNULL(MAX(id), 0) FROM milk_entries)))
+        """,
+        (row[0] if row else 0,),
+    )
+    # its indexes and rollup / ledger / sync triggers go with it
+    c.execute("DROP TABLE milk_records")
+
+    # keyset paging (day DESC, id DESC) and per-day filters
+    c.execute("CREATE INDEX IF NOT EXISTS idx_entries_day ON milk_entries (day)")
+    # bills / ledger: WHERE farmer=? AND day BETWEEN
+    c.execute("CREATE INDEX IF NOT EXISTS idx_entries_farmer_day ON milk_entries (farmer, day)")
+
+    # The familiar shape, plus the raw keys to filter on (see records.py)
+    c.execute(
+        """
+        CREATE VIEW IF NOT EXISTS milk_records AS
+        SELECT
+            e.id AS id,
+            date(e.day * 86400, 'unixepoch') AS rec_date,
+            fc.code AS farmer_code,
+            COALESCE(f.name, 'Unknown') AS farmer_name,
+            k.name AS category,
+            s.name AS shift,
+            e.litres / 1000.0 AS litres,
+            e.fat / 100.0 AS fat,
+            e.snf / 100.0 AS snf,
+            e.rate / 100.0 AS rate,
+            e.amount / 100.0 AS amount,
+            datetime(e.created_at, 'unixepoch') AS created_at,
+            e.day AS day,
+            e.farmer AS farmer_id,
+            e.shift AS shift_id
+        FROM milk_entries e
+        LEFT JOIN farmer_codes fc ON fc.id = e.farmer
+        LEFT JOIN farmers f ON f.code = fc.code
+        LEFT JOIN shifts s ON s.id = e.shift
+        LEFT JOIN categories k ON k.id = e.category
+        """
+    )
+    lookups = """
+        SELECT RAISE(ABORT, 'Invalid record date') WHERE julianday(NEW.rec_date) IS NULL;
+        INSERT OR IGNORE INTO farmer_codes (code) VALUES (NEW.farmer_code);
+        INSERT OR IGNORE INTO categories (name) VALUES (NULLIF(NEW.category, ''));
+        INSERT OR IGNORE INTO shifts (name) VALUES (NULLIF(NEW.shift, ''));
+    """
+    c.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_milk_records_view_ins
+        INSTEAD OF INSERT ON milk_records BEGIN
+            {lookups}
+            INSERT INTO milk_entries (id, {_MILK_ENTRY_COLUMNS})
+            VALUES (NEW.id, {_milk_entry_values("NEW")});
+        END
+        """
+    )
+    c.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_milk_records_view_upd
+        INSTEAD OF UPDATE ON milk_records BEGIN
+            {lookups}
+            UPDATE milk_entries SET ({_MILK_ENTRY_COLUMNS}) = ({_milk_entry_values("NEW")})
+            WHERE id = OLD.id;
+        END
+        """
+    )
+    c.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_milk_records_view_del
+        INSTEAD OF DELETE ON milk_records BEGIN
+            DELETE FROM milk_entries WHERE id = OLD.id;
+        END
+        """
+    )
+
+    # Rollup rows again, now with one spelling per shift / category
+    c.execute("DELETE FROM daily_totals WHERE source = 'milk'")
+    c.execute(
+        """
+        INSERT INTO daily_totals (source, day, shift, category, litres, amount, records)
+        SELECT 'milk', IFNULL(date(e.day * 86400, 'unixepoch'), ''),
+               IFNULL(s.name, ''), IFNULL(k.name, ''),
+               SUM(e.litres) / 1000.0, SUM(e.amount) / 100.0, COUNT(*)
+        FROM milk_entries e
+        LEFT JOIN shifts s ON s.id = e.shift
+        LEFT JOIN categories k ON k.id = e.category
+        GROUP BY e.day, e.shift, e.category
+        """
+    )
+
+    day = "IFNULL(date({row}.day * 86400, 'unixepoch'), '')"
+    triggers = (
+        _rollup_triggers(
+            "milk_entries", "milk", day,
+            "IFNULL((SELECT name FROM shifts WHERE id = {row}.shift), '')",
+            "IFNULL((SELECT name FROM categories WHERE id = {row}.category), '')",
+            "({row}.litres / 1000.0)",
+            amount="({row}.amount / 100.0)",
+        )
+        + _ledger_triggers(
+            "milk_entries", "milk", None, 1,
+            code="IFNULL((SELECT code FROM farmer_codes WHERE id = {row}.farmer), '')",
+            when=day,
+            value="({row}.amount / 100.0)",
+            quantity="({row}.litres / 1000.0)",
+            watched="farmer, day, amount, litres",
+        )
+        + _sync_triggers(
+            "milk_entries", None, (),
+            name="milk_records",
+            values="""json_object(
+                'rec_date', date(NEW.day * 86400, 'unixepoch'),
+                'farmer_code', (SELECT code FROM farmer_codes WHERE id = NEW.farmer),
+                'category', (SELECT name FROM categories WHERE id = NEW.category),
+                'shift', (SELECT name FROM shifts WHERE id = NEW.shift),
+                'litres', NEW.litres / 1000.0,
+                'fat', NEW.fat / 100.0,
+                'snf', NEW.snf / 100.0,
+                'rate', NEW.rate / 100.0,
+                'amount', NEW.amount / 100.0,
+                'created_at', datetime(NEW.created_at, 'unixepoch'))""",
+        )
+    )
+    for sql in triggers:
+        c.execute(sql)
+
+
+# FTS5 index -> (indexed table, its text columns)
+SEARCH_INDEXES = {
+    "farmers_fts": ("farmers", ("code", "name")),
+    "advances_fts": ("farmer_advances", ("remarks",)),
+    "sales_fts": ("sales_records", ("customer",)),
+}
+
+
+def _fts_triggers(fts, table, columns):
+    """Keep an external-content FTS5 index in step with its table."""
+    cols = ", ".join(columns)
+
+    def values(row):
+        return ", ".join(f"{row}.{col}" for col in columns)
+
+    remove = f"INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', OLD.id, {values('OLD')});"
+    add = f"INSERT INTO {fts} (rowid, {cols}) VALUES (NEW.id, {values('NEW')});"
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{fts}_ins
+            AFTER INSERT ON {table} BEGIN {add} END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{fts}_upd
+            AFTER UPDATE OF {cols} ON {table} BEGIN {remove} {add} END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{fts}_del
+            AFTER DELETE ON {table} BEGIN {remove} END""",
+    ]
+
+
+def _v9_search_index(c):
+    """FTS5 indexes for search: farmer code/name, advance remarks, sale customers."""
+    for fts, (table, columns) in SEARCH_INDEXES.items():
+        # external content: the index stores tokens only, rows stay in the table;
+        # prefix indexes make "trac*" / "F00*" as fast as whole words
+        c.execute(
+            f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                {", ".join(columns)},
+                content='{table}', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )
+            """
+        )
+        c.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+        for sql in _fts_triggers(fts, table, columns):
+            c.execute(sql)
+
+
+# (version, description, step) — append only, never renumber.
+MIGRATIONS = [
+    (1, "indexes for hot milk/advance/sales queries", _v1_hot_query_indexes),
+    (2, "keyset index for milk record paging", _v2_records_keyset_index),
+    (3, "daily/shift rollup table with maintenance triggers", _v3_daily_totals),
+    (4, "effective-dated rate history", _v4_rate_history),
+    (5, "registry of archived financial years", _v5_archive_years),
+    (6, "farmer payments and running balance ledger", _v6_farmer_ledger),
+    (7, "change log for delta-file replication", _v7_change_log),
+    (8, "compact integer storage for milk records", _v8_compact_milk_records),
+    (9, "full-text search indexes", _v9_search_index),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# -------------------------------
+# RUNNER
+# -------------------------------
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, verbose=True):
+    """Apply every pending migration to an open connection. Returns the new version."""
+    if conn.in_transaction:
+        conn.commit()
+
+    version = current_version(conn)
+    applied = False
+    for step_version, description, step in MIGRATIONS:
+        if step_version <= version:
+            continue
+        if verbose:
+            print(f"⚙️ Migrating database to v{step_version}: {description} ...")
+        c = conn.cursor()
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            step(c)
+            # PRAGMA does not accept bound parameters
+            c.execute(f"PRAGMA user_version={int(step_version)}")
+            c.execute("COMMIT")
+        except BaseException:
+            c.execute("ROLLBACK")
+            raise
+        finally:
+            c.close()
+        version = step_version
+        applied = True
+
+    if applied:
+        # Refresh planner statistics so the new indexes are actually picked.
+        conn.execute("ANALYZE")
+    return version
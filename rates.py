@@ -0,0 +1,131 @@
+"""
+rates.py
+--------
+In-memory milk rate engine for Shree Ganesh Dairy Management System.
+
+Rate formula per category:  rate = base + fat * fat_rate + snf * snf_rate
+
+Formulas come from rate_history, where every row is effective from its
+date until the next row for the same category. The whole history is
+loaded once into sorted per-category lists, so pricing a
+(category, fat, snf, date) tuple is a dict lookup plus a bisect, with
+no database round trip. Call invalidate() after any rate change; changes
+made by another process are picked up through Database.external_version().
+"""
+
+import threading
+from bisect import bisect_right
+from datetime import date
+
+# Used for rates entered without a date that must cover all old records
+EPOCH = "0000-01-01"
+
+
+def _key(category):
+    return (category or "").strip().casefold()
+
+
+class RateEngine:
+    def __init__(self, db):
+        self.db = db
+        self._lock = threading.Lock()
+        self._formulas = None
+        self._generation = 0
+        self._version = None  # db.external_version() seen last
+
+    # -------------------------------
+    # CACHE
+    # -------------------------------
+    def _load(self):
+        with self.db.read() as c:
+            c.execute(
+                """
+                SELECT category, effective_from, base, fat_rate, snf_rate
+                FROM rate_history
+                ORDER BY category, effective_from
+                """
+            )
+            rows = c.fetchall()
+
+        formulas = {}
+        for category, effective_from, base, fat_rate, snf_rate in rows:
+            dates, terms = formulas.setdefault(_key(category), ([], []))
+            dates.append(effective_from)
+            terms.append((base or 0.0, fat_rate or 0.0, snf_rate or 0.0))
+        return formulas
+
+    def formulas(self):
+        """{category: (sorted effective dates, [(base, fat_rate, snf_rate)])}"""
+        version = self.db.external_version()
+        if version != self._version:
+            # rates written by another process
+            self._version = version
+            self.invalidate()
+        formulas = self._formulas
+        if formulas is None:
+            with self._lock:
+                if self._formulas is None:
+                    generation = self._generation
+                    loaded = self._load()
+                    # a rate write during the load makes this copy stale
+                    if generation == self._generation:
+                        self._formulas = loaded
+                    formulas = loaded
+                else:
+                    formulas = self._formulas
+        return formulas
+
+    def invalidate(self):
+        self._generation += 1
+        self._formulas = None
+
+    # -------------------------------
+    # LOOKUP
+    # -------------------------------
+    def lookup(self, category, on_date=None):
+        """Return (base, fat_rate, snf_rate) in force on a date, or None."""
+        entry = self.formulas().get(_key(category))
+        if not entry:
+            return None
+        dates, terms = entry
+        i = bisect_right(dates, on_date or date.today().isoformat()) - 1
+        if i < 0:
+            return None
+        return terms[i]
+
+    def calculate(self, category, fat, snf, on_date=None, litres=None):
+        """Return (rate, amount) rounded to paise; amount is None without litres."""
+        terms = self.lookup(category, on_date)
+        if terms is None:
+            return None
+        base, fat_rate, snf_rate = terms
+        rate = round(base + fat * fat_rate + snf * snf_rate, 2)
+        amount = round(rate * litres, 2) if litres is not None else None
+        return rate, amount
+
+
+def sync_current_rate(c, category, today=None):
+    """Copy the formula in force today for one category into rate_table."""
+    today = today or date.today().isoformat()
+    c.execute(
+        """
+        SELECT base, fat_rate, snf_rate FROM rate_history
+        WHERE category=? AND effective_from <= ?
+        ORDER BY effective_from DESC LIMIT 1
+        """,
+        (category, today),
+    )
+    row = c.fetchone()
+    if row is None:
+        return
+    c.execute(
+        """
+        INSERT INTO rate_table (category, base, fat_rate, snf_rate)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (category) DO UPDATE SET
+            base = excluded.base,
+            fat_rate = excluded.fat_rate,
+            snf_rate = excluded.snf_rate
+        """,
+        (category, *row),
+    )
@@ -0,0 +1,79 @@
+"""
+records.py
+----------
+Compact milk record storage for Shree Ganesh Dairy Management System.
+
+Milk records live in milk_entries (migration v8), stored as integers:
+- day:      days since 1970-01-01 (2025-06-01 -> 20240)
+- farmer:   farmer_codes.id (codes are never removed from farmer_codes)
+- shift:    shifts.id       (1 Morning, 2 Evening; matched ignoring case)
+- category: categories.id   (the farmer's category when the milk came in)
+- litres in millilitres, fat / snf in hundredths, rate / amount in paise
+
+so a row is a handful of small integers, date ranges are integer index
+ranges and SUM(amount) is exact.
+
+The milk_records view shows the same rows in the familiar form
+(rec_date text, shift and category names, rupees and litres as
+decimals; farmer_name is the farmer's current name) and accepts
+INSERT / UPDATE / DELETE in that form. It also carries the raw day,
+farmer_id and shift_id, which queries should filter on:
+
+    c.execute("SELECT ... FROM milk_records WHERE day BETWEEN ? AND ?",
+              (to_day(start), to_day(end)))
+"""
+
+from datetime import date
+
+# date(1970, 1, 1).toordinal()
+_EPOCH_ORDINAL = 719163
+
+LITRE_SCALE = 1000   # millilitres
+QUALITY_SCALE = 100  # fat / snf hundredths
+MONEY_SCALE = 100    # paise
+
+# shift_id for a shift name (case-insensitive, like the old LOWER() match)
+SHIFT_ID_SQL = "(SELECT id FROM main.shifts WHERE name = ?)"
+# farmer_id for a farmer code
+FARMER_ID_SQL = "(SELECT id FROM main.farmer_codes WHERE code = ?)"
+
+
+def to_day(value):
+    """Day number of a YYYY-MM-DD date (None stays None)."""
+    if value is None or value == "":
+        return None
+    return date.fromisoformat(str(value)[:10]).toordinal() - _EPOCH_ORDINAL
+
+
+def from_day(day):
+    return date.fromordinal(day + _EPOCH_ORDINAL).isoformat()
+
+
+def milk_source(source="milk_entries"):
+    """
+    FROM-clause source with the milk_records view's columns over any
+    milk_entries source, e.g. archive.source("milk_entries", schemas).
+    """
+    return f"""(
+        SELECT
+            milk_entries.id AS id,
+            date(milk_entries.day * 86400, 'unixepoch') AS rec_date,
+            fc.code AS farmer_code,
+            COALESCE(f.name, 'Unknown') AS farmer_name,
+            k.name AS category,
+            s.name AS shift,
+            milk_entries.litres / {LITRE_SCALE}.0 AS litres,
+            milk_entries.fat / {QUALITY_SCALE}.0 AS fat,
+            milk_entries.snf / {QUALITY_SCALE}.0 AS snf,
+            milk_entries.rate / {MONEY_SCALE}.0 AS rate,
+            milk_entries.amount / {MONEY_SCALE}.0 AS amount,
+            datetime(milk_entries.created_at, 'unixepoch') AS created_at,
+            milk_entries.day AS day,
+            milk_entries.farmer AS farmer_id,
+            milk_entries.shift AS shift_id
+        FROM {source}
+        LEFT JOIN main.farmer_codes fc ON fc.id = milk_entries.farmer
+        LEFT JOIN main.farmers f ON f.code = fc.code
+        LEFT JOIN main.shifts s ON s.id = milk_entries.shift
+        LEFT JOIN main.categories k ON k.id = milk_entries.category
+    ) AS milk_records"""
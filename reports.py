@@ -0,0 +1,84 @@
+"""
+reports.py
+----------
+Milk report queries and streaming CSV export for Shree Ganesh Dairy
+Management System.
+
+export_csv() writes rows straight from a SQLite cursor to disk in
+fixed-size chunks (cursor.fetchmany), so a full year of milk_records
+is never held in memory or sent through the webview bridge.
+"""
+
+import csv
+import os
+
+from jobs import report_progress
+from records import SHIFT_ID_SQL, to_day
+
+# Rows pulled from the cursor per write
+CHUNK_ROWS = 2000
+
+REPORT_COLUMNS = [
+    "rec_date",
+    "farmer_code",
+    "farmer_name",
+    "category",
+    "shift",
+    "litres",
+    "fat",
+    "snf",
+    "rate",
+    "amount",
+]
+
+
+def report_query(from_date, to_date, shift=None, table="milk_records"):
+    """
+    SQL + params for the daily / range milk report (shift "all" = no filter).
+
+    table is the FROM source; pass records.milk_source(archive.source(...))
+    to include archived years.
+    """
+    sql = f"""
+        SELECT {", ".join(REPORT_COLUMNS)}
+        FROM {table}
+        WHERE day BETWEEN ? AND ?
+    """
+    params = [to_day(from_date), to_day(to_date)]
+
+    if shift and shift.lower() != "all":
+        sql += " AND shift_id = " + SHIFT_ID_SQL
+        params.append(shift)
+
+    sql += " ORDER BY day ASC, id ASC"
+    return sql, params
+
+
+def export_csv(cursor, path, chunk_rows=CHUNK_ROWS):
+    """
+    Write an executed cursor's rows to a CSV file; returns the row count.
+
+    Writes to "<path>.part" first and renames at the end, so a cancelled
+    or failed export never leaves a half-written file under the real name.
+    """
+    header = [d[0] for d in cursor.description]
+    tmp_path = path + ".part"
+    count = 0
+    try:
+        # utf-8-sig so Excel shows Marathi/Hindi names correctly
+        with open(tmp_path, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                writer.writerows(rows)
+                count += len(rows)
+                report_progress(count, message=f"{count} rows written")
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
@@ -3,48 +3,101 @@ run_dairy.py
 ------------
 Smart launcher for Shree Ganesh Dairy Management System.
 
-This script ensures:
-1. The database is present (auto-creates it if missing)
-2. Then launches the main Dairy Management software (desktop app)
+Everything happens in this one process:
+1. The database is created if missing, otherwise migrated in place
+2. The backend (main.Api) is imported — no GUI toolkit yet
+3. PyWebView is imported and the dashboard window opened
+
+A startup-time breakdown is printed once the first page has
+loaded, so slow counter PCs can be diagnosed (pass --quiet to hide it).
 """
 
+import time
+
+_T0 = time.perf_counter()
+
 import os
-import subprocess
 import sys
-import time
 
-DB_FILE = "database.db"
-CREATE_DB_SCRIPT = "create_db.py"
-MAIN_APP_SCRIPT = "main.py"
+DB_FILE = os.environ.get("DAIRY_DB", "database.db")
+
+
+class StartupTimer:
+    """Named, consecutive startup phases measured from process start."""
+
+    def __init__(self, started=_T0):
+        self.started = started
+        self.last = started
+        self.phases = []
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def report(self):
+        total = time.perf_counter() - self.started
+        print("⏱  Startup time")
+        for name, seconds in self.phases:
+            print(f"   {name:<24} {seconds * 1000:8.1f} ms")
+        print(f"   {'total':<24} {total * 1000:8.1f} ms")
 
 
-def run_command(script):
-    """Helper to run another Python script."""
-    print(f"➡️  Running {script} ...")
-    result = subprocess.run([sys.executable, script])
-    if result.returncode != 0:
-        print(f"❌ Error running {script}. Exiting.")
-        sys.exit(1)
+def prepare_database(path, timer):
+    """Create or migrate the schema in-process (no create_db.py subprocess)."""
+    if not os.path.exists(path):
+        print("⚙️ Database not found. Creating new database...")
+        from create_db import create_database
+
+        create_database(path, verbose=False)
+        print("✅ Database created successfully.")
+        timer.mark("create database")
+        return
+    # migrations open their own connection; main's pool is not loaded yet
+    import sqlite3
+    from migrations import migrate
+
+    conn = sqlite3.connect(path)
+    try:
+        migrate(conn)
+    finally:
+        conn.close()
+    timer.mark("check / migrate schema")
 
 
 def main():
+    quiet = "--quiet" in sys.argv
+    timer = StartupTimer()
+    timer.mark("launcher")
+
     print("🐄 Shree Ganesh Dairy Management System")
     print("---------------------------------------")
 
-    # Step 1: Check if database exists
-    if not os.path.exists(DB_FILE):
-        print("⚙️ Database not found. Creating new database...")
-        run_command(CREATE_DB_SCRIPT)
-        time.sleep(1)
-        print("✅ Database created successfully.\n")
+    os.environ["DAIRY_DB"] = DB_FILE
+    prepare_database(DB_FILE, timer)
 
-    else:
-        print("📦 Database found. Skipping creation.\n")
+    import main as app
+
+    timer.mark("import backend")
+
+    import webview  # noqa: F401  (timed separately from window creation)
+
+    timer.mark("import webview")
+
+    def on_loaded():
+        # fires on every page load; only the first one is startup
+        if timer.phases[-1][0] == "import webview":
+            timer.mark("window + first page")
+            if not quiet:
+                timer.report()
 
-    # Step 2: Launch main application
     print("🚀 Starting Dairy Management Software...\n")
-    run_command(MAIN_APP_SCRIPT)
+    app.start_gui(on_loaded=on_loaded)
 
 
 if __name__ == "__main__":
+    # bill rendering uses a process pool; required for the frozen .exe
+    import multiprocessing
+
+    multiprocessing.freeze_support()
     main()
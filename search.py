@@ -0,0 +1,130 @@
+"""
+search.py
+---------
+Full-text search for Shree Ganesh Dairy Management System.
+
+SQLite FTS5 indexes (migration v9) over farmer code / name, advance
+remarks and sale customers are kept up to date by triggers on every
+write, so a search is an index lookup however many years of advances
+and sales the database holds:
+
+    search(c, "tractor repair", kinds=["advances"], start_date="2025-03-01")
+
+Every word typed must match, as a word prefix ("trac rep" finds
+"Tractor repair"). bm25 scores from different indexes are not
+comparable, so results are grouped by kind (in the order asked for)
+and ranked by relevance within each, newest first among equals, then
+paged with limit / offset. Only the live database is indexed, not
+archived years.
+"""
+
+import re
+
+# kind -> (FTS5 index, table, date column or None)
+KINDS = {
+    "farmers": ("farmers_fts", "farmers", None),
+    "advances": ("advances_fts", "farmer_advances", "date"),
+    "sales": ("sales_fts", "sales_records", "sale_date"),
+}
+
+# Result columns, the same for every kind
+RESULT_COLUMNS = ["kind", "id", "code", "name", "date", "amount", "text", "rank"]
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# Words of the query (letters, digits, Devanagari marks); everything else separates them
+_WORD = re.compile(r"[\wऀ-ॿ]+")
+
+
+class SearchError(Exception):
+    """Search refused (empty query, unknown kind)."""
+
+
+def match_expression(query):
+    """
+    FTS5 MATCH expression for what the operator typed: every word, as a
+    quoted prefix, must match. Quoting keeps FTS5 operators and
+    punctuation in the input from being parsed as query syntax.
+    """
+    words = _WORD.findall(query or "")
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def _select(kind, date_filter, position=0):
+    fts, table, day = KINDS[kind]
+    if kind == "farmers":
+        columns = "t.code, t.name, NULL, NULL, t.category"
+    elif kind == "advances":
+        columns = (
+            "t.farmer_code, (SELECT name FROM farmers WHERE code = t.farmer_code), "
+            "t.date, t.amount, t.remarks"
+        )
+    else:
+        columns = "NULL, t.customer, t.sale_date, t.amount, t.customer"
+    sql = f"""
+        SELECT '{kind}', t.id, {columns}, bm25({fts}), {int(position)}
+        FROM {fts} JOIN {table} t ON t.id = {fts}.rowid
+        WHERE {fts} MATCH :match
+    """
+    if day and date_filter:
+        sql += f" AND t.{day} BETWEEN :start AND :end"
+    return sql
+
+
+def search(c, query, kinds=None, start_date=None, end_date=None, limit=DEFAULT_LIMIT, offset=0):
+    """
+    One page of ranked matches:
+    {"results": [...RESULT_COLUMNS dicts], "counts": {kind: n}, "total", "next_offset"}.
+
+    Results come kind by kind in the order of kinds; "rank" (bm25)
+    orders matches of one kind only. start_date / end_date narrow
+    advances and sales; farmers have no date.
+    """
+    match = match_expression(query)
+    if not match:
+        raise SearchError("Type something to search for")
+    if isinstance(kinds, str):
+        kinds = [kinds]
+    # a kind named twice is searched once, where it first appears
+    kinds = list(dict.fromkeys(kinds or KINDS))
+    unknown = [kind for kind in kinds if kind not in KINDS]
+    if unknown:
+        raise SearchError(f"Cannot search {', '.join(unknown)}")
+    limit = max(1, min(int(limit or DEFAULT_LIMIT), MAX_LIMIT))
+    offset = max(0, int(offset or 0))
+
+    date_filter = bool(start_date or end_date)
+    params = {
+        "match": match,
+        "start": start_date or "0000-00-00",
+        "end": end_date or "9999-12-31",
+        "limit": limit + 1,
+        "offset": offset,
+    }
+
+    counts = {}
+    for kind in kinds:
+        c.execute(f"SELECT COUNT(*) FROM ({_select(kind, date_filter)})", params)
+        counts[kind] = c.fetchone()[0]
+
+    # bm25 is negative: lower is a better match (within one index)
+    matches = " UNION ALL ".join(
+        _select(kind, date_filter, position) for position, kind in enumerate(kinds)
+    )
+    columns = ", ".join(RESULT_COLUMNS)
+    c.execute(
+        f"WITH matches ({columns}, position) AS ({matches}) "
+        f"SELECT {columns} FROM matches "
+        "ORDER BY position, rank, date DESC, id DESC LIMIT :limit OFFSET :offset",
+        params,
+    )
+    rows = c.fetchall()
+
+    next_offset = offset + limit if len(rows) > limit else None
+    return {
+        "results": [dict(zip(RESULT_COLUMNS, row)) for row in rows[:limit]],
+        "counts": counts,
+        "total": sum(counts.values()),
+        "next_offset": next_offset,
+    }
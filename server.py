@@ -0,0 +1,290 @@
+"""
+server.py
+---------
+LAN server mode for Shree Ganesh Dairy Management System.
+
+Serves the dashboard (ui/) and the Api over HTTP so several
+collection counters on the local network can work on one
+database.db at the same time:
+
+    python server.py --port 8750 --token <shared secret>
+    → open http://<office-pc>:8750/?token=<shared secret> on each counter's browser
+
+- POST /api/<method> with the JSON payload as the body calls the Api
+  method and returns its JSON response; pages get a small bridge
+  script (ui/http_bridge.js) so the dashboard code runs unchanged.
+- Reads run concurrently on a fixed pool of request threads, sharing
+  the database's bounded pool of WAL read connections.
+- Writes from every counter go through one writer thread that groups
+  calls arriving together into a single transaction (see writer.py).
+
+Only the data methods in ALLOWED_METHODS are served, every call must
+carry the shared token (X-Dairy-Token header) and payloads naming a
+file on the server ("path") or asking it to open a browser ("open")
+are refused. Exports, backups, archiving, sync files and save dialogs
+stay on the office PC's own window.
+
+Built on the standard library's http.server, so no extra packages are
+needed on the office PC.
+"""
+
+import argparse
+import hmac
+import json
+import mimetypes
+import os
+import secrets
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse
+
+UI_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ui")
+BRIDGE_TAG = b'<script src="http_bridge.js"></script>'
+
+DEFAULT_PORT = 8750
+# Request threads (concurrent reads beyond DAIRY_READERS wait for a connection)
+DEFAULT_THREADS = 8
+# Largest request body accepted (bulk save_records from a counter)
+MAX_BODY = 16 * 1024 * 1024
+
+# Api methods a counter may call; everything else (exports to server
+# paths, backups, archiving, sync files, dialogs) is office-PC only
+ALLOWED_METHODS = {
+    "login",
+    "get_summary",
+    "fetch_records",
+    "generate_report",
+    "get_individual_bill",
+    "get_reports_summary",
+    "get_milk_analytics",
+    "generate_bill",
+    "export_report_pdf",
+    "submit_job",
+    "get_job",
+    "get_job_result",
+    "cancel_job",
+    "list_jobs",
+    "save_record",
+    "save_records",
+    "get_all_farmers",
+    "add_farmer",
+    "update_farmer",
+    "delete_farmer",
+    "get_farmer_by_code",
+    "search_farmers",
+    "get_all_advances",
+    "add_advance",
+    "delete_advance",
+    "add_payment",
+    "delete_payment",
+    "get_payments",
+    "get_farmer_balance",
+    "get_farmer_ledger",
+    "get_all_sales",
+    "search",
+    "get_current_shift",
+    "start_new_shift",
+    "get_rates",
+    "add_rate",
+    "delete_rate",
+    "get_rate_history",
+    "calculate_rate",
+    "get_rate_for_category",
+    "get_cache_stats",
+    "get_metrics",
+}
+
+# Api methods that write: run on the single writer thread
+WRITE_METHODS = {
+    "save_record",
+    "save_records",
+    "add_farmer",
+    "update_farmer",
+    "delete_farmer",
+    "add_advance",
+    "delete_advance",
+    "add_payment",
+    "delete_payment",
+    "start_new_shift",
+    "add_rate",
+    "delete_rate",
+}
+
+# Payload keys that act on the server machine itself
+REFUSED_KEYS = {"path", "open"}
+
+TOKEN_HEADER = "X-Dairy-Token"
+
+
+def refusal(method, payload):
+    """Why a counter may not make this call, or None when it may."""
+    if method not in ALLOWED_METHODS:
+        return f"{method} is not available over the network"
+    if not isinstance(payload, dict):
+        return None
+    refused = sorted(REFUSED_KEYS & set(payload))
+    if refused:
+        return f"{', '.join(refused)} cannot be set over the network"
+    if method == "submit_job":
+        # the job runs another Api method: same rules for it
+        return refusal(payload.get("method"), payload.get("payload") or {})
+    return None
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer handling requests on a fixed thread pool."""
+
+    def __init__(self, address, handler, threads):
+        super().__init__(address, handler)
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="dairy-http")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+def make_handler(api, writes, token):
+    methods = {name for name in ALLOWED_METHODS if callable(getattr(api, name, None))}
+
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "VaradDairy"
+        # HTTP/1.0: one request per connection, so idle browser keep-alives
+        # never hold a pool thread
+
+        def log_message(self, fmt, *args):
+            pass  # per-request timings are in get_metrics
+
+        def _send(self, status, body, content_type):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _json(self, status, payload):
+            self._send(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+        # -------------------------------
+        # API
+        # -------------------------------
+        def do_POST(self):
+            path = urlparse(self.path).path
+            if not path.startswith("/api/"):
+                return self._json(404, {"success": False, "message": "Not found"})
+            sent = self.headers.get(TOKEN_HEADER) or ""
+            if not hmac.compare_digest(sent.encode("utf-8"), token.encode("utf-8")):
+                return self._json(401, {"success": False, "message": "Wrong or missing server token"})
+            method = path[len("/api/"):]
+            if method not in methods:
+                return self._json(404, {"success": False, "message": f"Unknown method {method}"})
+
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_BODY:
+                return self._json(413, {"success": False, "message": "Request too large"})
+            data = self.rfile.read(length).decode("utf-8") if length else None
+
+            try:
+                payload = json.loads(data) if data else None
+            except ValueError:
+                payload = None  # the Api method reports bad JSON itself
+            refused = refusal(method, payload)
+            if refused:
+                return self._json(403, {"success": False, "message": refused})
+
+            fn = getattr(api, method)
+            try:
+                if method in WRITE_METHODS:
+                    response = writes.call(fn, data) if data is not None else writes.call(fn)
+                else:
+                    response = fn(data) if data is not None else fn()
+            except Exception as e:
+                print(f"{method} error:", e)
+                return self._json(500, {"success": False, "message": str(e)})
+            self._send(200, response.encode("utf-8"), "application/json")
+
+        # -------------------------------
+        # DASHBOARD FILES
+        # -------------------------------
+        def do_GET(self):
+            path = urlparse(self.path).path
+            if path == "/":
+                path = "/index.html"
+            full = os.path.realpath(os.path.join(UI_DIR, path.lstrip("/")))
+            if not full.startswith(os.path.realpath(UI_DIR) + os.sep) or not os.path.isfile(full):
+                return self._send(404, b"Not found", "text/plain")
+
+            with open(full, "rb") as f:
+                body = f.read()
+            content_type = mimetypes.guess_type(full)[0] or "application/octet-stream"
+            if content_type == "text/html":
+                # pywebview's window.pywebview.api, over HTTP
+                body = body.replace(b"<script", BRIDGE_TAG + b"\n    <script", 1)
+                content_type += "; charset=utf-8"
+            self._send(200, body, content_type)
+
+    return Handler
+
+
+def serve(host="0.0.0.0", port=DEFAULT_PORT, threads=DEFAULT_THREADS, token=None):
+    import main as app
+    from writer import WriteQueue
+
+    if not os.path.exists(app.DB):
+        print(f"❌ Database not found: {app.DB} (run create_db.py first)")
+        return 1
+    with app.db.exclusive() as conn:
+        app.migrate(conn)
+
+    token = token or os.environ.get("DAIRY_SERVER_TOKEN") or secrets.token_urlsafe(16)
+    # the Api methods' cache / directory / rate updates run after each group COMMIT
+    writes = WriteQueue(app.db).start()
+    api = app.Api()
+    httpd = PooledHTTPServer((host, port), make_handler(api, writes, token), threads)
+
+    app.backup_scheduler.start()
+
+    print(f"🌐 Serving {app.DB} on http://{host}:{port}/ ({threads} request threads)")
+    print(f"🔑 Counters open http://<this-pc>:{port}/?token={token}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping server...")
+    finally:
+        httpd.server_close()
+        app.backup_scheduler.stop()
+        writes.stop()
+        app.jobs.shutdown()
+        app.db.close()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the dairy dashboard to LAN counters")
+    parser.add_argument("--host", default="0.0.0.0", help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--threads", type=int, default=DEFAULT_THREADS)
+    parser.add_argument("--db", help="database file (default: DAIRY_DB or database.db)")
+    parser.add_argument(
+        "--token", help="shared secret counters must send (default: DAIRY_SERVER_TOKEN or a random one)"
+    )
+    args = parser.parse_args()
+    if args.db:
+        os.environ["DAIRY_DB"] = args.db
+    return serve(args.host, args.port, args.threads, args.token)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,373 @@
+"""
+sync.py
+-------
+Offline replication between collection centres for Shree Ganesh Dairy
+Management System.
+
+Every write to the replicated tables is appended to change_log by
+triggers (migration v7), with a monotonic sequence number. Each
+database has a site name (sync_site); rows are identified across
+sites by their natural key (farmer code, rate category) or by
+"<site>:<id>" of the site that created them.
+
+A delta file (gzip JSON, carried on a USB stick) holds the changes a
+peer has not acknowledged yet, plus the sender's own high-water marks
+so the receiver knows what it no longer needs to send back:
+
+    sync.export_changes("main", "sync/centre1_to_main.delta.gz")
+    sync.import_changes("sync/main_to_centre1.delta.gz")
+
+Importing applies only changes newer than the site's high-water mark
+for their origin, in order, so a file can be imported twice (or
+arrive by two routes through a hub) without double entries. Applied
+changes are logged again so a hub relays them to the other centres.
+When two sites edit the same row, the later edit (by UTC time, then
+site name) wins everywhere; deleting a milk record, advance, payment
+or sale wins over any edit of it.
+
+A new centre starting from a copy of another centre's database must
+take its own name first (set_site) before any work is entered.
+"""
+
+import gzip
+import json
+import os
+import time
+from contextlib import contextmanager
+
+FORMAT = "dairy-delta"
+FORMAT_VERSION = 1
+
+SYNC_DIR = "sync"
+
+# Replicated table -> natural key columns (None: rows keyed by <site>:<id>)
+SYNC_TABLES = {
+    "farmers": ("code",),
+    "rate_table": ("category",),
+    "rate_history": ("category", "effective_from"),
+    "milk_records": None,
+    "farmer_advances": None,
+    "farmer_payments": None,
+    "sales_records": None,
+}
+
+# Tables written through a view (records.py): ids come from the storage table
+STORAGE_TABLES = {"milk_records": "milk_entries"}
+
+
+class SyncError(Exception):
+    """Delta file rejected (wrong format, own file, bad site name)."""
+
+
+@contextmanager
+def paused(c):
+    """
+    Suspend the change-log triggers inside the caller's write transaction.
+
+    Used while applying another site's changes (they are logged with
+    their origin instead) and for local housekeeping that must not
+    replicate (archiving a closed year).
+    """
+    c.execute("INSERT INTO sync_pause (id) VALUES (1)")
+    try:
+        yield
+    finally:
+        c.execute("DELETE FROM sync_pause")
+
+
+class Sync:
+    def __init__(self, db):
+        self.db = db
+        self._columns = {}  # table -> writable columns (all but id)
+
+    # -------------------------------
+    # SITE
+    # -------------------------------
+    def site(self, c=None):
+        if c is None:
+            with self.db.read() as c:
+                return self.site(c)
+        c.execute("SELECT site FROM sync_site WHERE id = 1")
+        return c.fetchone()[0]
+
+    def set_site(self, name):
+        """
+        Rename this site. Rows and changes made under the old name keep
+        it as their identity, so a database copied from another centre
+        stays in step with it after renaming.
+        """
+        name = (name or "").strip()
+        if not name or ":" in name:
+            raise SyncError("Site name must be non-empty and must not contain ':'")
+        with self.db.write() as c:
+            old = self.site(c)
+            if name == old:
+                return old
+            # changes made so far now belong to the old name
+            c.execute(
+                "UPDATE change_log SET origin_seq = seq WHERE origin_seq IS NULL"
+            )
+            c.execute(
+                "SELECT MAX(origin_seq) FROM change_log WHERE origin = ?", (old,)
+            )
+            last = c.fetchone()[0]
+            if last:
+                c.execute(
+                    """
+                    INSERT INTO sync_applied (origin, seq) VALUES (?, ?)
+                    ON CONFLICT (origin) DO UPDATE SET seq = MAX(seq, excluded.seq)
+                    """,
+                    (old, last),
+                )
+            for table, key in SYNC_TABLES.items():
+                if key is None:
+                    c.execute(
+                        f"""
+                        INSERT OR IGNORE INTO sync_rows (tbl, local_id, uid)
+                        SELECT ?, id, ? || ':' || id FROM {STORAGE_TABLES.get(table, table)}
+                        """,
+                        (table, old),
+                    )
+            c.execute("UPDATE sync_site SET site = ? WHERE id = 1", (name,))
+        return name
+
+    def applied(self, c):
+        """High-water marks of this site: {origin: last seq applied here}."""
+        c.execute("SELECT origin, seq FROM sync_applied")
+        marks = dict(c.fetchall())
+        c.execute("SELECT MAX(seq) FROM change_log WHERE origin_seq IS NULL")
+        marks[self.site(c)] = c.fetchone()[0] or 0
+        return marks
+
+    def status(self):
+        with self.db.read() as c:
+            site = self.site(c)
+            marks = self.applied(c)
+            c.execute("SELECT COUNT(*) FROM change_log")
+            logged = c.fetchone()[0]
+            c.execute("SELECT peer, origin, seq FROM sync_peers ORDER BY peer, origin")
+            peers = {}
+            for peer, origin, seq in c.fetchall():
+                peers.setdefault(peer, {})[origin] = seq
+            pending = {peer: len(self._pending(c, site, peer)) for peer in peers}
+        return {
+            "site": site,
+            "changes": logged,
+            "applied": marks,
+            "peers": peers,
+            "pending": pending,
+        }
+
+    # -------------------------------
+    # EXPORT
+    # -------------------------------
+    def _pending(self, c, site, peer):
+        """Changes the peer has not acknowledged, in log order."""
+        c.execute("SELECT origin, seq FROM sync_peers WHERE peer = ?", (peer,))
+        known = dict(c.fetchall())
+        # made here: a rowid range scan from the peer's mark
+        c.execute(
+            """
+            SELECT seq, origin, seq, tbl, op, key, row, at FROM change_log
+            WHERE seq > ? AND origin_seq IS NULL
+            """,
+            (known.get(site, 0),),
+        )
+        changes = c.fetchall()
+        # received from other sites (relayed), never back to their origin
+        c.execute("SELECT origin FROM sync_applied")
+        for (origin,) in c.fetchall():
+            if origin == peer:
+                continue
+            c.execute(
+                """
+                SELECT seq, origin, origin_seq, tbl, op, key, row, at FROM change_log
+                WHERE origin = ? AND origin_seq > ?
+                """,
+                (origin, known.get(origin, 0)),
+            )
+            changes.extend(c.fetchall())
+        changes.sort()
+        return changes
+
+    def export_changes(self, peer, path=None):
+        """Write the changes peer has not acknowledged to a delta file. Returns (path, count)."""
+        peer = (peer or "").strip()
+        if not peer:
+            raise SyncError("Peer site name required")
+        with self.db.read() as c:
+            # one snapshot: changes and marks agree
+            c.execute("BEGIN")
+            try:
+                site = self.site(c)
+                if peer == site:
+                    raise SyncError("Cannot export to this site itself")
+                changes = self._pending(c, site, peer)
+                marks = self.applied(c)
+            finally:
+                c.execute("COMMIT")
+
+        path = path or os.path.join(
+            SYNC_DIR, f"{site}_to_{peer}_{time.strftime('%Y%m%d_%H%M%S')}.delta.gz"
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        delta = {
+            "format": FORMAT,
+            "version": FORMAT_VERSION,
+            "site": site,
+            "peer": peer,
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "applied": marks,
+            "changes": [
+                [origin, origin_seq, tbl, op, key, json.loads(row) if row else None, at]
+                for _, origin, origin_seq, tbl, op, key, row, at in changes
+            ],
+        }
+        tmp = path + ".tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(delta, f, separators=(",", ":"))
+        os.replace(tmp, path)
+        return path, len(changes)
+
+    # -------------------------------
+    # IMPORT
+    # -------------------------------
+    def _table_columns(self, c, table):
+        if table not in self._columns:
+            c.execute(f"PRAGMA table_info({table})")
+            self._columns[table] = {row[1] for row in c.fetchall()} - {"id"}
+        return self._columns[table]
+
+    def _local_id(self, c, site, table, uid):
+        origin, _, row_id = uid.rpartition(":")
+        if origin == site:
+            return int(row_id)
+        c.execute(
+            "SELECT local_id FROM sync_rows WHERE tbl = ? AND uid = ?", (table, uid)
+        )
+        row = c.fetchone()
+        return row[0] if row else None
+
+    def _superseded(self, c, table, key, origin, at):
+        """True when this site already holds a later change of the same row."""
+        c.execute(
+            "SELECT at, origin FROM change_log WHERE tbl = ? AND key = ? ORDER BY seq DESC LIMIT 1",
+            (table, key),
+        )
+        latest = c.fetchone()
+        return latest is not None and tuple(latest) > (at, origin)
+
+    def _apply(self, c, site, table, op, key, row):
+        natural = SYNC_TABLES[table]
+        if natural:
+            values = json.loads(key)
+            where = " AND ".join(f"{k} = ?" for k in natural)
+            if op == "D":
+                c.execute(f"DELETE FROM {table} WHERE {where}", values)
+                return
+            cols = [col for col in row if col in self._table_columns(c, table)]
+            sets = ", ".join(f"{col} = ?" for col in cols)
+            params = [row[col] for col in cols]
+            c.execute(f"UPDATE {table} SET {sets} WHERE {where}", params + values)
+            if c.rowcount == 0:
+                updates = ", ".join(f"{col} = excluded.{col}" for col in cols)
+                c.execute(
+                    f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))}) "
+                    f"ON CONFLICT ({', '.join(natural)}) DO UPDATE SET {updates}",
+                    params,
+                )
+            return
+
+        local_id = self._local_id(c, site, table, key)
+        if op == "D":
+            if local_id is not None:
+                c.execute(f"DELETE FROM {table} WHERE id = ?", (local_id,))
+                c.execute(
+                    "DELETE FROM sync_rows WHERE tbl = ? AND local_id = ?", (table, local_id)
+                )
+            return
+        if local_id is None and op == "U":
+            return  # deleted here meanwhile: the delete wins
+        cols = [col for col in row if col in self._table_columns(c, table)]
+        params = [row[col] for col in cols]
+        if local_id is not None:
+            sets = ", ".join(f"{col} = ?" for col in cols)
+            # no row: deleted here meanwhile, the delete wins
+            c.execute(f"UPDATE {table} SET {sets} WHERE id = ?", params + [local_id])
+            return
+        c.execute(
+            f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+            params,
+        )
+        local_id = c.lastrowid
+        if table in STORAGE_TABLES:
+            # lastrowid is not set by an insert through a view's trigger
+            c.execute(
+                "SELECT seq FROM sqlite_sequence WHERE name = ?", (STORAGE_TABLES[table],)
+            )
+            local_id = c.fetchone()[0]
+        c.execute(
+            "INSERT INTO sync_rows (tbl, local_id, uid) VALUES (?, ?, ?)",
+            (table, local_id, key),
+        )
+
+    def import_changes(self, path):
+        """
+        Apply a peer's delta file in one transaction. Returns
+        {"from", "applied", "skipped", "tables"}.
+        """
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            delta = json.load(f)
+        if delta.get("format") != FORMAT or delta.get("version") != FORMAT_VERSION:
+            raise SyncError(f"{path} is not a dairy delta file (version {FORMAT_VERSION})")
+
+        sender = delta["site"]
+        applied = skipped = 0
+        tables = set()
+        with self.db.write() as c:
+            site = self.site(c)
+            if sender == site:
+                raise SyncError("Delta file was exported by this site")
+            c.execute("SELECT origin, seq FROM sync_applied")
+            marks = dict(c.fetchall())
+
+            with paused(c):
+                for origin, origin_seq, table, op, key, row, at in delta["changes"]:
+                    if origin == site or origin_seq <= marks.get(origin, 0) or table not in SYNC_TABLES:
+                        skipped += 1
+                        continue
+                    marks[origin] = origin_seq
+                    # an older edit loses to the one already here (deletes of id-keyed rows always win)
+                    if not (op == "D" and SYNC_TABLES[table] is None) and self._superseded(
+                        c, table, key, origin, at
+                    ):
+                        skipped += 1
+                        continue
+                    self._apply(c, site, table, op, key, row)
+                    c.execute(
+                        """
+                        INSERT INTO change_log (origin, origin_seq, tbl, op, key, row, at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        (origin, origin_seq, table, op, key,
+                         json.dumps(row, separators=(",", ":")) if row is not None else None, at),
+                    )
+                    applied += 1
+                    tables.add(table)
+
+            c.executemany(
+                """
+                INSERT INTO sync_applied (origin, seq) VALUES (?, ?)
+                ON CONFLICT (origin) DO UPDATE SET seq = MAX(seq, excluded.seq)
+                """,
+                [(origin, seq) for origin, seq in marks.items() if origin != site],
+            )
+            # the sender has everything it reports, and everything it sent
+            c.executemany(
+                """
+                INSERT INTO sync_peers (peer, origin, seq) VALUES (?, ?, ?)
+                ON CONFLICT (peer, origin) DO UPDATE SET seq = MAX(seq, excluded.seq)
+                """,
+                [(sender, origin, seq) for origin, seq in delta.get("applied", {}).items()],
+            )
+        return {"from": sender, "applied": applied, "skipped": skipped, "tables": sorted(tables)}
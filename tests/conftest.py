@@ -0,0 +1,53 @@
+"""
+Shared fixtures: a small generated database with main.py (the Api and
+its globals) imported against it.
+"""
+
+import json
+import os
+import sys
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_data import generate  # noqa: E402
+
+# Two years of data ending mid-2025: FY2023 (Apr 2023 - Mar 2024) is closed
+END = date(2025, 6, 30)
+
+
+@pytest.fixture
+def dairy(tmp_path, monkeypatch):
+    """Fresh `main` module bound to a generated database in tmp_path."""
+    path = tmp_path / "database.db"
+    generate(str(path), farmers=20, years=2, end=END, verbose=False)
+    monkeypatch.setenv("DAIRY_DB", str(path))
+    monkeypatch.setenv("DAIRY_BACKUP_HOURS", "0")
+    monkeypatch.chdir(tmp_path)
+
+    sys.modules.pop("main", None)
+    import main
+
+    yield main
+    main.db.close()
+    sys.modules.pop("main", None)
+
+
+def call(method, payload=None):
+    """Api method result as a dict; fails the test on success=False."""
+    result = json.loads(method(json.dumps(payload or {})))
+    assert result["success"], result
+    return result
+
+
+def rounded(value, digits=2):
+    """Nested response with floats rounded, for before / after comparisons."""
+    if isinstance(value, float):
+        return round(value, digits)
+    if isinstance(value, dict):
+        return {k: rounded(v, digits) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [rounded(v, digits) for v in value]
+    return value
@@ -0,0 +1,73 @@
+from conftest import call, rounded
+
+PERIOD = {"start_date": "2023-11-01", "end_date": "2024-05-31"}
+
+
+def _bills(main):
+    api = main.Api()
+    main.response_cache.clear()
+    return {
+        "bills": call(api.generate_bill, PERIOD)["bills"],
+        "individual": call(api.get_individual_bill, dict(PERIOD, code="F0001"))["data"],
+    }
+
+
+def test_bills_unchanged_by_archiving(dairy):
+    before = _bills(dairy)
+    assert before["individual"]["opening_balance"] != 0
+
+    counts = dairy.archive.archive_year(2023)
+    assert counts["milk_records"] > 0
+
+    assert rounded(_bills(dairy)) == rounded(before)
+    assert dairy.archive.folded_years() == []
+
+
+def test_restore_ledger_rebuilds_folded_year(dairy):
+    before = _bills(dairy)
+    dairy.archive.archive_year(2023)
+
+    # what older versions left behind: the year folded into one row per farmer
+    with dairy.db.write() as c:
+        c.execute(
+            """
+            CREATE TEMP TABLE fold AS
+            SELECT farmer_code, SUM(litres) AS litres, SUM(milk) AS milk,
+                   SUM(advance) AS advance, SUM(payment) AS payment,
+                   (SELECT l2.closing FROM farmer_ledger l2
+                    WHERE l2.farmer_code = l.farmer_code AND l2.day <= '2024-03-31'
+                    ORDER BY l2.day DESC LIMIT 1) AS closing
+            FROM farmer_ledger l
+            WHERE day BETWEEN '2023-04-01' AND '2024-03-31'
+            GROUP BY farmer_code
+            """
+        )
+        c.execute("DELETE FROM farmer_ledger WHERE day BETWEEN '2023-04-01' AND '2024-03-31'")
+        c.execute(
+            "INSERT INTO farmer_ledger (farmer_code, day, litres, milk, advance, payment, closing) "
+            "SELECT farmer_code, '2024-03-31', litres, milk, advance, payment, closing FROM temp.fold"
+        )
+        c.execute("DROP TABLE temp.fold")
+    assert dairy.archive.folded_years() == [2023]
+
+    assert dairy.archive.restore_ledger(2023) > 0
+    assert dairy.archive.folded_years() == []
+    assert rounded(_bills(dairy)) == rounded(before)
+
+
+def test_bill_bundle_reads_archived_years(dairy):
+    from bills import collect_bills
+
+    def collect():
+        with dairy.db.read() as c, dairy.archive.attached(c, PERIOD["start_date"], PERIOD["end_date"]) as schemas:
+            return collect_bills(c, PERIOD["start_date"], PERIOD["end_date"], schemas=schemas)
+
+    before = collect()
+    dairy.archive.archive_year(2023)
+    after = collect()
+
+    assert rounded(after) == rounded(before)
+    farmer, bill = after[0]
+    individual = _bills(dairy)["individual"]
+    assert farmer["code"] == "F0001"
+    assert rounded(bill["total_amount"]) == rounded(individual["total_amount"])
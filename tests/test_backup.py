@@ -0,0 +1,63 @@
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from backup import BackupError, BackupManager, verify
+from create_db import create_database
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / "database.db")
+    create_database(path, seed_demo=False, verbose=False)
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO farmers (code, name, category) VALUES (?, ?, 'Cow')",
+        [(f"F{i:04d}", f"Farmer {i} " + "x" * 200) for i in range(2000)],
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_backup_verify_and_rotate(database, tmp_path):
+    manager = BackupManager(database, keep=2)
+    os.makedirs(manager.directory)
+    # two older generations already on disk
+    for age, stamp in ((3, "20250101_000000"), (2, "20250102_000000")):
+        old = os.path.join(manager.directory, f"database_{stamp}.db")
+        shutil.copy(database, old)
+        os.utime(old, (os.path.getmtime(old) - age * 86400,) * 2)
+
+    result = manager.backup_now()
+    assert result["success"]
+    verify(result["path"])
+    conn = sqlite3.connect(result["path"])
+    assert conn.execute("SELECT COUNT(*) FROM farmers").fetchone() == (2000,)
+    conn.close()
+
+    assert result["removed"] == [os.path.join(manager.directory, "database_20250101_000000.db")]
+    assert [g["path"] for g in manager.generations()] == [
+        result["path"],
+        os.path.join(manager.directory, "database_20250102_000000.db"),
+    ]
+
+
+def test_verify_rejects_a_corrupted_file(database, tmp_path):
+    copy = str(tmp_path / "copy.db")
+    shutil.copy(database, copy)
+    verify(copy)
+
+    size = os.path.getsize(copy)
+    with open(copy, "r+b") as f:
+        f.seek(size // 2)
+        f.write(b"\xff" * 8192)
+    with pytest.raises(BackupError):
+        verify(copy)
+
+    with open(copy, "r+b") as f:
+        f.write(b"not a database at all")
+    with pytest.raises(BackupError):
+        verify(copy)
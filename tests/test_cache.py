@@ -0,0 +1,48 @@
+import sqlite3
+
+from conftest import call
+
+
+def _other_process(dairy, *statements):
+    """Commit through a connection of its own, as server.py or cli.py would."""
+    conn = sqlite3.connect(dairy.DB)
+    for sql, params in statements:
+        conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+
+def test_writes_from_another_process_reach_every_cache(dairy):
+    api = dairy.Api()
+    codes = [f["code"] for f in call(api.get_all_farmers)["farmers"]]
+    assert "X900" not in codes
+    assert dairy.farmer_directory.get("X900") is None
+    assert dairy.rate_engine.lookup("Buffalo", "2030-01-01") != (99.0, 0.0, 0.0)
+    assert 2019 not in dairy.archive.years()
+
+    _other_process(
+        dairy,
+        ("INSERT INTO farmers (code, name, category) VALUES (?, ?, ?)", ("X900", "Elsewhere", "Cow")),
+        ("INSERT INTO rate_history (category, effective_from, base, fat_rate, snf_rate) VALUES (?, ?, ?, ?, ?)",
+         ("Buffalo", "2030-01-01", 99, 0, 0)),
+        ("INSERT INTO archive_years (year, file) VALUES (?, ?)", (2019, "dairy_fy2019.db")),
+    )
+
+    codes = [f["code"] for f in call(api.get_all_farmers)["farmers"]]
+    assert "X900" in codes
+    assert dairy.farmer_directory.get("x900")["name"] == "Elsewhere"
+    assert dairy.rate_engine.lookup("Buffalo", "2030-01-01") == (99.0, 0.0, 0.0)
+    assert 2019 in dairy.archive.years()
+
+
+def test_own_writes_keep_unrelated_entries(dairy):
+    api = dairy.Api()
+    call(api.get_rates)
+    call(api.get_rates)
+    hits = dairy.response_cache.hits
+
+    row = {"rec_date": "2025-07-01", "farmer_code": "F0001", "shift": "Morning",
+           "litres": 5, "fat": 4.0, "snf": 8.5, "rate": 40, "amount": 200}
+    call(api.save_record, row)
+    call(api.get_rates)
+    assert dairy.response_cache.hits == hits + 1
@@ -0,0 +1,41 @@
+import threading
+
+from db import Database
+
+
+def _read_once(db, results):
+    with db.read() as c:
+        c.execute("SELECT COUNT(*) FROM t")
+        results.append(c.fetchone()[0])
+
+
+def test_readers_bounded_across_short_lived_threads(tmp_path):
+    db = Database(str(tmp_path / "pool.db"), readers=4)
+    with db.write() as c:
+        c.execute("CREATE TABLE t (x)")
+        c.execute("INSERT INTO t VALUES (1)")
+
+    results = []
+    for _ in range(10):
+        threads = [threading.Thread(target=_read_once, args=(db, results)) for _ in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    assert results == [1] * 200
+    assert len(db._readers) <= 4
+    db.close()
+    assert db._readers == []
+
+
+def test_nested_read_reuses_connection(tmp_path):
+    db = Database(str(tmp_path / "pool.db"), readers=1)
+    with db.read() as outer:
+        outer.execute("ATTACH DATABASE ':memory:' AS scratch")
+        with db.read() as inner:
+            inner.execute("SELECT name FROM pragma_database_list WHERE name = 'scratch'")
+            assert inner.fetchone() == ("scratch",)
+        outer.execute("DETACH DATABASE scratch")
+    assert len(db._readers) == 1
+    db.close()
@@ -0,0 +1,69 @@
+import json
+import threading
+
+from jobs import CANCELLED, DONE, FAILED, JobRunner, report_progress
+
+
+def _finish(job):
+    job.future.result(timeout=10)
+    return job
+
+
+def test_success_keeps_the_response():
+    runner = JobRunner()
+    job = _finish(runner.submit("ok", lambda: json.dumps({"success": True, "rows": 3})))
+    assert job.status == DONE and job.error is None
+    assert json.loads(job.result)["rows"] == 3
+    assert job.info()["progress"] == 1.0
+    runner.shutdown()
+
+
+def test_failure_response_or_exception_fails_the_job():
+    runner = JobRunner()
+    refused = _finish(runner.submit("bill", lambda: json.dumps({"success": False, "message": "No records"})))
+    assert refused.status == FAILED and refused.error == "No records"
+    assert json.loads(refused.result)["message"] == "No records"
+
+    def broken():
+        raise ValueError("disk full")
+
+    crashed = _finish(runner.submit("csv", broken))
+    assert crashed.status == FAILED and crashed.error == "disk full"
+    runner.shutdown()
+
+
+def test_progress_and_cancel():
+    runner = JobRunner()
+    reported, resume = threading.Event(), threading.Event()
+
+    def work():
+        report_progress(0, 4, "starting")
+        report_progress(1)
+        reported.set()
+        resume.wait(10)
+        for i in range(2, 5):
+            report_progress(i)
+        return json.dumps({"success": True})
+
+    job = runner.submit("bills", work)
+    assert reported.wait(10)
+    info = job.info()
+    assert (info["status"], info["done"], info["total"], info["progress"], info["message"]) == (
+        "running", 1, 4, 0.25, "starting"
+    )
+    resume.set()
+    assert _finish(job).status == DONE
+
+    # a cancel request stops the work at its next progress report
+    reported.clear()
+    resume.clear()
+    job = runner.submit("bills", work)
+    assert reported.wait(10)
+    assert runner.cancel(job.id)
+    resume.set()
+    assert _finish(job).status == CANCELLED
+    runner.shutdown()
+
+
+def test_report_progress_outside_a_job_does_nothing():
+    report_progress(1, 2, "ignored")
@@ -0,0 +1,109 @@
+import pytest
+
+from create_db import create_database
+from db import Database
+from ledger import balance_as_of, paused
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "ledger.db")
+    create_database(path, seed_demo=False, verbose=False)
+    db = Database(path)
+    yield db
+    db.close()
+
+
+def milk(c, day, amount, code="F001"):
+    c.execute(
+        "INSERT INTO milk_records (rec_date, farmer_code, category, shift, litres, fat, snf, rate, amount) "
+        "VALUES (?, ?, 'Cow', 'Morning', ?, 4.0, 8.5, 40, ?)",
+        (day, code, amount / 40, amount),
+    )
+    c.execute("SELECT seq FROM sqlite_sequence WHERE name = 'milk_entries'")
+    return c.fetchone()[0]
+
+
+def ledger(db, code="F001"):
+    with db.read() as c:
+        c.execute(
+            "SELECT day, milk, advance, payment, closing FROM farmer_ledger "
+            "WHERE farmer_code = ? AND (milk != 0 OR advance != 0 OR payment != 0) ORDER BY day",
+            (code,),
+        )
+        return [tuple(round(v, 2) if isinstance(v, float) else v for v in row) for row in c.fetchall()]
+
+
+def resummed(db, code="F001"):
+    """The ledger recomputed from the raw tables, for comparison."""
+    with db.read() as c:
+        c.execute(
+            """
+            SELECT day, SUM(milk), SUM(advance), SUM(payment) FROM (
+                SELECT rec_date AS day, amount AS milk, 0 AS advance, 0 AS payment
+                FROM milk_records WHERE farmer_code = :code
+                UNION ALL SELECT date, 0, amount, 0 FROM farmer_advances WHERE farmer_code = :code
+                UNION ALL SELECT date, 0, 0, amount FROM farmer_payments WHERE farmer_code = :code
+            ) GROUP BY day ORDER BY day
+            """,
+            {"code": code},
+        )
+        rows, closing = [], 0.0
+        for day, earned, advance, payment in c.fetchall():
+            closing += earned - advance - payment
+            rows.append((day, round(earned, 2), round(advance, 2), round(payment, 2), round(closing, 2)))
+        return rows
+
+
+def balances(db, day):
+    with db.read() as c:
+        return balance_as_of(c, "F001", day, before=True), balance_as_of(c, "F001", day)
+
+
+def test_balances_follow_every_kind_of_write(db):
+    with db.write() as c:
+        first = milk(c, "2025-07-01", 400)
+        milk(c, "2025-07-03", 300)
+        c.execute("INSERT INTO farmer_advances (farmer_code, date, amount) VALUES ('F001', '2025-07-02', 100)")
+        c.execute("INSERT INTO farmer_payments (farmer_code, date, amount) VALUES ('F001', '2025-07-04', 200)")
+    assert [row[-1] for row in ledger(db)] == [400, 300, 600, 400]
+    assert balances(db, "2025-07-03") == (300, 600)
+
+    # back-dated payment: every later closing moves
+    with db.write() as c:
+        c.execute("INSERT INTO farmer_payments (farmer_code, date, amount) VALUES ('F001', '2025-07-01', 50)")
+    assert [row[-1] for row in ledger(db)] == [350, 250, 550, 350]
+    assert balances(db, "2025-07-02") == (350, 250)
+
+    # edited record: new amount, then moved to another day
+    with db.write() as c:
+        c.execute("UPDATE milk_records SET amount = 500 WHERE id = ?", (first,))
+    assert balances(db, "2025-07-04") == (650, 450)
+    with db.write() as c:
+        c.execute("UPDATE milk_records SET rec_date = '2025-07-05' WHERE id = ?", (first,))
+    assert balances(db, "2025-07-02") == (-50, -150)
+    assert balances(db, "2025-07-05") == (-50, 450)
+
+    # deleted record
+    with db.write() as c:
+        c.execute("DELETE FROM milk_records WHERE id = ?", (first,))
+    assert balances(db, "2025-07-05") == (-50, -50)
+    assert ledger(db) == resummed(db)
+
+
+def test_paused_triggers_leave_the_ledger_alone(db):
+    with db.write() as c:
+        milk(c, "2025-07-01", 400)
+    before = ledger(db)
+
+    with db.write() as c:
+        with paused(c):
+            for day in range(2, 29):
+                milk(c, f"2025-07-{day:02d}", 100)
+            c.execute("INSERT INTO farmer_advances (farmer_code, date, amount) VALUES ('F001', '2025-07-03', 100)")
+    assert ledger(db) == before
+
+    # the pause ends with the transaction's block: later writes post again
+    with db.write() as c:
+        milk(c, "2025-07-30", 200)
+    assert ledger(db) == before + [("2025-07-30", 200, 0, 0, 600)]
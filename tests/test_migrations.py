@@ -0,0 +1,54 @@
+import sqlite3
+
+import pytest
+
+import migrations
+from create_db import create_database
+from migrations import MigrationError, migrate, normalise_date
+
+
+def _legacy_db(path, monkeypatch, dates):
+    """A v7 database (plain milk_records table) holding one record per date."""
+    with monkeypatch.context() as m:
+        m.setattr(migrations, "MIGRATIONS", [step for step in migrations.MIGRATIONS if step[0] <= 7])
+        create_database(str(path), seed_demo=False, verbose=False)
+    conn = sqlite3.connect(str(path))
+    conn.executemany(
+        "INSERT INTO milk_records (rec_date, farmer_code, farmer_name, category, shift, litres, fat, snf, rate, amount) "
+        "VALUES (?, 'F0001', 'Ramesh', 'Cow', 'Morning', 10, 4.0, 8.5, 40, 400)",
+        [(d,) for d in dates],
+    )
+    conn.commit()
+    return conn
+
+
+def test_normalise_date():
+    assert normalise_date("2024-5-3") == "2024-05-03"
+    assert normalise_date("03/05/2024") == "2024-05-03"
+    assert normalise_date("3/5/24") == "2024-05-03"
+    assert normalise_date("2024-05-03 06:15:00") == "2024-05-03"
+    assert normalise_date("20240503") == "2024-05-03"
+    assert normalise_date("yesterday") is None
+
+
+def test_v8_keeps_legacy_date_spellings(tmp_path, monkeypatch):
+    conn = _legacy_db(tmp_path / "legacy.db", monkeypatch, ["2024-05-03", "2024-5-3", "03/05/2024"])
+    migrate(conn, verbose=False)
+
+    days = conn.execute("SELECT rec_date FROM milk_records ORDER BY id").fetchall()
+    assert days == [("2024-05-03",)] * 3
+    assert conn.execute(
+        "SELECT day, litres, milk FROM farmer_ledger WHERE farmer_code = 'F0001'"
+    ).fetchall() == [("2024-05-03", 30.0, 1200.0)]
+    assert conn.execute("SELECT COUNT(*) FROM change_log").fetchone()[0] == 3
+    conn.close()
+
+
+def test_v8_refuses_unreadable_dates(tmp_path, monkeypatch):
+    conn = _legacy_db(tmp_path / "legacy.db", monkeypatch, ["2024-05-03", "someday"])
+    with pytest.raises(MigrationError, match="ids 2"):
+        migrate(conn, verbose=False)
+
+    assert migrations.current_version(conn) == 7
+    assert conn.execute("SELECT rec_date FROM milk_records WHERE id = 2").fetchone() == ("someday",)
+    conn.close()
@@ -0,0 +1,56 @@
+import json
+from datetime import date, timedelta
+
+from conftest import call
+from create_db import create_database
+from db import Database
+from rates import RateEngine
+
+
+def test_lookup_before_on_and_after_effective_date(tmp_path):
+    path = str(tmp_path / "rates.db")
+    create_database(path, seed_demo=False, verbose=False)
+    db = Database(path)
+    with db.write() as c:
+        c.executemany(
+            "INSERT INTO rate_history (category, effective_from, base, fat_rate, snf_rate) VALUES (?, ?, ?, ?, ?)",
+            [("Goat", "2025-01-01", 20, 1, 1), ("Goat", "2025-04-01", 25, 2, 1)],
+        )
+    engine = RateEngine(db)
+
+    assert engine.lookup("Goat", "2024-12-31") is None
+    assert engine.lookup("goat", "2025-01-01") == (20, 1, 1)
+    assert engine.lookup("Goat", "2025-03-31") == (20, 1, 1)
+    assert engine.lookup("Goat", "2025-04-01") == (25, 2, 1)
+    assert engine.lookup("Goat", "2026-01-01") == (25, 2, 1)
+    assert engine.calculate("Goat", 4.0, 8.0, "2025-04-01", litres=2) == (41.0, 82.0)
+    db.close()
+
+
+def test_add_rate_rejects_malformed_dates(dairy):
+    api = dairy.Api()
+    for bad in ("2025-4-1", "01/04/2025", "2025-02-30"):
+        result = json.loads(api.add_rate(json.dumps({"category": "Goat", "base": 1, "effective_from": bad})))
+        assert not result["success"], bad
+    call(api.add_rate, {"category": "Goat", "base": 1, "effective_from": "2025-04-01"})
+
+
+def test_get_rates_follows_effective_date(dairy):
+    api = dairy.Api()
+    today = date.today()
+    call(api.add_rate, {"category": "Goat", "base": 20, "fat_rate": 1, "snf_rate": 1,
+                        "effective_from": (today - timedelta(days=10)).isoformat()})
+    call(api.add_rate, {"category": "Goat", "base": 30, "fat_rate": 1, "snf_rate": 1,
+                        "effective_from": (today + timedelta(days=1)).isoformat()})
+
+    def goat():
+        return [r["base"] for r in call(api.get_rates)["rates"] if r["category"] == "Goat"]
+
+    assert goat() == [20]
+
+    # the future rate's day arrives; nothing rewrote rate_table meanwhile
+    with dairy.db.write() as c:
+        c.execute("UPDATE rate_history SET effective_from = ? WHERE category = 'Goat' AND base = 30",
+                  (today.isoformat(),))
+    dairy.response_cache.bump("rate_table")
+    assert goat() == [30]
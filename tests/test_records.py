@@ -0,0 +1,69 @@
+import json
+
+from conftest import call
+
+
+def test_save_records_reports_bad_dates_per_row(dairy):
+    api = dairy.Api()
+    row = {"farmer_code": "F0001", "shift": "Morning", "litres": 5, "fat": 4.0, "snf": 8.5, "rate": 40, "amount": 200}
+    records = [
+        dict(row, rec_date="2025-07-01"),
+        dict(row, rec_date="2025-7-1"),
+        dict(row, rec_date="2025-02-30"),
+        dict(row, rec_date=None),
+        dict(row, rec_date="2025-07-01", fat=9.9),
+        dict(row, rec_date="2025-07-02"),
+    ]
+    result = json.loads(api.save_records(json.dumps({"records": records})))
+
+    assert result["saved"] == 2
+    assert [e["index"] for e in result["errors"]] == [1, 2, 3, 4]
+    assert "date" in result["errors"][0]["message"]
+
+    saved = call(api.fetch_records, {"date": "2025-07-01"})["records"]
+    assert len([r for r in saved if r["farmer_code"] == "F0001"]) == 1
+
+
+def test_fetch_records_total_matches_rows(dairy):
+    api = dairy.Api()
+    for filters in [{}, {"date": "2025-06-30"}, {"shift": "evening"}, {"date": "2025-06-30", "shift": "Morning"}]:
+        with dairy.db.read() as c:
+            sql = "SELECT COUNT(*) FROM milk_records WHERE 1=1"
+            params = []
+            if "date" in filters:
+                sql += " AND rec_date = ?"
+                params.append(filters["date"])
+            if "shift" in filters:
+                sql += " AND shift = ? COLLATE NOCASE"
+                params.append(filters["shift"])
+            c.execute(sql, params)
+            expected = c.fetchone()[0]
+        assert expected > 0
+        assert call(api.fetch_records, dict(filters, with_total=True, limit=1))["total"] == expected
+
+
+def test_codes_saved_as_registered(dairy):
+    api = dairy.Api()
+    row = {"shift": "Morning", "litres": 5, "fat": 4.0, "snf": 8.5, "rate": 40, "amount": 200}
+    call(api.save_record, dict(row, rec_date="2025-07-01", farmer_code="f0001"))
+    call(api.save_records, {"records": [dict(row, rec_date="2025-07-02", farmer_code=" f0001 ")]})
+
+    saved = call(api.fetch_records, {"date": "2025-07-01"})["records"]
+    assert [(r["farmer_code"], r["farmer_name"]) for r in saved] == [
+        ("F0001", dairy.farmer_directory.get("F0001")["name"])
+    ]
+    bill = call(api.get_individual_bill, {"code": "F0001", "start_date": "2025-07-01", "end_date": "2025-07-02"})
+    assert len(bill["data"]["records"]) == 2
+
+
+def test_records_show_current_name_and_category_at_delivery(dairy):
+    api = dairy.Api()
+    row = {"farmer_code": "F0001", "shift": "Morning", "litres": 5, "fat": 4.0, "snf": 8.5, "rate": 40, "amount": 200}
+    call(api.save_record, dict(row, rec_date="2025-07-01", farmer_name="Ignored"))
+    farmer = dairy.farmer_directory.get("F0001")
+    category = "Buffalo" if farmer["category"] == "Cow" else "Cow"
+    call(api.update_farmer, {"id": farmer["id"], "name": "Renamed Farmer", "category": category})
+
+    saved = call(api.fetch_records, {"date": "2025-07-01"})["records"]
+    # names are not kept per record; the category is the one the milk came in under
+    assert [(r["farmer_name"], r["category"]) for r in saved] == [("Renamed Farmer", farmer["category"])]
@@ -0,0 +1,31 @@
+from conftest import call
+
+
+def test_results_grouped_by_kind_in_requested_order(dairy):
+    api = dairy.Api()
+    call(api.add_farmer, {"code": "T900", "name": "Zebu Patil", "category": "Cow"})
+    call(api.add_advance, {"farmer_code": "F0001", "amount": 500, "remarks": "zebu shed repair"})
+    call(api.add_advance, {"farmer_code": "F0002", "amount": 300, "remarks": "zebu feed for the zebu calf"})
+
+    found = call(api.search, {"query": "zebu", "kinds": ["advances", "farmers"]})
+    kinds = [r["kind"] for r in found["results"]]
+    assert kinds == ["advances", "advances", "farmers"]
+    assert found["counts"] == {"advances": 2, "farmers": 1}
+
+    # paging continues through the same order
+    first = call(api.search, {"query": "zebu", "kinds": ["farmers", "advances"], "limit": 2})
+    rest = call(api.search, {"query": "zebu", "kinds": ["farmers", "advances"], "limit": 2,
+                             "offset": first["next_offset"]})
+    assert [r["kind"] for r in first["results"] + rest["results"]] == ["farmers", "advances", "advances"]
+    assert rest["next_offset"] is None
+
+
+def test_repeated_kinds_searched_once(dairy):
+    api = dairy.Api()
+    call(api.add_farmer, {"code": "T901", "name": "Zebu Jadhav", "category": "Cow"})
+    call(api.add_advance, {"farmer_code": "F0001", "amount": 500, "remarks": "zebu shed repair"})
+
+    found = call(api.search, {"query": "zebu", "kinds": ["farmers", "advances", "farmers"]})
+    assert [r["kind"] for r in found["results"]] == ["farmers", "advances"]
+    assert found["counts"] == {"farmers": 1, "advances": 1}
+    assert found["next_offset"] is None
@@ -0,0 +1,64 @@
+import json
+import threading
+import urllib.request
+from urllib.error import HTTPError
+
+import pytest
+
+from server import PooledHTTPServer, make_handler
+from writer import WriteQueue
+
+TOKEN = "counter-secret"
+
+
+@pytest.fixture
+def post(dairy):
+    writes = WriteQueue(dairy.db).start()
+    httpd = PooledHTTPServer(("127.0.0.1", 0), make_handler(dairy.Api(), writes, TOKEN), 2)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    def post(method, payload=None, token=TOKEN):
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{httpd.server_port}/api/{method}",
+            data=json.dumps(payload or {}).encode("utf-8"),
+            headers={"X-Dairy-Token": token},
+        )
+        try:
+            with urllib.request.urlopen(request) as resp:
+                return resp.status, json.loads(resp.read())
+        except HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    yield post
+    httpd.shutdown()
+    httpd.server_close()
+    writes.stop()
+
+
+def test_data_methods_need_the_token(post):
+    status, body = post("get_current_shift")
+    assert status == 200 and body["success"]
+    assert post("get_current_shift", token="wrong")[0] == 401
+    assert post("get_current_shift", token="")[0] == 401
+
+
+def test_server_side_methods_refused(post, tmp_path):
+    target = str(tmp_path / "pwned.csv")
+    for method, payload in [
+        ("save_file", {"content": "x", "filename": "x.csv"}),
+        ("export_report_csv", {"from_date": "2025-01-01", "to_date": "2025-01-31", "path": target}),
+        ("backup_now", {"path": target}),
+        ("import_changes", {"path": "/etc/passwd"}),
+        ("render_all_bills", {"start_date": "2025-01-01", "end_date": "2025-01-31", "open": True}),
+        ("submit_job", {"method": "export_report_csv", "payload": {"path": target}}),
+    ]:
+        status, body = post(method, payload)
+        assert status in (403, 404) and not body["success"], method
+    assert not (tmp_path / "pwned.csv").exists()
+
+
+def test_path_keys_refused_on_allowed_methods(post):
+    status, body = post("generate_report", {"from_date": "2025-01-01", "to_date": "2025-01-31", "path": "/tmp/x"})
+    assert status == 403
+    status, body = post("submit_job", {"method": "generate_report", "payload": {"from_date": "2025-01-01", "to_date": "2025-01-31"}})
+    assert status == 200 and body["success"]
@@ -0,0 +1,121 @@
+import pytest
+
+from create_db import create_database
+from db import Database
+from sync import Sync
+
+
+@pytest.fixture
+def sites(tmp_path):
+    """Two centres, "main" and "centre1", each with its own database."""
+    made = {}
+    for name in ("main", "centre1"):
+        path = str(tmp_path / f"{name}.db")
+        create_database(path, seed_demo=False, verbose=False)
+        db = Database(path)
+        sync = Sync(db)
+        sync.set_site(name)
+        made[name] = sync
+    yield made
+    for sync in made.values():
+        sync.db.close()
+
+
+def exchange(sender, receiver, tmp_path):
+    path, _ = sender.export_changes(receiver.site(), str(tmp_path / "out.delta.gz"))
+    return receiver.import_changes(path)
+
+
+def rows(sync, sql):
+    with sync.db.read() as c:
+        c.execute(sql)
+        return c.fetchall()
+
+
+def write(sync, sql, params=()):
+    with sync.db.write() as c:
+        c.execute(sql, params)
+        return c.rowcount
+
+
+RECORD = (
+    "INSERT INTO milk_records (rec_date, farmer_code, category, shift, litres, fat, snf, rate, amount) "
+    "VALUES (?, 'F001', 'Cow', 'Morning', ?, 4.0, 8.5, 40, ?)"
+)
+MILK = "SELECT rec_date, farmer_code, litres, amount FROM milk_records ORDER BY rec_date"
+
+
+def test_round_trip(sites, tmp_path):
+    main, centre = sites["main"], sites["centre1"]
+    write(main, "INSERT INTO farmers (code, name, category) VALUES ('F001', 'Ramesh', 'Cow')")
+    write(main, RECORD, ("2025-07-01", 10, 400))
+    write(main, "INSERT INTO farmer_advances (farmer_code, date, amount, remarks) VALUES ('F001', '2025-07-01', 500, 'seed')")
+
+    result = exchange(main, centre, tmp_path)
+    assert result["applied"] == 3
+    assert rows(centre, MILK) == rows(main, MILK) == [("2025-07-01", "F001", 10.0, 400.0)]
+    assert rows(centre, "SELECT name FROM farmers") == [("Ramesh",)]
+    assert rows(centre, "SELECT amount FROM farmer_advances") == [(500.0,)]
+
+    # edited and added at the centre, back to main
+    write(centre, "UPDATE milk_records SET litres = 12, amount = 480")
+    write(centre, RECORD, ("2025-07-02", 8, 320))
+    result = exchange(centre, main, tmp_path)
+    assert result["applied"] == 2
+    assert rows(main, MILK) == rows(centre, MILK) == [
+        ("2025-07-01", "F001", 12.0, 480.0),
+        ("2025-07-02", "F001", 8.0, 320.0),
+    ]
+    # nothing echoes back to the centre it came from
+    assert exchange(main, centre, tmp_path)["applied"] == 0
+
+
+def test_reimport_is_idempotent(sites, tmp_path):
+    main, centre = sites["main"], sites["centre1"]
+    write(main, "INSERT INTO farmers (code, name, category) VALUES ('F001', 'Ramesh', 'Cow')")
+    write(main, RECORD, ("2025-07-01", 10, 400))
+    path, count = main.export_changes("centre1", str(tmp_path / "main.delta.gz"))
+
+    first = centre.import_changes(path)
+    second = centre.import_changes(path)
+    assert (first["applied"], second["applied"], second["skipped"]) == (count, 0, count)
+    assert len(rows(centre, MILK)) == 1
+    assert rows(centre, "SELECT COUNT(*) FROM farmers") == [(1,)]
+
+
+def test_delete_wins_over_update(sites, tmp_path):
+    main, centre = sites["main"], sites["centre1"]
+    write(main, RECORD, ("2025-07-01", 10, 400))
+    exchange(main, centre, tmp_path)
+
+    # the centre corrects the record after main deleted it
+    write(main, "DELETE FROM milk_records")
+    write(centre, "UPDATE milk_records SET litres = 11, amount = 440")
+    exchange(centre, main, tmp_path)
+    exchange(main, centre, tmp_path)
+
+    assert rows(main, MILK) == rows(centre, MILK) == []
+
+
+def test_last_writer_wins(sites, tmp_path):
+    main, centre = sites["main"], sites["centre1"]
+    write(main, "INSERT INTO farmers (code, name, category) VALUES ('F001', 'Ramesh', 'Cow')")
+    write(main, RECORD, ("2025-07-01", 10, 400))
+    exchange(main, centre, tmp_path)
+
+    # both sites edit the same rows; the centre's edits are the later ones
+    write(main, "UPDATE farmers SET name = 'Ramesh P'")
+    write(main, "UPDATE milk_records SET litres = 11, amount = 440")
+    write(centre, "UPDATE farmers SET name = 'Ramesh Patil'")
+    write(centre, "UPDATE milk_records SET litres = 12, amount = 480")
+    with main.db.write() as c:
+        c.execute("UPDATE change_log SET at = '2025-07-01 10:00:00.000' WHERE op = 'U'")
+    with centre.db.write() as c:
+        c.execute("UPDATE change_log SET at = '2025-07-01 11:00:00.000' WHERE op = 'U'")
+
+    exchange(main, centre, tmp_path)
+    exchange(centre, main, tmp_path)
+
+    for sync in (main, centre):
+        assert rows(sync, "SELECT name FROM farmers") == [("Ramesh Patil",)]
+        assert rows(sync, MILK) == [("2025-07-01", "F001", 12.0, 480.0)]
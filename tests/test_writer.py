@@ -0,0 +1,60 @@
+import pytest
+
+from conftest import call
+from writer import WriteQueue
+
+
+def _break_commit(db):
+    """A write whose deferred foreign key makes the group's COMMIT fail."""
+    with db.exclusive() as conn:
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("CREATE TEMP TABLE parent (id INTEGER PRIMARY KEY)")
+        conn.execute(
+            "CREATE TEMP TABLE child (parent INTEGER REFERENCES parent (id) DEFERRABLE INITIALLY DEFERRED)"
+        )
+
+    def orphan():
+        with db.write() as c:
+            c.execute("INSERT INTO temp.child VALUES (1)")
+
+    return orphan
+
+
+def test_failed_group_commit_leaves_memory_untouched(dairy):
+    api = dairy.Api()
+    before = call(api.get_all_farmers)["farmers"]
+    rates = call(api.get_rates)
+    formulas = dairy.rate_engine.formulas()
+    orphan = _break_commit(dairy.db)
+
+    writes = WriteQueue(dairy.db, max_wait=0.5).start()
+    try:
+        futures = [
+            writes.submit(api.add_farmer, '{"code": "W900", "name": "Lost", "category": "Cow"}'),
+            writes.submit(api.add_rate, '{"category": "Goat", "base": 10, "fat_rate": 1, "snf_rate": 1}'),
+            writes.submit(orphan),
+        ]
+        for future in futures:
+            with pytest.raises(Exception, match="FOREIGN KEY"):
+                future.result(timeout=10)
+    finally:
+        writes.stop()
+
+    assert dairy.farmer_directory.get("W900") is None
+    assert dairy.rate_engine.formulas() is formulas
+    assert call(api.get_all_farmers)["farmers"] == before
+    assert call(api.get_rates) == rates
+
+
+def test_group_commit_applies_memory_updates(dairy):
+    api = dairy.Api()
+    call(api.get_all_farmers)
+    writes = WriteQueue(dairy.db).start()
+    try:
+        result = writes.call(api.add_farmer, '{"code": "W901", "name": "Kept", "category": "Cow"}')
+    finally:
+        writes.stop()
+
+    assert '"success": true' in result
+    assert dairy.farmer_directory.get("w901")["name"] == "Kept"
+    assert "W901" in [f["code"] for f in call(api.get_all_farmers)["farmers"]]
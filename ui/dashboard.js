@@ -167,6 +167,9 @@ function bindUI() {
     document.getElementById("calcBtn").addEventListener("click", calculateAmount);
     document.getElementById("saveBtn").addEventListener("click", saveRecord);
     document.getElementById("farmerCode").addEventListener("blur", lookupFarmer);
+    ["farmerCode", "adv_farmer_code"].forEach(id => {
+        document.getElementById(id).addEventListener("input", e => suggestFarmers(e.target.value));
+    });
     document.getElementById("showShift").addEventListener("change", async () => {
         await loadRecords();
     });
@@ -205,9 +208,52 @@ async function callApi(method, payload = {}) {
     }
 }
 
-// 🟢 "Show All Records" toggle
+// 📦 Bulk endpoints answer {"columns": [...], "rows": [[...]]} when asked with
+// format "columns" (no repeated keys over the bridge); turn rows back into objects.
+function decodeRows(table) {
+    if (!table || Array.isArray(table)) return table || [];
+    const cols = table.columns;
+    return table.rows.map(row => {
+        const obj = {};
+        for (let i = 0; i < cols.length; i++) obj[cols[i]] = row[i];
+        return obj;
+    });
+}
+
+async function callApiRows(method, key, payload = {}) {
+    const res = await callApi(method, { ...payload, format: "columns" });
+    if (res.success) res[key] = decodeRows(res[key]);
+    return res;
+}
+
+// ⏳ Run a long Api method as a background job and poll until it finishes.
+// onProgress(job) is called on every poll; resolves to the method's own response.
+async function runJob(method, payload = {}, onProgress = null) {
+    const sub = await callApi("submit_job", { method, payload });
+    if (!sub.success) return sub;
+
+    while (true) {
+        await new Promise(r => setTimeout(r, 500));
+        const st = await callApi("get_job", { job_id: sub.job_id });
+        if (!st.success) return st;
+        if (onProgress) onProgress(st.job);
+        if (["done", "failed", "cancelled"].includes(st.job.status)) break;
+    }
+
+    const res = await callApi("get_job_result", { job_id: sub.job_id });
+    if (!res.success) return res;
+    if (res.job.status !== "done") {
+        return { success: false, message: res.job.error || `Job ${res.job.status}` };
+    }
+    return res.result;
+}
+
+// 🟢 "Show All Records" toggle (pages through the full history)
+let allRecordsCursor = null;
+
 function bindShowAllButton() {
     const btn = document.getElementById("showAllBtn");
+    const moreBtn = document.getElementById("loadMoreBtn");
     if (!btn) return;
 
     let showingAll = false;
@@ -218,31 +264,57 @@ function bindShowAllButton() {
         if (showingAll) {
             btn.textContent = "🔍 Show Filtered";
             console.log("📜 Loading ALL milk records (no date/shift filter)");
-            const res = await callApi("fetch_records", {}); // no filters
-            renderMilkTable(res);
+            await loadAllRecordsPage(false);
         } else {
             btn.textContent = "📜 Show All";
             console.log("🔁 Loading filtered milk records");
+            allRecordsCursor = null;
+            if (moreBtn) moreBtn.style.display = "none";
             await loadRecords();
         }
     });
+
+    if (moreBtn) {
+        moreBtn.addEventListener("click", () => loadAllRecordsPage(true));
+    }
 }
 
-// 🧩 Helper: render milk records into table
-function renderMilkTable(res) {
+// 📜 Fetch one page of all records; append=true continues from the last cursor
+async function loadAllRecordsPage(append) {
+    const payload = append
+        ? { cursor: allRecordsCursor }
+        : { with_total: true };
+    const res = await callApiRows("fetch_records", "records", payload);
+    renderMilkTable(res, append);
+
+    allRecordsCursor = res.success ? res.next_cursor : null;
+    const moreBtn = document.getElementById("loadMoreBtn");
+    if (moreBtn) moreBtn.style.display = allRecordsCursor ? "" : "none";
+
+    if (res.success && res.total !== null && res.total !== undefined) {
+        document.getElementById("totalRecords").textContent = `Total Records: ${res.total}`;
+    }
+}
+
+// 🧩 Helper: render milk records into table (append=true keeps existing rows)
+let milkShiftCount = {};
+
+function renderMilkTable(res, append = false) {
     const tbody = document.querySelector("#recordsTable tbody");
-    tbody.innerHTML = "";
+    if (!append) {
+        tbody.innerHTML = "";
+        milkShiftCount = {};
+    }
 
     if (res.success && res.records.length > 0) {
-        let shiftCount = {};
         res.records.forEach(r => {
             const sh = r.shift || "Unknown";
-            if (!shiftCount[sh]) shiftCount[sh] = 0;
-            shiftCount[sh]++;
+            if (!milkShiftCount[sh]) milkShiftCount[sh] = 0;
+            milkShiftCount[sh]++;
 
             const tr = document.createElement("tr");
             tr.innerHTML = `
-                <td>${r.id} <span class="shift-id">(${sh} #${shiftCount[sh]})</span></td>
+                <td>${r.id} <span class="shift-id">(${sh} #${milkShiftCount[sh]})</span></td>
                 <td>${r.rec_date}</td>
                 <td>${r.farmer_code || ""}</td>
                 <td>${r.farmer_name || ""}</td>
@@ -256,7 +328,7 @@ function renderMilkTable(res) {
             `;
             tbody.appendChild(tr);
         });
-    } else {
+    } else if (!append) {
         tbody.innerHTML = `<tr><td colspan="11">${res.message || "No records found"}</td></tr>`;
     }
 }
@@ -282,7 +354,7 @@ async function loadRecords() {
 
     console.log("Loading records for:", rec_date, shift);
 
-    const res = await callApi("fetch_records", { date: rec_date, shift });
+    const res = await callApiRows("fetch_records", "records", { date: rec_date, shift });
     console.log("Fetched records:", res);
 
     const tbody = document.querySelector("#recordsTable tbody");
@@ -351,7 +423,7 @@ async function loadAdvances() {
     if (!tbody) return;
 
     tbody.innerHTML = `<tr><td colspan="6">Loading advances...</td></tr>`;
-    const res = await callApi("get_all_advances");
+    const res = await callApiRows("get_all_advances", "advances");
 
     tbody.innerHTML = "";
 
@@ -378,7 +450,7 @@ async function loadSales() {
     if (!tbody) return;
 
     tbody.innerHTML = `<tr><td colspan="7">Loading sales...</td></tr>`;
-    const res = await callApi("get_all_sales");
+    const res = await callApiRows("get_all_sales", "sales");
 
     tbody.innerHTML = "";
 
@@ -412,6 +484,27 @@ async function loadSales() {
 
 
 
+// 🔎 Autocomplete: fill the shared datalist with code/name prefix matches
+async function suggestFarmers(query) {
+    const list = document.getElementById("farmerSuggestions");
+    if (!list) return;
+    query = query.trim();
+    if (!query) {
+        list.innerHTML = "";
+        return;
+    }
+
+    const res = await callApi("search_farmers", { query, limit: 10 });
+    list.innerHTML = "";
+    if (!res.success) return;
+    res.farmers.forEach(f => {
+        const opt = document.createElement("option");
+        opt.value = f.code;
+        opt.label = `${f.name} (${f.category || ""})`;
+        list.appendChild(opt);
+    });
+}
+
 async function lookupFarmer() {
     const code = document.getElementById("farmerCode").value.trim();
     if (!code) return;
@@ -527,7 +620,12 @@ async function saveRecord() {
 
     // 🧠 Auto-fill rate if empty
     if (!payload.rate) {
-        const resRate = await callApi("get_rate_for_category", { category: payload.category });
+        const resRate = await callApi("get_rate_for_category", {
+            category: payload.category,
+            fat: payload.fat,
+            snf: payload.snf,
+            date: payload.rec_date,
+        });
         if (resRate.success) {
             payload.rate = resRate.rate;
         } else {
@@ -689,18 +787,19 @@ function bindRatePopup() {
         const base = document.getElementById("r_base").value.trim();
         const fat_rate = document.getElementById("r_fat").value.trim();
         const snf_rate = document.getElementById("r_snf").value.trim();
+        const effective_from = document.getElementById("r_from").value;
 
         if (!category) {
             alert("Please enter category name");
             return;
         }
 
-        const res = await callApi("add_rate", { category, base, fat_rate, snf_rate });
+        const res = await callApi("add_rate", { category, base, fat_rate, snf_rate, effective_from });
         alert(res.message);
 
         if (res.success) {
             // ✅ Clear input fields
-            ["r_category", "r_base", "r_fat", "r_snf"].forEach(id => document.getElementById(id).value = "");
+            ["r_category", "r_base", "r_fat", "r_snf", "r_from"].forEach(id => document.getElementById(id).value = "");
 
             // ✅ Wait for backend to commit and reload table
             await loadRates();  // make sure this line has "await"
@@ -747,10 +846,12 @@ async function autoCalculateRate() {
 
     if (!category || (!fat && !snf)) return;
 
-    const res = await callApi("calculate_rate", { category, fat, snf });
+    const litres = document.getElementById("litres").value || 0;
+    const date = document.getElementById("rec_date").value;
+    const res = await callApi("calculate_rate", { category, fat, snf, litres, date });
     if (res.success) {
         document.getElementById("rate").value = res.rate.toFixed(2);
-        document.getElementById("amount").value = (res.rate * (document.getElementById("litres").value || 0)).toFixed(2);
+        document.getElementById("amount").value = Number(res.amount).toFixed(2);
     }
 }
 
@@ -901,7 +1002,7 @@ async function loadPopupAdvances() {
     if (!tbody) return;
 
     tbody.innerHTML = `<tr><td colspan="6">Loading advances...</td></tr>`;
-    const res = await callApi("get_all_advances");
+    const res = await callApiRows("get_all_advances", "advances");
 
     tbody.innerHTML = "";
 
@@ -924,7 +1025,7 @@ async function loadPopupAdvances() {
 }
 
 async function loadAdvances() {
-    const res = await callApi("get_all_advances");
+    const res = await callApiRows("get_all_advances", "advances");
     const tbody = document.querySelector("#advanceTable tbody");
     tbody.innerHTML = "";
 
@@ -1007,7 +1108,7 @@ function bindSalePopup() {
 }
 
 async function loadSales() {
-    const res = await callApi("get_all_sales");
+    const res = await callApiRows("get_all_sales", "sales");
 
     const mainTbody = document.querySelector("#salesTable tbody");
     const popupTbody = document.querySelector("#salesPopupTable tbody"); // 👈 add this if popup exists
@@ -1137,7 +1238,10 @@ function bindBillPopup() {
         const end_date = document.getElementById("bill_end").value;
         const bill_type = document.querySelector('input[name="billType"]:checked').value;
 
-        const res = await callApi("generate_bill", { start_date, end_date, bill_type });
+        document.getElementById("billSummaryContainer").innerHTML =
+            `<p style='text-align:center;color:#777;'>⏳ Generating bills...</p>`;
+        const res = await runJob("generate_bill", { start_date, end_date, bill_type, format: "columns" });
+        if (res.success) res.bills = decodeRows(res.bills);
 
         if (res.success && res.bills.length > 0) {
             renderBillTable(res.bills, bill_type);
@@ -1394,6 +1498,21 @@ function renderIndividualBill(data, info) {
 
 }
 
+// 🖨 Every farmer's bill for the period in one printable file (built by the backend)
+document.getElementById("printAllBillsBtn").addEventListener("click", async () => {
+    const start_date = document.getElementById("bill_start").value;
+    const end_date = document.getElementById("bill_end").value;
+
+    const btn = document.getElementById("printAllBillsBtn");
+    const label = btn.textContent;
+    const res = await runJob("render_all_bills", { start_date, end_date, open: true }, job => {
+        if (job.progress !== null) btn.textContent = `⏳ ${Math.round(job.progress * 100)}%`;
+    });
+    btn.textContent = label;
+    if (res.success) alert(`✅ ${res.message}`);
+    else alert("❌ Failed to render bills: " + res.message);
+});
+
 document.getElementById("exportPDFBtn").addEventListener("click", () => {
     if (!window.generatedBillData) {
         alert("No individual bill to export!");
@@ -1532,6 +1651,29 @@ function renderGeneratedReport(data, start_date, end_date) {
 //     document.getElementById("exportReportPDFBtn").disabled = false;
 // }
 
+// 📄 Full milk record CSV for the period, written to disk by the backend
+document.getElementById("exportReportCSVBtn").addEventListener("click", async () => {
+    if (!window.generatedReportPeriod) {
+        alert("No report generated yet!");
+        return;
+    }
+
+    const p = window.generatedReportPeriod;
+    const btn = document.getElementById("exportReportCSVBtn");
+    const label = btn.textContent;
+    const res = await runJob("export_report_csv", {
+        from_date: p.start_date,
+        to_date: p.end_date,
+        shift: "all",
+    }, job => {
+        if (job.message) btn.textContent = `⏳ ${job.message}`;
+    });
+    btn.textContent = label;
+
+    if (res.success) alert(`✅ Exported ${res.rows} record(s) to ${res.path}`);
+    else if (res.message !== "Cancelled") alert("❌ Export failed: " + res.message);
+});
+
 document.getElementById("exportReportPDFBtn").addEventListener("click", () => {
     if (!window.generatedReportData) {
         alert("No report generated yet!");
@@ -0,0 +1,21 @@
+// 🌐 LAN server mode (server.py): provides window.pywebview.api over HTTP so
+// the dashboard runs unchanged in a counter's browser. Every Api call is a
+// POST /api/<method> with the same JSON string the desktop bridge receives.
+// The server's shared token comes from ?token=... once and is remembered.
+(function () {
+    if (window.pywebview) return;
+    const given = new URLSearchParams(location.search).get("token");
+    if (given) localStorage.setItem("dairyToken", given);
+    const token = localStorage.getItem("dairyToken") || "";
+    const api = new Proxy({}, {
+        get: (_, method) => async (data) => {
+            const resp = await fetch(`/api/${method}`, {
+                method: "POST",
+                headers: { "Content-Type": "application/json", "X-Dairy-Token": token },
+                body: data === undefined ? "" : String(data),
+            });
+            return resp.text();
+        },
+    });
+    window.pywebview = { api };
+})();
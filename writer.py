@@ -0,0 +1,138 @@
+"""
+writer.py
+---------
+Single writer thread with group commit for Shree Ganesh Dairy
+Management System (LAN server mode).
+
+Every write call from every counter is queued here and run by one
+thread. Calls that arrive together are executed inside one
+transaction and made durable with a single COMMIT (one fsync for the
+whole group instead of one per record). Each call runs in its own
+savepoint (Database.write nests that way), so a call that fails is
+rolled back alone and the rest of the group still commits. Callers
+get their result only after the group has committed, and the in-memory
+updates the calls ask for (Database.after_commit) are applied only then;
+a group that fails to commit leaves them untouched.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# Most calls folded into one transaction
+MAX_BATCH = 64
+# How long the writer waits for more calls to join a group (seconds)
+MAX_WAIT = 0.002
+
+_STOP = object()
+
+
+class WriteQueue:
+    def __init__(self, db, max_batch=MAX_BATCH, max_wait=MAX_WAIT, after_commit=None):
+        self.db = db
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.after_commit = after_commit  # called on the writer thread after each COMMIT
+        self._queue = queue.Queue()
+        self._thread = None
+        self.groups = 0
+        self.calls = 0
+
+    # -------------------------------
+    # LIFECYCLE
+    # -------------------------------
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._loop, name="dairy-writer", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    # -------------------------------
+    # SUBMIT
+    # -------------------------------
+    def submit(self, fn, *args):
+        """Queue fn(*args) for the writer thread; returns a Future."""
+        future = Future()
+        self._queue.put((fn, args, future))
+        return future
+
+    def call(self, fn, *args):
+        """Run fn(*args) on the writer thread and return its result once committed."""
+        return self.submit(fn, *args).result()
+
+    def stats(self):
+        return {
+            "groups": self.groups,
+            "calls": self.calls,
+            "calls_per_commit": round(self.calls / self.groups, 2) if self.groups else None,
+            "queued": self._queue.qsize(),
+        }
+
+    # -------------------------------
+    # WRITER THREAD
+    # -------------------------------
+    def _next_group(self):
+        item = self._queue.get()
+        if item is _STOP:
+            return None
+        group = [item]
+        deadline = time.monotonic() + self.max_wait
+        while len(group) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)  # finish this group, then stop
+                break
+            group.append(item)
+        return group
+
+    def _loop(self):
+        while True:
+            group = self._next_group()
+            if group is None:
+                return
+            self._run_group(group)
+
+    def _run_group(self, group):
+        results = []
+        try:
+            # the calls' db.after_commit() callbacks run only once this commits
+            with self.db.transaction():
+                for fn, args, future in group:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        results.append((future, fn(*args), None))
+                    except BaseException as e:
+                        results.append((future, None, e))
+        except BaseException as e:
+            # the group never committed: nothing in it was saved
+            for _, _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.groups += 1
+        self.calls += len(results)
+        if self.after_commit is not None:
+            try:
+                self.after_commit()
+            except Exception as e:
+                print("after_commit error:", e)
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)